@@ -0,0 +1,30 @@
+"""add processing stage timings to cvs
+
+Revision ID: 2025_12_07_0000
+Revises: 2025_12_06_0000
+Create Date: 2025-12-07 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '2025_12_07_0000'
+down_revision = '2025_12_06_0000'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+
+    cvs_columns = [c['name'] for c in inspector.get_columns('cvs')]
+
+    if 'processing_stages' not in cvs_columns:
+        op.add_column('cvs', sa.Column('processing_stages', postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('cvs', 'processing_stages')
@@ -0,0 +1,31 @@
+"""add content hash to cv parse details
+
+Revision ID: 2025_12_08_0000
+Revises: 2025_12_07_0000
+Create Date: 2025-12-08 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '2025_12_08_0000'
+down_revision = '2025_12_07_0000'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+
+    parse_detail_columns = [c['name'] for c in inspector.get_columns('cv_parse_details')]
+
+    if 'content_hash' not in parse_detail_columns:
+        op.add_column('cv_parse_details', sa.Column('content_hash', sa.String(length=64), nullable=True))
+        op.create_index(op.f('ix_cv_parse_details_content_hash'), 'cv_parse_details', ['content_hash'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_cv_parse_details_content_hash'), table_name='cv_parse_details')
+    op.drop_column('cv_parse_details', 'content_hash')
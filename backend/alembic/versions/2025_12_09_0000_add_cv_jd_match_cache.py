@@ -0,0 +1,57 @@
+"""add JD revision and CV-JD match cache
+
+Revision ID: 2025_12_09_0000
+Revises: 2025_12_08_0000
+Create Date: 2025-12-09 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '2025_12_09_0000'
+down_revision = '2025_12_08_0000'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+
+    # Add revision stamp to job_descriptions
+    jd_columns = [c['name'] for c in inspector.get_columns('job_descriptions')]
+
+    if 'revision' not in jd_columns:
+        op.add_column('job_descriptions', sa.Column('revision', sa.Integer(), server_default='1', nullable=False))
+
+    # Create cv_jd_match_cache table
+    if 'cv_jd_match_cache' not in inspector.get_table_names():
+        op.create_table(
+            'cv_jd_match_cache',
+            sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+            sa.Column('user_id', postgresql.UUID(as_uuid=True), nullable=False),
+            sa.Column('job_description_id', postgresql.UUID(as_uuid=True), nullable=False),
+            sa.Column('cv_data_hash', sa.String(length=64), nullable=False),
+            sa.Column('jd_revision', sa.Integer(), nullable=False),
+            sa.Column('scoring_method', sa.String(), nullable=False),
+            sa.Column('match_score', sa.Integer(), nullable=True),
+            sa.Column('match_data', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+            sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+            sa.ForeignKeyConstraint(['job_description_id'], ['job_descriptions.id'], ),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('job_description_id', 'jd_revision', 'cv_data_hash', 'scoring_method', name='uq_cv_jd_match_cache_key')
+        )
+        op.create_index(op.f('ix_cv_jd_match_cache_id'), 'cv_jd_match_cache', ['id'], unique=False)
+        op.create_index(op.f('ix_cv_jd_match_cache_user_id'), 'cv_jd_match_cache', ['user_id'], unique=False)
+        op.create_index(op.f('ix_cv_jd_match_cache_job_description_id'), 'cv_jd_match_cache', ['job_description_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_cv_jd_match_cache_job_description_id'), table_name='cv_jd_match_cache')
+    op.drop_index(op.f('ix_cv_jd_match_cache_user_id'), table_name='cv_jd_match_cache')
+    op.drop_index(op.f('ix_cv_jd_match_cache_id'), table_name='cv_jd_match_cache')
+    op.drop_table('cv_jd_match_cache')
+    op.drop_column('job_descriptions', 'revision')
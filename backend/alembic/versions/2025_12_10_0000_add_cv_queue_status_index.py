@@ -0,0 +1,29 @@
+"""add composite index for batch queue status
+
+Revision ID: 2025_12_10_0000
+Revises: 2025_12_09_0000
+Create Date: 2025-12-10 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '2025_12_10_0000'
+down_revision = '2025_12_09_0000'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+
+    cv_indexes = [i['name'] for i in inspector.get_indexes('cvs')]
+
+    if 'ix_cvs_batch_status_created' not in cv_indexes:
+        op.create_index('ix_cvs_batch_status_created', 'cvs', ['batch_id', 'status', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_cvs_batch_status_created', table_name='cvs')
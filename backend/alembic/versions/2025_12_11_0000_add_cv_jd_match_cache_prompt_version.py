@@ -0,0 +1,44 @@
+"""add prompt version to CV-JD match cache key
+
+Revision ID: 2025_12_11_0000
+Revises: 2025_12_10_0000
+Create Date: 2025-12-11 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '2025_12_11_0000'
+down_revision = '2025_12_10_0000'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+
+    cache_columns = [c['name'] for c in inspector.get_columns('cv_jd_match_cache')]
+
+    if 'prompt_version' not in cache_columns:
+        # Existing entries were scored by an unknown prompt, so they can't be reused
+        op.execute('DELETE FROM cv_jd_match_cache')
+        op.add_column('cv_jd_match_cache', sa.Column('prompt_version', sa.String(length=12), nullable=False))
+        op.drop_constraint('uq_cv_jd_match_cache_key', 'cv_jd_match_cache', type_='unique')
+        op.create_unique_constraint(
+            'uq_cv_jd_match_cache_key',
+            'cv_jd_match_cache',
+            ['job_description_id', 'jd_revision', 'cv_data_hash', 'scoring_method', 'prompt_version'],
+        )
+
+
+def downgrade() -> None:
+    op.drop_constraint('uq_cv_jd_match_cache_key', 'cv_jd_match_cache', type_='unique')
+    op.execute('DELETE FROM cv_jd_match_cache')
+    op.drop_column('cv_jd_match_cache', 'prompt_version')
+    op.create_unique_constraint(
+        'uq_cv_jd_match_cache_key',
+        'cv_jd_match_cache',
+        ['job_description_id', 'jd_revision', 'cv_data_hash', 'scoring_method'],
+    )
@@ -0,0 +1,32 @@
+"""add pipeline start time and attempt count to CVs
+
+Revision ID: 2025_12_12_0000
+Revises: 2025_12_11_0000
+Create Date: 2025-12-12 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '2025_12_12_0000'
+down_revision = '2025_12_11_0000'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+
+    cvs_columns = [c['name'] for c in inspector.get_columns('cvs')]
+
+    if 'processing_started_at' not in cvs_columns:
+        op.add_column('cvs', sa.Column('processing_started_at', sa.DateTime(timezone=True), nullable=True))
+    if 'processing_attempts' not in cvs_columns:
+        op.add_column('cvs', sa.Column('processing_attempts', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade() -> None:
+    op.drop_column('cvs', 'processing_attempts')
+    op.drop_column('cvs', 'processing_started_at')
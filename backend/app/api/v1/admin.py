@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from fastapi.responses import PlainTextResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from app.database import get_db
@@ -419,6 +420,41 @@ async def get_admin_stats(
     return {"message": "Admin stats endpoint - under construction"}
 
 
+@router.get("/cache/metrics")
+@limiter.limit(RateLimits.ADMIN_API)
+async def get_cache_metrics(
+    request: Request,
+    format: str = Query("json", pattern="^(json|prometheus)$"),
+    current_user: User = Depends(require_admin),
+):
+    """
+    Response cache counters per endpoint namespace for this API process.
+
+    Use format=prometheus for the text exposition format.
+    """
+    if format == "prometheus":
+        return PlainTextResponse(
+            cache_service.metrics.to_prometheus(),
+            media_type="text/plain; version=0.0.4",
+        )
+
+    local = cache_service.local
+    return {
+        "namespaces": cache_service.metrics.snapshot(),
+        "local_tier": {
+            "entries": local.entry_count,
+            "size_bytes": local.size_bytes,
+            "max_bytes": local.max_bytes,
+        }
+        if local
+        else None,
+        "codec": {
+            "serializer": cache_service.codec.serializer,
+            "compression": cache_service.codec.compression,
+        },
+    }
+
+
 @router.get("/sessions")
 def get_active_sessions(
     current_user: User = Depends(require_admin), db: Session = Depends(get_db)
@@ -3,6 +3,7 @@ CV Processing API endpoints with queue support
 """
 
 from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect, Query
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import List, Optional
 import traceback
@@ -11,12 +12,16 @@ from app.models.user import User
 from app.models.job import CV, CVBatch, CVStatus
 from app.models.jd_builder import JobDescription, CVParseDetail
 from app.schemas.cv_schemas import CVParseDetailResponse, QueueStatusResponse, CVProcessResponse
-from app.tasks.cv_tasks import process_cv_task, get_queue_status
+from app.tasks.cv_tasks import process_cv_task, process_cv_group_task, match_batch_task, get_queue_status
+from app.core.batch_counters import batch_counters
+from app.core.config import settings
 from app.core.websocket import manager
+from app.services.cv_parser import cv_parser_service
 from sqlalchemy import desc
 import logging
 import asyncio
 import json
+import math
 
 logger = logging.getLogger(__name__)
 
@@ -59,9 +64,29 @@ async def process_batch_cvs(
 
         # Queue all CVs for processing
         task_ids = []
-        for cv in cvs:
-            task = process_cv_task.delay(cv_id=str(cv.id), user_id=str(current_user.id))
-            task_ids.append(task.id)
+        group_size = settings.CV_PARSE_BATCH_SIZE
+        if group_size > 1 and cv_parser_service.batch_parse_capacity() < 2:
+            # A group whose CVs can't share a parsing call would parse them
+            # one after another in a single task: slower than a task per CV
+            logger.warning(
+                "CV_PARSE_BATCH_SIZE > 1 ignored: the parsing output budget fits "
+                "only one CV per call (raise CV_PARSE_BATCH_MAX_TOKENS, lower "
+                "CV_PARSE_BATCH_PER_CV_TOKENS or use a model with a larger "
+                "output limit)"
+            )
+            group_size = 1
+        if group_size > 1:
+            # Batch mode: several CVs share one LLM parsing call
+            for i in range(0, len(cvs), group_size):
+                task = process_cv_group_task.delay(
+                    cv_ids=[str(cv.id) for cv in cvs[i:i + group_size]],
+                    user_id=str(current_user.id),
+                )
+                task_ids.append(task.id)
+        else:
+            for cv in cvs:
+                task = process_cv_task.delay(cv_id=str(cv.id), user_id=str(current_user.id))
+                task_ids.append(task.id)
 
         logger.info(f"Queued {len(cvs)} CVs for processing in batch {batch_id}")
 
@@ -251,9 +276,14 @@ async def retry_cv_processing(
             raise HTTPException(status_code=404, detail="CV not found")
 
         # Reset status
+        previous_status = cv.status
         cv.status = CVStatus.QUEUED
         cv.error_message = None
+        cv.processing_attempts = 0
         db.commit()
+        await run_in_threadpool(
+            batch_counters.transition, str(cv.batch_id), previous_status, CVStatus.QUEUED
+        )
 
         # Trigger task
         task = process_cv_task.delay(cv_id=str(cv.id), user_id=str(current_user.id))
@@ -286,6 +316,7 @@ async def retry_cv_processing(
 @router.post("/cv/{cv_id}/match", response_model=CVProcessResponse)
 async def match_existing_parsed_cv(
     cv_id: str,
+    force: bool = Query(False, description="Bypass memoized match results and call the LLM again"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
@@ -327,8 +358,18 @@ async def match_existing_parsed_cv(
             db=db,
             user_id=str(current_user.id),
             cv_id=cv_id,
+            use_cache=not force,
+            interactive=True,
         )
 
+        if match_result.get("throttled"):
+            # The LLM quota is exhausted: ask the client to come back after the cooldown
+            retry_after = math.ceil(settings.LLM_GOVERNOR_THROTTLE_COOLDOWN_MS / 1000)
+            raise HTTPException(
+                status_code=429,
+                detail=match_result.get("error"),
+                headers={"Retry-After": str(retry_after)},
+            )
         if not match_result.get("success"):
             raise HTTPException(status_code=500, detail=f"Matching failed: {match_result.get('error')}")
 
@@ -352,6 +393,80 @@ async def match_existing_parsed_cv(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/batch/{batch_id}/match", response_model=CVProcessResponse)
+async def match_batch_parsed_cvs(
+    batch_id: str,
+    rematch: bool = Query(False, description="Re-score CVs that already have a match score"),
+    force: bool = Query(False, description="Bypass memoized match results and call the LLM again"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Run JD matching for every parsed CV in a batch against the batch's linked Job Description.
+
+    The scoring runs as a Celery task (its id is returned in task_ids). CVs are scored in groups of
+    CV_MATCH_BATCH_SIZE per LLM call, so the JD and rubric are sent once per group, and progress is
+    pushed over the WebSocket as batch_match_progress events.
+    """
+    try:
+        batch = db.query(CVBatch).filter(
+            CVBatch.id == batch_id,
+            CVBatch.user_id == current_user.id,
+        ).first()
+
+        if not batch:
+            raise HTTPException(status_code=404, detail="Batch not found")
+        if not batch.job_description_id:
+            raise HTTPException(status_code=400, detail="Job Description not linked to this batch")
+
+        job_description = db.query(JobDescription).filter(JobDescription.id == batch.job_description_id).first()
+        if not job_description:
+            raise HTTPException(status_code=404, detail="Linked Job Description not found")
+
+        # Parsed CVs of this batch (optionally only the ones without a score yet)
+        query = (
+            db.query(CV, CVParseDetail)
+            .join(CVParseDetail, CVParseDetail.cv_id == CV.id)
+            .filter(CV.batch_id == batch_id)
+        )
+        if not rematch:
+            query = query.filter(CV.jd_match_score.is_(None))
+        rows = [(cv, detail) for cv, detail in query.all() if detail.parsed_data]
+
+        if not rows:
+            return CVProcessResponse(
+                success=False,
+                message="No parsed CVs to match",
+                batch_id=batch_id,
+                total_cvs=0,
+                task_ids=[],
+            )
+
+        # Scoring a large batch takes many LLM calls: run it in the background
+        task = match_batch_task.delay(
+            batch_id=batch_id,
+            user_id=str(current_user.id),
+            cv_ids=[str(cv.id) for cv, _ in rows],
+            job_description_id=str(job_description.id),
+            use_cache=not force,
+        )
+        logger.info(f"Queued matching of {len(rows)} CVs in batch {batch_id}")
+
+        return CVProcessResponse(
+            success=True,
+            message=f"Queued {len(rows)} CVs for matching",
+            batch_id=batch_id,
+            total_cvs=len(rows),
+            task_ids=[task.id],
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error matching batch: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.websocket("/ws/{user_id}")
 async def cv_processing_websocket(
     websocket: WebSocket,
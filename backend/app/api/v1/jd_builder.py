@@ -68,6 +68,8 @@ async def build_jd(
         result = await jd_builder_service.generate_jd(
             jd=jd, db=db, user_id=str(current_user.id)
         )
+        if result.get("throttled"):
+            raise HTTPException(status_code=429, detail=result.get("error"))
 
         # Send completion update
         if result["success"]:
@@ -80,6 +82,8 @@ async def build_jd(
 
         return JDResponse(**result)
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error building JD: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -100,6 +104,8 @@ async def upload_jd(
             jd_text=jd_upload.jd_text, db=db, user_id=str(current_user.id)
         )
 
+        if result.get("throttled"):
+            raise HTTPException(status_code=429, detail=result.get("error"))
         if not result["success"]:
             return JDResponse(success=False, error=result.get("error"))
 
@@ -142,6 +148,8 @@ async def upload_jd(
             cost=result.get("cost"),
         )
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error uploading JD: {e}")
         raise HTTPException(status_code=500, detail=str(e))
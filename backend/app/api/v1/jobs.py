@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from pathlib import Path
@@ -21,6 +22,9 @@ from app.schemas.job import (
     CVUploadConfirmation,
     CVUploadConfirmation,
     CVBulkDeleteRequest,
+    CVDownloadURLRequest,
+    CVDownloadURLResponse,
+    CVDownloadURL,
     DashboardStatsResponse,
     StatsHistoryResponse,
     DailyStats,
@@ -32,8 +36,9 @@ from app.models.credit_transaction import CreditTransaction, TransactionType
 from pydantic import BaseModel
 from datetime import datetime
 from app.api.deps import get_current_user
-from app.services.s3_service import s3_service
+from app.services.s3_service import s3_service, async_s3_service
 from app.core.cache import cache_service
+from app.core.batch_counters import batch_counters
 from app.core.rate_limit import limiter, RateLimits
 
 
@@ -149,10 +154,13 @@ async def create_cv_batch(
     db.commit()
 
     # Invalidate caches
-    await cache_service.delete_pattern(f"cache:{current_user.id}:list_cv_batches:*")
-    await cache_service.delete_pattern(f"cache:{current_user.id}:get_dashboard_stats:*")
-    await cache_service.delete_pattern(f"cache:{current_user.id}:get_stats_history:*")
-    await cache_service.delete_pattern(f"cache:{current_user.id}:get_activities:*")
+    await cache_service.invalidate(
+        current_user.id,
+        "list_cv_batches",
+        "get_dashboard_stats",
+        "get_stats_history",
+        "get_activities",
+    )
 
     return CVBatchResponse.from_orm(new_batch)
 
@@ -230,6 +238,7 @@ async def request_cv_upload(
     db.add(cv)
     db.commit()
     db.refresh(cv)
+    await run_in_threadpool(batch_counters.transition, str(batch_id), None, CVStatus.QUEUED)
 
     return CVUploadResponse(cv_id=cv.id, presigned_url=presigned_url, s3_key=s3_key)
 
@@ -287,12 +296,16 @@ async def confirm_cv_upload(
     db.commit()
 
     # Invalidate caches
-    await cache_service.delete_pattern(f"cache:{current_user.id}:get_cv_batch:*")
-    await cache_service.delete_pattern(f"cache:{current_user.id}:list_cv_batches:*")
-    await cache_service.delete_pattern(f"cache:{current_user.id}:get_dashboard_stats:*")
-    await cache_service.delete_pattern(f"cache:{current_user.id}:get_stats_history:*")
-    await cache_service.delete_pattern(f"cache:{current_user.id}:list_all_cvs:*")
-    await cache_service.delete_pattern(f"cache:{current_user.id}:get_activities:*")
+    await cache_service.invalidate(
+        current_user.id,
+        "get_cv_batch",
+        "list_batch_cvs",
+        "list_cv_batches",
+        "get_dashboard_stats",
+        "get_stats_history",
+        "list_all_cvs",
+        "get_activities",
+    )
 
     return CVUploadConfirmation(cv_id=cv.id, status=cv.status)
 
@@ -328,7 +341,7 @@ async def get_activities(
 
 
 @router.get("/stats", response_model=DashboardStatsResponse)
-@cache_service.cache_response(ttl=300)
+@cache_service.cache_response(ttl=300, stale_ttl=60)
 async def get_dashboard_stats(
     request: Request = None,
     response: Response = None,
@@ -386,7 +399,7 @@ async def get_dashboard_stats(
 
 
 @router.get("/stats/history", response_model=StatsHistoryResponse)
-@cache_service.cache_response(ttl=300)
+@cache_service.cache_response(ttl=300, stale_ttl=60)
 async def get_stats_history(
     days: int = 30,
     request: Request = None,
@@ -508,7 +521,13 @@ async def get_cv_batch(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    """Get a specific CV batch with all CVs"""
+    """
+    Get a specific CV batch with all CVs
+
+    Pass include_download_urls=false to leave the download URLs out, which
+    keeps large batch payloads small; clients can then sign the rows they
+    open via POST /cvs/download-urls.
+    """
     from sqlalchemy.orm import joinedload
     
     batch = (
@@ -532,14 +551,11 @@ async def get_cv_batch(
     response = CVDetailResponse.from_orm(batch)
 
     if include_download_urls:
+        download_urls = s3_service.generate_presigned_urls(
+            (cv.s3_key, cv.filename) for cv in response.cvs
+        )
         for cv in response.cvs:
-            try:
-                cv.download_url = s3_service.generate_presigned_url(
-                    s3_key=cv.s3_key, filename=cv.filename
-                )
-            except Exception as e:
-                print(f"Failed to generate presigned URL for {cv.filename}: {str(e)}")
-                cv.download_url = None
+            cv.download_url = download_urls.get(cv.s3_key)
 
     return response
 
@@ -596,19 +612,17 @@ async def list_batch_cvs(
     )
 
     # Add download URLs and detailed data
-    # Note: Generating 10-20 presigned URLs is fast enough to do on-the-fly
+    # Note: URLs are signed for the whole page at once and reused from the signing cache
+    download_urls = s3_service.generate_presigned_urls(
+        (cv.s3_key, cv.filename) for cv in cvs
+    )
     cv_responses = []
     for cv in cvs:
         # Convert to Pydantic model
         cv_resp = CVResponse.from_orm(cv)
 
         # Add download URL
-        try:
-            cv_resp.download_url = s3_service.generate_presigned_url(
-                s3_key=cv.s3_key, filename=cv.filename
-            )
-        except Exception:
-            cv_resp.download_url = None
+        cv_resp.download_url = download_urls.get(cv.s3_key)
 
         # Add detailed match data (from CV)
         cv_resp.jd_match_data = cv.jd_match_data
@@ -669,9 +683,13 @@ async def update_batch_status(
     db.commit()
 
     # Invalidate caches
-    await cache_service.delete_pattern(f"cache:{current_user.id}:get_cv_batch:*")
-    await cache_service.delete_pattern(f"cache:{current_user.id}:list_cv_batches:*")
-    await cache_service.delete_pattern(f"cache:{current_user.id}:get_activities:*")
+    await cache_service.invalidate(
+        current_user.id,
+        "get_cv_batch",
+        "list_batch_cvs",
+        "list_cv_batches",
+        "get_activities",
+    )
 
     return CVBatchResponse.from_orm(batch)
 
@@ -716,13 +734,55 @@ async def archive_batch(
     db.commit()
 
     # Invalidate caches
-    await cache_service.delete_pattern(f"cache:{current_user.id}:get_cv_batch:*")
-    await cache_service.delete_pattern(f"cache:{current_user.id}:list_cv_batches:*")
-    await cache_service.delete_pattern(f"cache:{current_user.id}:get_activities:*")
+    await cache_service.invalidate(
+        current_user.id,
+        "get_cv_batch",
+        "list_batch_cvs",
+        "list_cv_batches",
+        "get_activities",
+    )
 
     return CVBatchResponse.from_orm(batch)
 
 
+@router.post("/cvs/download-urls", response_model=CVDownloadURLResponse)
+@limiter.limit(RateLimits.CV_DOWNLOAD_URLS)
+async def get_cv_download_urls(
+    request: Request,
+    response: Response,
+    url_request: CVDownloadURLRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Get presigned download URLs for the CVs the user is opening
+
+    At most MAX_DOWNLOAD_URL_CVS CVs per call (larger lists are rejected
+    with 422); CVs the user doesn't own are left out.
+    """
+    cvs = (
+        db.query(CV.id, CV.filename, CV.s3_key)
+        .filter(CV.id.in_(url_request.cv_ids), CV.user_id == current_user.id)
+        .all()
+    )
+
+    download_urls = s3_service.generate_presigned_urls(
+        [(cv.s3_key, cv.filename) for cv in cvs], expiration=url_request.expiration
+    )
+
+    return CVDownloadURLResponse(
+        urls=[
+            CVDownloadURL(
+                cv_id=cv.id,
+                filename=cv.filename,
+                download_url=download_urls.get(cv.s3_key),
+            )
+            for cv in cvs
+        ],
+        expires_in=url_request.expiration,
+    )
+
+
 @router.get("/cvs/{cv_id}/download-url")
 async def get_cv_download_url(
     cv_id: UUID,
@@ -780,7 +840,7 @@ async def delete_cv_batch(
     # Delete from S3
     if s3_keys:
         try:
-            s3_service.delete_files(s3_keys)
+            await async_s3_service.delete_files(s3_keys)
         except Exception as e:
             print(f"Failed to delete files from S3: {str(e)}")
             # Continue with database deletion even if S3 deletion fails
@@ -788,12 +848,18 @@ async def delete_cv_batch(
     # Delete batch (CVs will be deleted due to cascade)
     db.delete(batch)
     db.commit()
+    await run_in_threadpool(batch_counters.reset, str(batch_id))
 
     # Invalidate caches
-    await cache_service.delete_pattern(f"cache:{current_user.id}:list_cv_batches:*")
-    await cache_service.delete_pattern(f"cache:{current_user.id}:get_dashboard_stats:*")
-    await cache_service.delete_pattern(f"cache:{current_user.id}:list_all_cvs:*")
-    await cache_service.delete_pattern(f"cache:{current_user.id}:get_activities:*")
+    await cache_service.invalidate(
+        current_user.id,
+        "get_cv_batch",
+        "list_batch_cvs",
+        "list_cv_batches",
+        "get_dashboard_stats",
+        "list_all_cvs",
+        "get_activities",
+    )
 
     return None
 
@@ -814,7 +880,7 @@ async def delete_cv(
 
     # Delete from S3
     try:
-        s3_service.delete_file(cv.s3_key)
+        await async_s3_service.delete_file(cv.s3_key)
     except Exception as e:
         print(f"Failed to delete file from S3: {str(e)}")
 
@@ -826,13 +892,18 @@ async def delete_cv(
     # Delete CV
     db.delete(cv)
     db.commit()
+    await run_in_threadpool(batch_counters.reset, str(cv.batch_id))
 
     # Invalidate caches
-    await cache_service.delete_pattern(f"cache:{current_user.id}:get_cv_batch:*")
-    await cache_service.delete_pattern(f"cache:{current_user.id}:list_cv_batches:*")
-    await cache_service.delete_pattern(f"cache:{current_user.id}:get_dashboard_stats:*")
-    await cache_service.delete_pattern(f"cache:{current_user.id}:list_all_cvs:*")
-    await cache_service.delete_pattern(f"cache:{current_user.id}:get_activities:*")
+    await cache_service.invalidate(
+        current_user.id,
+        "get_cv_batch",
+        "list_batch_cvs",
+        "list_cv_batches",
+        "get_dashboard_stats",
+        "list_all_cvs",
+        "get_activities",
+    )
 
     return None
 
@@ -863,7 +934,7 @@ async def bulk_delete_cvs(
     # Delete from S3
     if s3_keys:
         try:
-            s3_service.delete_files(s3_keys)
+            await async_s3_service.delete_files(s3_keys)
         except Exception as e:
             print(f"Failed to delete files from S3: {str(e)}")
             # Continue with DB deletion
@@ -906,46 +977,23 @@ async def bulk_delete_cvs(
         db.delete(cv)
 
     db.commit()
+    for batch_id in batch_updates:
+        await run_in_threadpool(batch_counters.reset, str(batch_id))
 
     # Invalidate caches
-    await cache_service.delete_pattern(f"cache:{current_user.id}:get_cv_batch:*")
-    await cache_service.delete_pattern(f"cache:{current_user.id}:list_cv_batches:*")
-    await cache_service.delete_pattern(f"cache:{current_user.id}:get_dashboard_stats:*")
-    await cache_service.delete_pattern(f"cache:{current_user.id}:list_all_cvs:*")
-    await cache_service.delete_pattern(f"cache:{current_user.id}:get_activities:*")
+    await cache_service.invalidate(
+        current_user.id,
+        "get_cv_batch",
+        "list_batch_cvs",
+        "list_cv_batches",
+        "get_dashboard_stats",
+        "list_all_cvs",
+        "get_activities",
+    )
 
     return None
 
 
-@router.get("/cvs/{cv_id}/download-url")
-async def get_cv_download_url(
-    cv_id: UUID,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
-):
-    """Get presigned URL for downloading CV"""
-    cv = db.query(CV).filter(CV.id == cv_id, CV.user_id == current_user.id).first()
-
-    if not cv:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="CV not found"
-        )
-
-    try:
-        url = s3_service.generate_presigned_url(
-            s3_key=cv.s3_key,
-            client_method="get_object",
-            filename=cv.filename,
-            expiration=3600,
-        )
-        return {"url": url}
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to generate download URL: {str(e)}",
-        )
-
-
 from app.schemas.job import CVListResponse
 
 
@@ -1031,4 +1079,7 @@ async def update_cv_status(
                 status_code=500, detail=f"Failed to update status: {str(e)}"
             )
 
+    # Shortlisted/rejected are not tracked incrementally; re-seed from Postgres
+    await run_in_threadpool(batch_counters.reset, str(cv.batch_id))
+
     return {"status": "success", "cv_id": str(cv.id), "new_status": cv.status}
@@ -0,0 +1,149 @@
+"""
+Persistent asyncio runner for Celery workers
+Keeps one event loop alive per worker process so CV pipelines share it
+instead of building and tearing down a loop with asyncio.run() per call
+"""
+
+import asyncio
+import atexit
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Coroutine, Optional, Set
+import logging
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncTaskRunner:
+    """
+    Runs coroutines on a background event loop owned by the current process
+
+    Celery task threads hand pipeline coroutines to the loop with submit()
+    and return straight away, so a worker slot is free again as soon as its
+    pipeline is admitted. Up to max_in_flight pipelines run on the loop at
+    once; a submit() beyond that blocks its Celery thread until one finishes,
+    which stops the worker pulling more messages than it can run. A worker
+    with --concurrency=10 therefore still keeps max_in_flight pipelines (and
+    their LLM calls) outstanding.
+
+    Everything between awaits runs on the loop thread and delays every other
+    pipeline. Pipelines therefore await S3, LLM and extraction work, run
+    their SQLAlchemy calls on the loop's default executor (run_db in
+    app/database.py), and hand progress events and Celery state updates to
+    a background thread (see app/tasks/cv_tasks.py).
+    """
+
+    def __init__(self, max_in_flight: int):
+        self.max_in_flight = max_in_flight
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._slots: Optional[threading.Semaphore] = None
+        self._pending: Set[Future] = set()
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _start(self):
+        """Start the loop thread (called lazily, and again after a fork)"""
+        loop = asyncio.new_event_loop()
+        # run_db() sends pipelines' blocking SQLAlchemy calls here; one thread
+        # per pipeline means a query never waits for another pipeline's
+        loop.set_default_executor(
+            ThreadPoolExecutor(
+                max_workers=self.max_in_flight, thread_name_prefix="cv-pipeline-db"
+            )
+        )
+        ready = threading.Event()
+
+        def _run_loop():
+            asyncio.set_event_loop(loop)
+            ready.set()
+            loop.run_forever()
+
+        thread = threading.Thread(
+            target=_run_loop, name="cv-pipeline-loop", daemon=True
+        )
+        thread.start()
+        ready.wait()
+
+        self._loop = loop
+        self._thread = thread
+        self._slots = threading.Semaphore(self.max_in_flight)
+        self._pending = set()
+        self._pid = os.getpid()
+        logger.info(
+            f"Started pipeline event loop in process {self._pid} "
+            f"(max in flight: {self.max_in_flight})"
+        )
+
+    def _ensure_started(self) -> asyncio.AbstractEventLoop:
+        # A loop inherited through fork() has no running thread behind it
+        if self._loop is None or self._pid != os.getpid():
+            with self._lock:
+                if self._loop is None or self._pid != os.getpid():
+                    self._start()
+        return self._loop
+
+    def _finished(self, future: Future):
+        with self._lock:
+            self._pending.discard(future)
+        self._slots.release()
+        # Nobody waits on the future, so this is where a failure surfaces
+        if not future.cancelled() and future.exception() is not None:
+            logger.error(f"Pipeline coroutine failed: {future.exception()!r}")
+
+    def submit(self, coro: Coroutine) -> Future:
+        """
+        Schedule a coroutine on the shared loop without waiting for it
+
+        Blocks only while max_in_flight coroutines are already running.
+
+        Args:
+            coro: Coroutine to execute
+
+        Returns:
+            Future for the coroutine's result
+        """
+        loop = self._ensure_started()
+        self._slots.acquire()
+        future = asyncio.run_coroutine_threadsafe(coro, loop)
+        with self._lock:
+            self._pending.add(future)
+        future.add_done_callback(self._finished)
+        return future
+
+    @property
+    def in_flight(self) -> int:
+        """Coroutines submitted by this process that have not finished"""
+        if self._pid != os.getpid():
+            return 0
+        return len(self._pending)
+
+    def shutdown(self, timeout: Optional[float] = None):
+        """
+        Let submitted coroutines finish, then stop the loop thread
+
+        Args:
+            timeout: Seconds to wait for in-flight coroutines before stopping
+        """
+        if self._loop is None or self._pid != os.getpid():
+            return
+        with self._lock:
+            pending = set(self._pending)
+        if pending:
+            logger.info(f"Waiting for {len(pending)} in-flight pipelines to finish")
+            _, not_done = wait(pending, timeout=timeout)
+            if not_done:
+                logger.warning(f"Stopping pipeline loop with {len(not_done)} pipelines unfinished")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        if self._thread:
+            self._thread.join(timeout=5)
+        self._loop = None
+        self._thread = None
+
+
+# Singleton instance (one loop per worker process)
+cv_pipeline_runner = AsyncTaskRunner(max_in_flight=settings.CV_PIPELINE_MAX_IN_FLIGHT)
+atexit.register(cv_pipeline_runner.shutdown, settings.CV_PIPELINE_SHUTDOWN_TIMEOUT)
@@ -0,0 +1,247 @@
+"""
+Batch Counters - live per-batch CV status counts in Redis
+Lets queue status be read without aggregating the batch's rows in Postgres
+"""
+
+import time
+import redis
+from typing import Dict, Optional
+from app.core.config import settings
+from app.models.job import CVStatus
+import logging
+
+logger = logging.getLogger(__name__)
+
+TRACKED_STATUSES = (
+    CVStatus.QUEUED,
+    CVStatus.PROCESSING,
+    CVStatus.COMPLETED,
+    CVStatus.FAILED,
+)
+
+# Transitions kept per batch for replay onto a re-seed (only those logged
+# while the Postgres aggregate runs are needed)
+JOURNAL_MAX_ENTRIES = 1000
+
+# Apply a status transition only to counters that were seeded from Postgres,
+# so a missing hash is never half-populated by increments. Either way the
+# version is bumped and the transition journaled, so a re-seed aggregated
+# meanwhile can replay it.
+TRANSITION_SCRIPT = """
+local version = redis.call("incr", KEYS[2])
+redis.call("expire", KEYS[2], ARGV[4])
+redis.call("rpush", KEYS[3], cjson.encode({version, ARGV[1], ARGV[2], ARGV[3]}))
+redis.call("ltrim", KEYS[3], -tonumber(ARGV[5]), -1)
+redis.call("expire", KEYS[3], ARGV[4])
+if redis.call("exists", KEYS[1]) == 0 then
+    return 0
+end
+if ARGV[1] ~= "" then
+    redis.call("hincrby", KEYS[1], ARGV[1], -1)
+end
+if ARGV[2] ~= "" then
+    redis.call("hincrby", KEYS[1], ARGV[2], 1)
+end
+if ARGV[3] ~= "" then
+    redis.call("hincrbyfloat", KEYS[1], "duration_sum", ARGV[3])
+    redis.call("hincrby", KEYS[1], "duration_count", 1)
+end
+return 1
+"""
+
+# Replace the counters with a Postgres snapshot plus every transition
+# journaled since the version was read before aggregating (the snapshot may
+# have missed them). A reset since then, or a journal that no longer reaches
+# back that far, leaves nothing safe to replay: the next read aggregates again.
+STORE_SCRIPT = """
+local since = tonumber(ARGV[1])
+local current = tonumber(redis.call("get", KEYS[2]) or "0")
+local pending = {}
+for _, raw in ipairs(redis.call("lrange", KEYS[3], 0, -1)) do
+    local entry = cjson.decode(raw)
+    if entry[1] > since then
+        table.insert(pending, entry)
+    end
+end
+if #pending ~= current - since then
+    return 0
+end
+redis.call("del", KEYS[1])
+for i = 3, #ARGV, 2 do
+    redis.call("hset", KEYS[1], ARGV[i], ARGV[i + 1])
+end
+for _, entry in ipairs(pending) do
+    if entry[2] ~= "" then
+        redis.call("hincrby", KEYS[1], entry[2], -1)
+    end
+    if entry[3] ~= "" then
+        redis.call("hincrby", KEYS[1], entry[3], 1)
+    end
+    if entry[4] ~= "" then
+        redis.call("hincrbyfloat", KEYS[1], "duration_sum", entry[4])
+        redis.call("hincrby", KEYS[1], "duration_count", 1)
+    end
+end
+redis.call("expire", KEYS[1], ARGV[2])
+return 1
+"""
+
+
+class BatchCounters:
+    """
+    Atomic status counters per batch, kept in one Redis hash
+
+    Fields: queued, processing, completed, failed, plus duration_sum and
+    duration_count over completed CVs. Workers apply each status change with
+    a single script call. Transitions that happen outside the tracked paths
+    (manual status edits, deletions) reset the hash, and the hash is re-seeded
+    from Postgres every BATCH_COUNTERS_RECONCILE_SECONDS so any drift is
+    short-lived. Every transition bumps a version key and is journaled, so a
+    re-seed replays the transitions made since before its Postgres read
+    instead of losing them; only a reset in between discards the re-seed.
+    """
+
+    def __init__(self):
+        try:
+            self.redis_client = redis.from_url(settings.REDIS_URL, decode_responses=True)
+            self._transition = self.redis_client.register_script(TRANSITION_SCRIPT)
+            self._store = self.redis_client.register_script(STORE_SCRIPT)
+        except Exception as e:
+            logger.error(f"Failed to initialize batch counters: {e}")
+            self.redis_client = None
+
+    @staticmethod
+    def _key(batch_id: str) -> str:
+        return f"batch:{batch_id}:counters"
+
+    @staticmethod
+    def _version_key(batch_id: str) -> str:
+        return f"batch:{batch_id}:counters:version"
+
+    @staticmethod
+    def _journal_key(batch_id: str) -> str:
+        return f"batch:{batch_id}:counters:journal"
+
+    def _keys(self, batch_id: str):
+        return [self._key(batch_id), self._version_key(batch_id), self._journal_key(batch_id)]
+
+    def transition(
+        self,
+        batch_id: str,
+        from_status: Optional[CVStatus],
+        to_status: Optional[CVStatus],
+        duration_seconds: Optional[float] = None,
+    ):
+        """
+        Move one CV between status counters
+
+        Args:
+            batch_id: Batch UUID
+            from_status: Previous status (None for a new CV)
+            to_status: New status (None for a removed CV)
+            duration_seconds: Processing time to add to the average (completions)
+        """
+        if not self.redis_client:
+            return
+
+        def field(status: Optional[CVStatus]) -> str:
+            return status.value if status in TRACKED_STATUSES else ""
+
+        try:
+            self._transition(
+                keys=self._keys(batch_id),
+                args=[
+                    field(from_status),
+                    field(to_status),
+                    "" if duration_seconds is None else repr(float(duration_seconds)),
+                    settings.BATCH_COUNTERS_TTL,
+                    JOURNAL_MAX_ENTRIES,
+                ],
+            )
+        except Exception as e:
+            logger.error(f"Failed to update batch counters for {batch_id}: {e}")
+
+    def read(self, batch_id: str) -> Optional[Dict[str, float]]:
+        """
+        Current counters, or None if they are missing or due for reconciliation
+        """
+        if not self.redis_client:
+            return None
+        try:
+            counters = self.redis_client.hgetall(self._key(batch_id))
+        except Exception as e:
+            logger.error(f"Failed to read batch counters for {batch_id}: {e}")
+            return None
+
+        if not counters:
+            return None
+        reconciled_at = float(counters.get("reconciled_at", 0))
+        if time.time() - reconciled_at > settings.BATCH_COUNTERS_RECONCILE_SECONDS:
+            return None
+
+        return {
+            **{status.value: int(counters.get(status.value, 0)) for status in TRACKED_STATUSES},
+            "other": int(counters.get("other", 0)),
+            "duration_sum": float(counters.get("duration_sum", 0)),
+            "duration_count": int(counters.get("duration_count", 0)),
+        }
+
+    def version(self, batch_id: str) -> Optional[str]:
+        """Counter version to read before aggregating a snapshot for store()"""
+        if not self.redis_client:
+            return None
+        try:
+            return self.redis_client.get(self._version_key(batch_id)) or "0"
+        except Exception as e:
+            logger.error(f"Failed to read batch counters version for {batch_id}: {e}")
+            return None
+
+    def store(self, batch_id: str, counters: Dict[str, float], version: Optional[str]) -> bool:
+        """
+        Replace the counters with values aggregated from Postgres
+
+        Transitions journaled after version was read are applied on top of
+        the snapshot. One committed before the aggregate but journaled after
+        the version read is counted twice until the next re-seed.
+
+        Args:
+            batch_id: Batch UUID
+            counters: Snapshot aggregated from Postgres
+            version: version() read before the snapshot was aggregated
+
+        Returns:
+            Whether the snapshot was stored (False after a reset meanwhile)
+        """
+        if not self.redis_client or version is None:
+            return False
+        fields = {**counters, "reconciled_at": time.time()}
+        try:
+            return bool(self._store(
+                keys=self._keys(batch_id),
+                args=[
+                    version,
+                    settings.BATCH_COUNTERS_TTL,
+                    *[item for name, value in fields.items() for item in (name, value)],
+                ],
+            ))
+        except Exception as e:
+            logger.error(f"Failed to store batch counters for {batch_id}: {e}")
+            return False
+
+    def reset(self, batch_id: str):
+        """Drop the counters so the next read re-seeds them from Postgres"""
+        if not self.redis_client:
+            return
+        try:
+            # Dropping the journal as well makes a racing re-seed fail
+            pipe = self.redis_client.pipeline()
+            pipe.delete(self._key(batch_id), self._journal_key(batch_id))
+            pipe.incr(self._version_key(batch_id))
+            pipe.expire(self._version_key(batch_id), settings.BATCH_COUNTERS_TTL)
+            pipe.execute()
+        except Exception as e:
+            logger.error(f"Failed to reset batch counters for {batch_id}: {e}")
+
+
+# Singleton instance
+batch_counters = BatchCounters()
@@ -1,6 +1,11 @@
+import asyncio
 import json
 import logging
-from typing import Any, Callable, Optional, Union
+import time
+import uuid
+from collections import OrderedDict
+from fnmatch import fnmatchcase
+from typing import Any, Callable, Dict, Optional, Set, Tuple, Union
 from functools import wraps
 import hashlib
 from datetime import timedelta
@@ -8,52 +13,222 @@ from datetime import timedelta
 from fastapi import Request, Response
 from redis import asyncio as aioredis
 from app.core.config import settings
+from app.core.cache_codec import CacheCodec
+from app.core.cache_metrics import CacheMetrics
+from app.database import SessionLocal
 
 logger = logging.getLogger(__name__)
 
 
+# Delete the lock only if we still own it
+RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+def _is_envelope(entry: Any) -> bool:
+    """Whether a cached value is a cache_response entry"""
+    return isinstance(entry, dict) and "fresh_until" in entry and "value" in entry
+
+
+class LocalCache:
+    """
+    Bounded in-process LRU/TTL tier in front of Redis
+
+    Holds decoded values so hits skip both the Redis round trip and
+    json.loads. Entries are evicted least-recently-used first once either
+    the entry count or the approximate byte size (serialized payload size
+    before compression) exceeds its limit. Only touched from the event loop.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        self._entries: "OrderedDict[str, Tuple[float, Any, int]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value, _ = entry
+        if expires_at <= time.monotonic():
+            self.delete(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, ttl: float, size: int):
+        if ttl <= 0 or size > self.max_bytes:
+            return
+        self.delete(key)
+        self._entries[key] = (time.monotonic() + ttl, value, size)
+        self.size_bytes += size
+        while self._entries and (
+            len(self._entries) > self.max_entries or self.size_bytes > self.max_bytes
+        ):
+            _, (_, _, evicted_size) = self._entries.popitem(last=False)
+            self.size_bytes -= evicted_size
+
+    @property
+    def entry_count(self) -> int:
+        return len(self._entries)
+
+    def delete(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry:
+            self.size_bytes -= entry[2]
+
+    def delete_pattern(self, pattern: str):
+        for key in [key for key in self._entries if fnmatchcase(key, pattern)]:
+            self.delete(key)
+
+    def clear(self):
+        self._entries.clear()
+        self.size_bytes = 0
+
+
 class CacheService:
     def __init__(self):
         self.redis: Optional[aioredis.Redis] = None
         self.default_ttl = 300  # 5 minutes
+        self.local: Optional[LocalCache] = (
+            LocalCache(settings.CACHE_LOCAL_MAX_ENTRIES, settings.CACHE_LOCAL_MAX_BYTES)
+            if settings.CACHE_LOCAL_ENABLED
+            else None
+        )
+        self.codec = CacheCodec(
+            serializer=settings.CACHE_SERIALIZER,
+            compression=settings.CACHE_COMPRESSION,
+            compress_min_bytes=settings.CACHE_COMPRESS_MIN_BYTES,
+            compression_level=settings.CACHE_COMPRESSION_LEVEL,
+        )
+        self._instance_id = uuid.uuid4().hex
+        self._listener: Optional[asyncio.Task] = None
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._refreshes: Set[asyncio.Task] = set()
+        self.metrics = CacheMetrics()
 
     async def connect(self):
         if not self.redis:
             self.redis = aioredis.from_url(
-                settings.REDIS_URL, encoding="utf-8", decode_responses=True
+                settings.REDIS_URL, decode_responses=False
             )
             logger.info("Connected to Redis")
+        if self.local and not self._listener:
+            self._listener = asyncio.create_task(self._listen_for_invalidations())
 
     async def close(self):
+        tasks = list(self._refreshes)
+        if self._listener:
+            tasks.append(self._listener)
+            self._listener = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
         if self.redis:
-            await self.redis.close()
+            await self.redis.aclose()
             self.redis = None
 
-    async def get(self, key: str) -> Optional[Any]:
+    async def _listen_for_invalidations(self):
+        """Apply invalidations published by other replicas to the local tier"""
+        while True:
+            pubsub = self.redis.pubsub()
+            try:
+                await pubsub.subscribe(settings.CACHE_INVALIDATION_CHANNEL)
+                # Anything published while we were not subscribed is lost
+                self.local.clear()
+                async for message in pubsub.listen():
+                    if message["type"] != "message":
+                        continue
+                    event = json.loads(message["data"])
+                    if event.get("origin") != self._instance_id:
+                        self._apply_invalidation(event)
+            except asyncio.CancelledError:
+                await pubsub.aclose()
+                raise
+            except Exception as e:
+                logger.error(f"Cache invalidation listener error: {e}")
+                await pubsub.aclose()
+                await asyncio.sleep(1)
+
+    def _apply_invalidation(self, event: dict):
+        if event["kind"] == "keys":
+            for key in event["keys"]:
+                self.local.delete(key)
+        elif event["kind"] == "pattern":
+            self.local.delete_pattern(event["pattern"])
+
+    async def _publish_invalidation(self, **event):
+        """Drop matching local entries here and on every other replica"""
+        if not self.local:
+            return
+        self._apply_invalidation(event)
+        try:
+            await self.redis.publish(
+                settings.CACHE_INVALIDATION_CHANNEL,
+                json.dumps({"origin": self._instance_id, **event}),
+            )
+        except Exception as e:
+            logger.error(f"Redis publish error: {e}")
+
+    async def get(self, key: str, namespace: str = "other") -> Optional[Any]:
         if not self.redis:
             await self.connect()
+        if self.local:
+            value = self.local.get(key)
+            if value is not None:
+                logger.debug(f"Cache LOCAL HIT: {key}")
+                self.metrics.incr(namespace, "local_reads")
+                return value
         try:
-            data = await self.redis.get(key)
+            start = time.perf_counter()
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.get(key)
+                pipe.pttl(key)
+                data, ttl_ms = await pipe.execute()
+            self.metrics.observe(namespace, "redis_get_seconds", time.perf_counter() - start)
             if data:
-                logger.info(f"Cache HIT: {key}")
-                return json.loads(data)
+                logger.debug(f"Cache HIT: {key}")
+                self.metrics.incr(namespace, "bytes_read", len(data))
+                value, size = self.codec.decode_sized(data)
+                if self.local and ttl_ms and ttl_ms > 0:
+                    self.local.set(
+                        key,
+                        value,
+                        min(ttl_ms / 1000, settings.CACHE_LOCAL_TTL),
+                        size,
+                    )
+                return value
             else:
-                logger.info(f"Cache MISS: {key}")
+                logger.debug(f"Cache MISS: {key}")
         except Exception as e:
             logger.error(f"Redis get error: {e}")
+            self.metrics.incr(namespace, "errors")
         return None
 
-    async def set(self, key: str, value: Any, ttl: int = None):
+    async def set(self, key: str, value: Any, ttl: int = None, namespace: str = "other"):
         if not self.redis:
             await self.connect()
+        ttl = ttl or self.default_ttl
         try:
-            await self.redis.set(
-                key, json.dumps(value, default=str), ex=ttl or self.default_ttl
-            )
+            # A value that can't be serialized just isn't cached
+            data, size = self.codec.encode(value)
+            await self.redis.set(key, data, ex=ttl)
         except Exception as e:
             logger.error(f"Redis set error: {e}")
+            self.metrics.incr(namespace, "errors")
         else:
-            logger.info(f"Cache SET: {key} (ttl={ttl})")
+            logger.debug(f"Cache SET: {key} (ttl={ttl})")
+            self.metrics.incr(namespace, "bytes_written", len(data))
+            if self.local:
+                # Keep the codec round trip so local hits look like Redis hits
+                self.local.set(
+                    key, self.codec.decode(data), min(ttl, settings.CACHE_LOCAL_TTL), size
+                )
 
     async def delete(self, key: str):
         if not self.redis:
@@ -62,9 +237,67 @@ class CacheService:
             await self.redis.delete(key)
         except Exception as e:
             logger.error(f"Redis delete error: {e}")
+        await self._publish_invalidation(kind="keys", keys=[key])
+
+    @staticmethod
+    def _generation_key(user_id: str, namespace: str) -> str:
+        return f"cache:gen:{user_id}:{namespace}"
+
+    async def get_generation(self, user_id: str, namespace: str) -> int:
+        """Current generation of a user's cache namespace (0 if never invalidated)"""
+        if not self.redis:
+            await self.connect()
+        key = self._generation_key(user_id, namespace)
+        if self.local:
+            generation = self.local.get(key)
+            if generation is not None:
+                return generation
+        try:
+            generation = await self.redis.get(key)
+            generation = int(generation) if generation else 0
+        except Exception as e:
+            logger.error(f"Redis get_generation error: {e}")
+            return 0
+        if self.local:
+            self.local.set(key, generation, settings.CACHE_LOCAL_TTL, len(key))
+        return generation
+
+    async def invalidate(self, user_id: Union[str, Any], *namespaces: str):
+        """
+        Invalidate a user's cached responses for the given namespaces
+
+        Bumps one generation counter per namespace instead of scanning for
+        keys; entries written under older generations are never read again
+        and expire on their own TTL. Replicas drop their local copy of the
+        counters through the invalidation channel.
+
+        Args:
+            user_id: Owner of the cached responses
+            namespaces: Cache namespaces (endpoint function names by default)
+        """
+        if not namespaces:
+            return
+        if not self.redis:
+            await self.connect()
+        generation_keys = [
+            self._generation_key(str(user_id), namespace) for namespace in namespaces
+        ]
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for key in generation_keys:
+                    pipe.incr(key)
+                    pipe.expire(key, settings.CACHE_GENERATION_TTL)
+                await pipe.execute()
+        except Exception as e:
+            logger.error(f"Redis invalidate error: {e}")
+        await self._publish_invalidation(kind="keys", keys=generation_keys)
 
     async def delete_pattern(self, pattern: str):
-        """Delete all keys matching a pattern"""
+        """
+        Delete all keys matching a pattern
+
+        Runs a full keyspace SCAN; request paths should use invalidate().
+        """
         if not self.redis:
             await self.connect()
         try:
@@ -75,11 +308,91 @@ class CacheService:
                 await self.redis.delete(*keys)
         except Exception as e:
             logger.error(f"Redis delete_pattern error: {e}")
+        await self._publish_invalidation(kind="pattern", pattern=pattern)
+
+    async def _acquire_lock(self, key: str) -> Optional[str]:
+        """Try to take the short cross-replica recompute lock for a cache key"""
+        token = uuid.uuid4().hex
+        try:
+            acquired = await self.redis.set(
+                f"lock:{key}", token, nx=True, px=settings.CACHE_LOCK_TTL_MS
+            )
+        except Exception as e:
+            logger.error(f"Redis lock error: {e}")
+            return token  # Redis trouble: recompute rather than stall
+        return token if acquired else None
+
+    async def _release_lock(self, key: str, token: str):
+        try:
+            await self.redis.eval(RELEASE_LOCK_SCRIPT, 1, f"lock:{key}", token)
+        except Exception as e:
+            logger.error(f"Redis unlock error: {e}")
+
+    async def _wait_for_entry(self, key: str, namespace: str) -> Optional[dict]:
+        """Poll for an entry another replica is computing, up to CACHE_LOCK_WAIT_SECONDS"""
+        deadline = time.monotonic() + settings.CACHE_LOCK_WAIT_SECONDS
+        while time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+            entry = await self.get(key, namespace)
+            if _is_envelope(entry):
+                return entry
+        return None
+
+    async def _single_flight(self, key: str, compute: Callable) -> Tuple[Any, bool]:
+        """
+        Run compute() once per key in this process
+
+        Concurrent callers for the same key await the leader's result (or
+        exception) instead of running the handler themselves.
+
+        Returns:
+            (result, whether this caller ran compute)
+        """
+        inflight = self._inflight.get(key)
+        if inflight:
+            return await asyncio.shield(inflight), False
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await compute()
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved when nobody was waiting
+            raise
+        else:
+            future.set_result(result)
+            return result, True
+        finally:
+            self._inflight.pop(key, None)
+
+    def _refresh_in_background(self, key: str, compute: Callable):
+        """Run compute() under the key's single-flight lock without anyone awaiting it"""
 
-    def cache_response(self, ttl: int = 300, prefix: str = ""):
+        async def run():
+            try:
+                await self._single_flight(key, compute)
+            except Exception as e:
+                logger.error(f"Background cache refresh of {key} failed: {e}")
+
+        task = asyncio.create_task(run())
+        self._refreshes.add(task)
+        task.add_done_callback(self._refreshes.discard)
+
+    def cache_response(self, ttl: int = 300, prefix: str = "", stale_ttl: int = 0):
         """
         Decorator to cache FastAPI response.
-        Key format: {prefix}:{user_id}:{path}:{sorted_query_params}
+        Key format: cache:{user_id}:{prefix}:g{generation}:{args_hash}
+
+        The generation comes from the user's counter for this prefix, so
+        invalidate(user_id, prefix) makes every cached variant unreachable.
+
+        Misses are coalesced: one request per key and process runs the
+        handler, and a short Redis lock keeps other replicas waiting for its
+        result instead of recomputing. With stale_ttl, entries are kept that
+        much longer past ttl: a stale entry is returned immediately and
+        refreshed by a background task (with its own db session, since the
+        request's is closed once the response is sent).
         """
 
         def decorator(func: Callable):
@@ -88,9 +401,6 @@ class CacheService:
                 # Try to find request and user in kwargs
                 request: Request = kwargs.get("request")
                 current_user = kwargs.get("current_user")
-                
-                print(f"Cache decorator args: {args}")
-                print(f"Cache decorator kwargs keys: {list(kwargs.keys())}")
 
                 # If not explicitly passed, look for them in args (harder with FastAPI dependency injection)
                 # For now, we assume standard pattern where these are available or we skip caching
@@ -115,34 +425,87 @@ class CacheService:
                 arg_str = json.dumps(key_args, sort_keys=True, default=str)
                 arg_hash = hashlib.md5(arg_str.encode()).hexdigest()
 
-                cache_key = f"cache:{user_id}:{key_prefix}:{arg_hash}"
+                generation = await self.get_generation(user_id, key_prefix)
+                cache_key = f"cache:{user_id}:{key_prefix}:g{generation}:{arg_hash}"
 
-                # Try to get from cache
-                cached_data = await self.get(cache_key)
-                if cached_data:
-                    # logger.debug(f"Cache hit: {cache_key}")
+                response = kwargs.get("response")
+
+                def mark(state: str):
                     # Add X-Cache header if response object is available
-                    response = kwargs.get("response")
                     if response:
-                        response.headers["X-Cache"] = "HIT"
-                    return cached_data
+                        response.headers["X-Cache"] = state
+
+                # Try to get from cache
+                entry = await self.get(cache_key, key_prefix)
+                if not _is_envelope(entry):
+                    entry = None
+                if entry and entry["fresh_until"] > time.time():
+                    self.metrics.incr(key_prefix, "hits")
+                    mark("HIT")
+                    return entry["value"]
 
-                # Execute function
-                result = await func(*args, **kwargs)
+                async def refresh(call_kwargs=kwargs):
+                    token = await self._acquire_lock(cache_key)
+                    if not token:
+                        # Another replica is recomputing this key
+                        if entry:
+                            return entry["value"], "STALE"
+                        waited = await self._wait_for_entry(cache_key, key_prefix)
+                        if waited:
+                            return waited["value"], "COALESCED"
+                    try:
+                        # Execute function
+                        start = time.perf_counter()
+                        result = await func(*args, **call_kwargs)
+                        self.metrics.incr(key_prefix, "recomputes")
+                        self.metrics.observe(
+                            key_prefix, "recompute_seconds", time.perf_counter() - start
+                        )
 
-                # Add X-Cache header if response object is available
-                response = kwargs.get("response")
-                if response:
-                    response.headers["X-Cache"] = "MISS"
+                        # Cache result
+                        # Use jsonable_encoder to handle Pydantic models, SQLAlchemy objects, lists, etc.
+                        from fastapi.encoders import jsonable_encoder
+
+                        to_cache = jsonable_encoder(result)
+
+                        await self.set(
+                            cache_key,
+                            {"value": to_cache, "fresh_until": time.time() + ttl},
+                            ttl + stale_ttl,
+                            key_prefix,
+                        )
+                        return result, "MISS"
+                    finally:
+                        if token:
+                            await self._release_lock(cache_key, token)
 
-                # Cache result
-                # Use jsonable_encoder to handle Pydantic models, SQLAlchemy objects, lists, etc.
-                from fastapi.encoders import jsonable_encoder
+                if entry:
+                    # Serve stale now; one background refresh per key and process
+                    if cache_key not in self._inflight:
 
-                to_cache = jsonable_encoder(result)
+                        async def refresh_detached():
+                            if "db" not in kwargs:
+                                return await refresh()
+                            db = SessionLocal()
+                            try:
+                                return await refresh({**kwargs, "db": db})
+                            finally:
+                                db.close()
 
-                await self.set(cache_key, to_cache, ttl)
+                        self._refresh_in_background(cache_key, refresh_detached)
+                    self.metrics.incr(key_prefix, "stale_hits")
+                    mark("STALE")
+                    return entry["value"]
 
+                (result, state), led = await self._single_flight(cache_key, refresh)
+                if not led:
+                    state = "COALESCED"
+                self.metrics.incr(key_prefix, {
+                    "MISS": "misses",
+                    "STALE": "stale_hits",
+                    "COALESCED": "coalesced",
+                }[state])
+                mark("HIT" if state == "COALESCED" else state)
                 return result
 
             return wrapper
@@ -0,0 +1,147 @@
+"""
+Cache Codec - binary serialization and compression for cached values
+
+Payloads start with a 4-byte header: the magic b"CC", one byte for the
+serializer and one for the compression, so entries written with any
+configuration (or the old plain-JSON format) can always be read back.
+"""
+
+import json
+from typing import Any, Tuple, Union
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+try:
+    import lz4.frame
+    LZ4_AVAILABLE = True
+except ImportError:
+    LZ4_AVAILABLE = False
+
+MAGIC = b"CC"
+HEADER_SIZE = 4
+
+SERIALIZERS = {"json": b"j", "orjson": b"o", "msgpack": b"m"}
+COMPRESSIONS = {"none": b"-", "zstd": b"z", "lz4": b"l"}
+
+_AVAILABLE = {
+    "json": True,
+    "orjson": ORJSON_AVAILABLE,
+    "msgpack": MSGPACK_AVAILABLE,
+    "none": True,
+    "zstd": ZSTD_AVAILABLE,
+    "lz4": LZ4_AVAILABLE,
+}
+
+
+def _resolve(name: str, preference: Tuple[str, ...]) -> str:
+    """Pick the configured codec, or the best installed one for "auto" """
+    if name == "auto":
+        return next(option for option in preference if _AVAILABLE[option])
+    if not _AVAILABLE.get(name):
+        fallback = preference[-1]
+        logger.warning(f"Cache codec '{name}' not installed, using '{fallback}'")
+        return fallback
+    return name
+
+
+class CacheCodec:
+    """Encodes cache values to tagged binary payloads and back"""
+
+    def __init__(
+        self,
+        serializer: str = "auto",
+        compression: str = "auto",
+        compress_min_bytes: int = 4096,
+        compression_level: int = 3,
+    ):
+        self.serializer = _resolve(serializer, ("orjson", "msgpack", "json"))
+        self.compression = _resolve(compression, ("zstd", "lz4", "none"))
+        self.compress_min_bytes = compress_min_bytes
+        self.compression_level = compression_level
+
+        if self.compression == "zstd":
+            self._zstd_compressor = zstandard.ZstdCompressor(level=compression_level)
+            self._zstd_decompressor = zstandard.ZstdDecompressor()
+
+    def _serialize(self, value: Any) -> bytes:
+        if self.serializer == "orjson":
+            # Non-str dict keys are stringified, as json.dumps does
+            return orjson.dumps(value, default=str, option=orjson.OPT_NON_STR_KEYS)
+        if self.serializer == "msgpack":
+            return msgpack.packb(value, default=str, use_bin_type=True)
+        return json.dumps(value, default=str).encode()
+
+    def _compress(self, data: bytes) -> bytes:
+        if self.compression == "zstd":
+            return self._zstd_compressor.compress(data)
+        return lz4.frame.compress(data, compression_level=self.compression_level)
+
+    def encode(self, value: Any) -> Tuple[bytes, int]:
+        """
+        Encode a value for Redis
+
+        Returns:
+            (payload, serialized size before compression)
+        """
+        data = self._serialize(value)
+        compression = "none"
+        if self.compression != "none" and len(data) >= self.compress_min_bytes:
+            compressed = self._compress(data)
+            if len(compressed) < len(data):
+                compression = self.compression
+                data, raw_size = compressed, len(data)
+        if compression == "none":
+            raw_size = len(data)
+
+        header = MAGIC + SERIALIZERS[self.serializer] + COMPRESSIONS[compression]
+        return header + data, raw_size
+
+    def decode(self, payload: Union[bytes, str]) -> Any:
+        """Decode a payload written by encode() (or a legacy plain-JSON value)"""
+        return self.decode_sized(payload)[0]
+
+    def decode_sized(self, payload: Union[bytes, str]) -> Tuple[Any, int]:
+        """
+        Decode a payload and report its serialized size before compression
+
+        Returns:
+            (value, serialized size)
+        """
+        if isinstance(payload, str) or not payload.startswith(MAGIC):
+            return json.loads(payload), len(payload)
+
+        serializer, compression = payload[2:3], payload[3:4]
+        # Slice without copying; every decoder below accepts a buffer
+        body: Union[bytes, memoryview] = memoryview(payload)[HEADER_SIZE:]
+
+        if compression == COMPRESSIONS["zstd"]:
+            decompressor = getattr(self, "_zstd_decompressor", None) or zstandard.ZstdDecompressor()
+            body = decompressor.decompress(body)
+        elif compression == COMPRESSIONS["lz4"]:
+            body = lz4.frame.decompress(body)
+        size = len(body)
+
+        if serializer == SERIALIZERS["orjson"]:
+            return orjson.loads(body), size
+        if serializer == SERIALIZERS["msgpack"]:
+            return msgpack.unpackb(body, raw=False, strict_map_key=False), size
+        return json.loads(bytes(body)), size
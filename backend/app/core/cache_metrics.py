@@ -0,0 +1,85 @@
+"""
+Cache Metrics - per-namespace counters for CacheService
+
+Counts are per process (each API replica reports its own) and reset on
+restart; scrape them with the Prometheus text output to aggregate.
+"""
+
+import threading
+from collections import defaultdict
+from typing import Dict
+
+COUNTERS = (
+    "hits",  # Fresh entry served
+    "stale_hits",  # Soft-expired entry served while another request refreshes
+    "coalesced",  # Waited for a concurrent recompute instead of running one
+    "misses",  # Handler ran
+    "local_reads",  # Lookups answered by the in-process tier
+    "errors",
+    "bytes_read",
+    "bytes_written",
+    "recomputes",
+)
+TIMERS = ("redis_get_seconds", "recompute_seconds")
+
+
+class CacheMetrics:
+    """Hit/miss/error/byte counters and latency totals keyed by cache namespace"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        self._max_recompute: Dict[str, float] = defaultdict(float)
+
+    def incr(self, namespace: str, counter: str, amount: float = 1):
+        with self._lock:
+            self._counters[namespace][counter] += amount
+
+    def observe(self, namespace: str, timer: str, seconds: float):
+        """Add a duration to a timer total"""
+        with self._lock:
+            self._counters[namespace][timer] += seconds
+            if timer == "recompute_seconds":
+                self._max_recompute[namespace] = max(self._max_recompute[namespace], seconds)
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """
+        Current counters per namespace, with derived hit ratio and mean recompute time
+
+        Returns:
+            Dictionary of namespace -> metric name -> value
+        """
+        with self._lock:
+            counters = {namespace: dict(values) for namespace, values in self._counters.items()}
+            max_recompute = dict(self._max_recompute)
+
+        result = {}
+        for namespace, values in sorted(counters.items()):
+            stats = {name: values.get(name, 0) for name in COUNTERS + TIMERS}
+            hits = stats["hits"] + stats["stale_hits"] + stats["coalesced"]
+            lookups = hits + stats["misses"]
+            stats["hit_ratio"] = round(hits / lookups, 4) if lookups else 0.0
+            stats["recompute_avg_ms"] = (
+                round(stats["recompute_seconds"] * 1000 / stats["recomputes"], 1)
+                if stats["recomputes"]
+                else 0.0
+            )
+            stats["recompute_max_ms"] = round(max_recompute.get(namespace, 0) * 1000, 1)
+            result[namespace] = stats
+        return result
+
+    def to_prometheus(self) -> str:
+        """Render counters in the Prometheus text exposition format"""
+        snapshot = self.snapshot()
+        lines = []
+        for name in COUNTERS + TIMERS:
+            metric = f"screenflow_cache_{name}_total"
+            lines.append(f"# TYPE {metric} counter")
+            for namespace, stats in snapshot.items():
+                lines.append(f'{metric}{{namespace="{namespace}"}} {stats[name]}')
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._max_recompute.clear()
@@ -3,6 +3,7 @@ Celery configuration for background task processing
 """
 
 from celery import Celery
+from celery.signals import worker_init, worker_process_shutdown, worker_shutdown
 from app.core.config import settings
 
 # Create Celery instance
@@ -20,10 +21,73 @@ celery_app.conf.update(
     timezone="UTC",
     enable_utc=True,
     task_track_started=True,
+    # CV pipeline tasks return once their pipeline is admitted to the worker's
+    # event loop, so this only covers the time until then (including a task
+    # blocked waiting for an in-flight slot). A pipeline lost with its worker
+    # afterwards is re-queued by recover_stuck_cvs, not redelivered by Celery.
     task_acks_late=True,
     worker_prefetch_multiplier=1,  # Process one task at a time for CV parsing
     result_expires=3600,  # Results expire after 1 hour
+    beat_schedule={
+        "recover-stuck-cvs": {
+            "task": "app.tasks.recover_stuck_cvs",
+            "schedule": settings.CV_PIPELINE_RECOVERY_INTERVAL,
+        },
+    },
 )
 
 # Auto-discover tasks
 celery_app.autodiscover_tasks(["app.tasks"])
+
+
+@worker_init.connect
+def _size_db_pool(sender=None, **kwargs):
+    """Size the worker's DB pool for its concurrent CV pipelines"""
+    from app.database import configure_worker_pool
+
+    configure_worker_pool()
+
+
+@worker_shutdown.connect
+@worker_process_shutdown.connect
+def _drain_pipelines(**kwargs):
+    """
+    Let in-flight CV pipelines finish before the worker exits
+
+    Tasks are acked as soon as their pipeline starts, so a pipeline cut off
+    here is not redelivered: the recover_stuck_cvs sweep re-queues its CV
+    after CV_PIPELINE_STUCK_AFTER_SECONDS. worker_shutdown covers the
+    threads and solo pools, worker_process_shutdown prefork children.
+    """
+    from app.core.async_runner import cv_pipeline_runner
+
+    cv_pipeline_runner.shutdown(timeout=settings.CV_PIPELINE_SHUTDOWN_TIMEOUT)
+
+
+@worker_shutdown.connect
+@worker_process_shutdown.connect
+def _flush_llm_usage(**kwargs):
+    """
+    Write buffered LLM usage rows before the worker exits
+
+    Connected after _drain_pipelines so rows recorded by the last pipelines
+    are included. atexit alone is not enough: prefork children leave through
+    os._exit, which skips it.
+    """
+    from app.services.llm_usage_recorder import llm_usage_recorder
+
+    llm_usage_recorder.shutdown()
+
+
+@worker_init.connect
+def _recover_stuck_cvs(sender=None, **kwargs):
+    """Re-queue CVs left PROCESSING by a worker that died (also run by celery beat)"""
+    celery_app.send_task("app.tasks.recover_stuck_cvs")
+
+
+@worker_init.connect
+def _check_batch_capacity(sender=None, **kwargs):
+    """Log once when the configured models can't batch CV matching"""
+    from app.services.cv_jd_matcher import cv_jd_matcher_service
+
+    cv_jd_matcher_service.check_batch_capacity()
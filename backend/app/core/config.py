@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 
 class Settings(BaseSettings):
@@ -9,9 +9,23 @@ class Settings(BaseSettings):
 
     # Database
     DATABASE_URL: str
+    DB_POOL_SIZE: int = 10  # Persistent connections per process
+    DB_MAX_OVERFLOW: int = 20  # Extra connections (Celery workers add one per concurrent pipeline, see app/database.py)
 
     # Redis
     REDIS_URL: str
+    CACHE_GENERATION_TTL: int = 86400  # Must outlive every cached response TTL
+    CACHE_LOCAL_ENABLED: bool = True  # In-process LRU tier in front of Redis
+    CACHE_LOCAL_MAX_ENTRIES: int = 5000
+    CACHE_LOCAL_MAX_BYTES: int = 64 * 1024 * 1024  # Approximate, measured as uncompressed payload size
+    CACHE_LOCAL_TTL: int = 15  # Max seconds a replica serves a local copy (bounds missed pub/sub messages)
+    CACHE_INVALIDATION_CHANNEL: str = "cache:invalidate"
+    CACHE_LOCK_TTL_MS: int = 10000  # Cross-replica recompute lock per cache key
+    CACHE_LOCK_WAIT_SECONDS: float = 2.0  # How long a miss waits for another replica's result
+    CACHE_SERIALIZER: str = "auto"  # auto, orjson, msgpack or json ("auto" picks the fastest installed)
+    CACHE_COMPRESSION: str = "auto"  # auto, zstd, lz4 or none
+    CACHE_COMPRESS_MIN_BYTES: int = 4096  # Smaller payloads are stored uncompressed
+    CACHE_COMPRESSION_LEVEL: int = 3
 
     # Security
     SECRET_KEY: str
@@ -35,6 +49,20 @@ class Settings(BaseSettings):
     AWS_REGION: str = "us-east-1"
     S3_BUCKET_NAME: str
     S3_PRESIGNED_URL_EXPIRATION: int = 3600  # 1 hour
+    S3_PRESIGN_CACHE_SIZE: int = 10000  # Download URLs kept in the local signing cache
+    S3_DOWNLOAD_SPOOL_MAX_BYTES: int = 1024 * 1024  # Streamed downloads roll over to disk above this
+    S3_DOWNLOAD_CHUNK_BYTES: int = 256 * 1024  # Read size when streaming downloads
+    S3_MAX_POOL_CONNECTIONS: int = 50  # HTTP connections kept per S3 client (and async executor threads)
+    S3_CONNECT_TIMEOUT: int = 5  # Seconds
+    S3_READ_TIMEOUT: int = 30  # Seconds
+    S3_MAX_ATTEMPTS: int = 5  # Total attempts per request (adaptive retry mode)
+
+    # AWS Bedrock
+    BEDROCK_MAX_POOL_CONNECTIONS: int = 50  # HTTP connections (and executor threads) for concurrent model calls
+    BEDROCK_CONNECT_TIMEOUT: int = 5  # Seconds
+    BEDROCK_READ_TIMEOUT: int = 300  # Seconds; long generations stream for minutes
+    BEDROCK_MAX_ATTEMPTS: int = 3  # Total attempts per request (standard retry mode; 1 while LLM_GOVERNOR_ENABLED)
+    BEDROCK_PROMPT_CACHING_ENABLED: bool = True  # Cache static system prompts (rubrics) as prompt prefixes
 
     # LLM Configuration
     LLM_PROVIDER: str = "bedrock"  # Options: "bedrock", "openai"
@@ -44,6 +72,58 @@ class Settings(BaseSettings):
     CV_SCORING_METHOD: str = "default"  # Options: "default", "langchain"
     OPENAI_MODEL: str = "gpt-4o-mini"  # Model for LangChain scoring
 
+    # LLM usage telemetry (LLMCall rows are written in the background)
+    LLM_USAGE_FLUSH_INTERVAL: float = 1.0  # Seconds between bulk inserts
+    LLM_USAGE_FLUSH_SIZE: int = 100  # Flush early once this many rows are buffered
+    LLM_USAGE_MAX_BUFFER: int = 10000  # Oldest rows are dropped beyond this (e.g. database down)
+    LLM_STREAMING_ENABLED: bool = True  # Stream CV parsing responses to publish fields as they arrive
+
+    # LLM rate governor (limits shared by all workers through Redis, per provider and model)
+    LLM_GOVERNOR_ENABLED: bool = True
+    LLM_GOVERNOR_RPM: int = 200  # Requests per minute (0 = unlimited)
+    LLM_GOVERNOR_TPM: int = 400000  # Input + output tokens per minute (0 = unlimited)
+    LLM_GOVERNOR_MAX_CONCURRENCY: int = 20  # Calls in flight at once (0 = unlimited)
+    LLM_GOVERNOR_LIMITS: Dict[str, Dict[str, int]] = {}  # Overrides per "provider:model", e.g. {"bedrock:<model id>": {"rpm": 50, "tpm": 100000}}
+    LLM_GOVERNOR_MAX_WAIT_SECONDS: float = 600  # A call queued longer than this fails
+    LLM_GOVERNOR_INTERACTIVE_MAX_WAIT_SECONDS: float = 10  # Same for calls made inside an HTTP request (answered with 429)
+    LLM_GOVERNOR_MAX_THROTTLE_RETRIES: int = 5  # Throttled calls are re-queued this many times
+    LLM_GOVERNOR_THROTTLE_COOLDOWN_MS: int = 2000  # All calls to a throttled model pause this long
+    LLM_GOVERNOR_THROTTLE_DECREASE: float = 0.5  # Rate multiplier applied when throttled
+    LLM_GOVERNOR_MIN_RATE_FACTOR: float = 0.1  # Floor for the adaptive rate multiplier
+    LLM_GOVERNOR_RECOVERY_STEP: float = 0.02  # Rate multiplier regained per successful call
+    LLM_GOVERNOR_LEASE_TTL_SECONDS: int = 900  # Concurrency slots of crashed workers expire after this
+
+    # CV Pipeline (Celery workers)
+    CV_PIPELINE_MAX_IN_FLIGHT: int = 50  # Concurrent CV pipelines per worker process (independent of --concurrency: tasks return once their pipeline is admitted)
+    CV_PIPELINE_SHUTDOWN_TIMEOUT: int = 120  # Seconds a stopping worker waits for in-flight pipelines (keep below the container's stop grace period)
+    CV_PIPELINE_STUCK_AFTER_SECONDS: int = 1800  # A CV PROCESSING this long lost its pipeline (worker crash) and is re-queued; keep well above the slowest pipeline
+    CV_PIPELINE_RECOVERY_INTERVAL: int = 300  # Seconds between stuck-CV sweeps (celery beat; workers also sweep on start)
+    CV_PIPELINE_MAX_ATTEMPTS: int = 3  # Pipeline starts per CV before a stuck CV is marked FAILED instead of re-queued
+    CV_PARSE_BATCH_SIZE: int = 2  # CVs per group task (>1 enables batch mode; ignored unless at least 2 CVs fit per call, see below)
+    CV_PARSE_BATCH_MAX_TOKENS: int = 16000  # Output cap per batched parsing call, clamped to the model's output limit; each call packs cap // CV_PARSE_BATCH_PER_CV_TOKENS CVs
+    CV_PARSE_BATCH_PER_CV_TOKENS: int = 4000  # Output budget per CV in a batched parsing call (the batch prompt trims lists to fit; the default model's 8192 fits two)
+    CV_PARSE_MAX_TOKENS: int = 8000  # Output token cap for a single CV parsing call
+    CV_PARSE_RETRY_MAX_TOKENS: int = 16000  # Cap for the one retry after a truncated/malformed response (clamped to the model's output limit)
+    CV_MATCH_MAX_TOKENS: int = 6000  # Output token cap for a single CV matching call
+    CV_MATCH_BATCH_SIZE: int = 3  # CVs scored against one JD per LLM call in batch matching (at most what the cap below fits)
+    CV_MATCH_BATCH_MAX_TOKENS: int = 16000  # Output cap per batched matching call, clamped to the model's output limit; each call packs cap // CV_MATCH_BATCH_PER_CV_TOKENS CVs
+    CV_MATCH_BATCH_PER_CV_TOKENS: int = 2500  # Output budget per CV in a batched matching call (the batch prompt trims evaluations to fit; the default model's 8192 fits three)
+    CV_MATCH_BATCH_CONCURRENCY: int = 4  # Batched matching calls in flight per batch match task
+    BATCH_COUNTERS_RECONCILE_SECONDS: int = 60  # Re-seed Redis batch counters from Postgres this often
+    BATCH_COUNTERS_TTL: int = 86400  # Idle batch counters expire after a day
+    BATCH_PROGRESS_MAX_EVENTS_PER_SECOND: float = 2  # Batch progress events per batch (updates in between are merged)
+
+    # CV text extraction
+    CV_PDF_MAX_CHARS: int = 60000  # Stop reading pages once this much text is collected
+    CV_PDF_MIN_CHARS_PER_PAGE: int = 200  # Sparser PyPDF2 text layers fall back to pdfplumber
+    CV_PDF_PARALLEL_MIN_PAGES: int = 8  # pdfplumber runs in the process pool from this page count
+    CV_PDF_EXTRACT_WORKERS: int = 2  # Process pool size for pdfplumber page ranges
+    CV_PDF_PAGES_PER_TASK: int = 4  # Pages per process pool task
+    CV_EXTRACT_PDF_CONCURRENCY: int = 4  # Concurrent PDF extractions per process
+    CV_EXTRACT_DOCX_CONCURRENCY: int = 4  # Concurrent DOCX extractions per process
+    CV_EXTRACT_MAX_FILE_BYTES: int = 20 * 1024 * 1024  # Larger files are rejected before extraction
+    CV_EXTRACT_MAX_INFLIGHT_BYTES: int = 100 * 1024 * 1024  # File bytes being extracted at once per process
+
     class Config:
         env_file = ".env"
         case_sensitive = True
@@ -0,0 +1,121 @@
+"""
+Bounded executor for CPU-bound document extraction
+Keeps PDF/DOCX parsing off the event loop with per-format concurrency limits
+and a cap on how many file bytes are being extracted at once
+"""
+
+import asyncio
+import atexit
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, BinaryIO, Callable, Dict, Union
+import logging
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _source_size(file_content: Union[bytes, BinaryIO]) -> int:
+    """Size of raw bytes or a seekable file, without reading it"""
+    if isinstance(file_content, (bytes, bytearray)):
+        return len(file_content)
+    position = file_content.tell()
+    file_content.seek(0, 2)
+    size = file_content.tell()
+    file_content.seek(position)
+    return size
+
+
+class ExtractionPool:
+    """
+    Runs extraction functions in per-format thread pools
+
+    Each format ("pdf", "docx") gets its own bounded pool, so a burst of heavy
+    PDFs cannot starve DOCX extraction (and neither can occupy the loop).
+    Files above max_file_bytes are rejected up front, and the total size of
+    files being extracted concurrently is held under max_inflight_bytes.
+    """
+
+    def __init__(
+        self,
+        lanes: Dict[str, int],
+        max_file_bytes: int,
+        max_inflight_bytes: int,
+    ):
+        self.max_file_bytes = max_file_bytes
+        self.max_inflight_bytes = max_inflight_bytes
+        self._executors = {
+            lane: ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"extract-{lane}")
+            for lane, workers in lanes.items()
+        }
+        self._inflight_bytes = 0
+        self._budget = threading.Condition()
+
+    def _acquire_bytes(self, size: int):
+        # Waits in the pool thread, never on the event loop
+        with self._budget:
+            while self._inflight_bytes and self._inflight_bytes + size > self.max_inflight_bytes:
+                self._budget.wait()
+            self._inflight_bytes += size
+
+    def _release_bytes(self, size: int):
+        with self._budget:
+            self._inflight_bytes -= size
+            self._budget.notify_all()
+
+    def _run_with_budget(self, size: int, func: Callable[..., Any], *args, **kwargs) -> Any:
+        self._acquire_bytes(size)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self._release_bytes(size)
+
+    async def run(
+        self,
+        lane: str,
+        file_content: Union[bytes, BinaryIO],
+        func: Callable[..., Any],
+        *args,
+        **kwargs,
+    ) -> Any:
+        """
+        Run func(file_content, *args, **kwargs) in the lane's pool
+
+        Args:
+            lane: Format lane ("pdf" or "docx")
+            file_content: Raw file bytes or file (its size counts against the budget)
+            func: Synchronous extraction function
+
+        Returns:
+            The function's return value (exceptions are re-raised)
+        """
+        size = _source_size(file_content)
+        if size > self.max_file_bytes:
+            raise ValueError(
+                f"File too large to extract ({size} bytes, limit {self.max_file_bytes})"
+            )
+
+        executor = self._executors[lane]
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            executor,
+            lambda: self._run_with_budget(size, func, file_content, *args, **kwargs),
+        )
+
+    def shutdown(self):
+        """Stop the pool threads"""
+        for executor in self._executors.values():
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Singleton instance
+extraction_pool = ExtractionPool(
+    lanes={
+        "pdf": settings.CV_EXTRACT_PDF_CONCURRENCY,
+        "docx": settings.CV_EXTRACT_DOCX_CONCURRENCY,
+    },
+    max_file_bytes=settings.CV_EXTRACT_MAX_FILE_BYTES,
+    max_inflight_bytes=settings.CV_EXTRACT_MAX_INFLIGHT_BYTES,
+)
+atexit.register(extraction_pool.shutdown)
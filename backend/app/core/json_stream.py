@@ -0,0 +1,159 @@
+"""
+Incremental JSON scanner for streamed LLM responses
+Reports scalar values as soon as they are complete, so fields such as the
+candidate's name can be shown while the rest of the document is generated,
+and notices responses that are not (or no longer) valid JSON early
+"""
+
+import json
+from typing import Any, List, Optional, Tuple, Union
+
+Path = Tuple[Union[str, int], ...]
+
+_LITERAL_CHARS = set("0123456789+-.eEtruefalsn")
+
+
+class JSONStreamError(ValueError):
+    """The streamed text cannot be (the start of) a JSON document"""
+
+
+class _Container:
+    __slots__ = ("is_object", "key", "index", "expect_key")
+
+    def __init__(self, is_object: bool):
+        self.is_object = is_object
+        self.key: Optional[str] = None
+        self.index = 0
+        self.expect_key = is_object
+
+
+class IncrementalJSONScanner:
+    """
+    Feeds text chunks through a JSON tokenizer without building the document
+
+    Leading Markdown code fences (```json) and whitespace are skipped. Every
+    completed string/number/boolean/null value is returned with its path,
+    e.g. (("personal_info", "name"), "Jane Doe"). The scanner does not
+    validate everything json.loads would; the final text is still parsed
+    normally once complete.
+
+    Usage:
+        scanner = IncrementalJSONScanner()
+        for chunk in stream:
+            for path, value in scanner.feed(chunk):
+                ...
+        scanner.complete  # root object/array closed
+
+    Call reset() before feeding a regenerated response to the same scanner.
+    """
+
+    def __init__(self, max_prefix_chars: int = 64):
+        self.max_prefix_chars = max_prefix_chars
+        self.reset()
+
+    def reset(self):
+        """Forget everything fed so far (the response is being regenerated)"""
+        self.started = False
+        self.complete = False
+        self._prefix = ""
+        self._stack: List[_Container] = []
+        self._in_string = False
+        self._escape = False
+        self._buffer: List[str] = []
+        self._literal: List[str] = []
+
+    def _path(self) -> Path:
+        path = []
+        for container in self._stack:
+            path.append(container.key if container.is_object else container.index)
+        return tuple(path)
+
+    def feed(self, chunk: str) -> List[Tuple[Path, Any]]:
+        """
+        Scan the next chunk of text
+
+        Returns:
+            (path, value) for every scalar value completed in this chunk
+
+        Raises:
+            JSONStreamError: If the text cannot be a JSON object/array
+        """
+        values: List[Tuple[Path, Any]] = []
+        for char in chunk:
+            if self.complete:
+                break
+            if not self.started:
+                self._scan_prefix(char)
+            elif self._in_string:
+                self._scan_string(char, values)
+            else:
+                self._scan_structure(char, values)
+        return values
+
+    def _scan_prefix(self, char: str):
+        if char in "{[":
+            self.started = True
+            self._stack.append(_Container(char == "{"))
+            return
+        self._prefix += char
+        prefix = self._prefix.strip()
+        # Only an optional code fence ("```json") may precede the document
+        if prefix and not ("```json".startswith(prefix) or prefix.startswith("```")):
+            raise JSONStreamError(f"Response does not start with JSON: {prefix[:40]!r}")
+        if len(self._prefix) > self.max_prefix_chars:
+            raise JSONStreamError("No JSON document found at the start of the response")
+
+    def _scan_string(self, char: str, values: List[Tuple[Path, Any]]):
+        if self._escape:
+            self._buffer.append(char)
+            self._escape = False
+        elif char == "\\":
+            self._buffer.append(char)
+            self._escape = True
+        elif char == '"':
+            self._in_string = False
+            text = json.loads('"' + "".join(self._buffer) + '"')
+            self._buffer = []
+            container = self._stack[-1]
+            if container.is_object and container.expect_key:
+                container.key = text
+                container.expect_key = False
+            else:
+                values.append((self._path(), text))
+        else:
+            self._buffer.append(char)
+
+    def _scan_structure(self, char: str, values: List[Tuple[Path, Any]]):
+        if self._literal and char not in _LITERAL_CHARS:
+            self._finish_literal(values)
+
+        if char in " \t\r\n:":
+            return
+        if char == '"':
+            self._in_string = True
+        elif char in "{[":
+            self._stack.append(_Container(char == "{"))
+        elif char in "}]":
+            if not self._stack or self._stack[-1].is_object != (char == "}"):
+                raise JSONStreamError(f"Unbalanced {char!r} in response")
+            self._stack.pop()
+            if not self._stack:
+                self.complete = True
+        elif char == ",":
+            container = self._stack[-1]
+            if container.is_object:
+                container.expect_key = True
+            else:
+                container.index += 1
+        elif char in _LITERAL_CHARS:
+            self._literal.append(char)
+        else:
+            raise JSONStreamError(f"Unexpected {char!r} in response")
+
+    def _finish_literal(self, values: List[Tuple[Path, Any]]):
+        text = "".join(self._literal)
+        self._literal = []
+        try:
+            values.append((self._path(), json.loads(text)))
+        except json.JSONDecodeError:
+            raise JSONStreamError(f"Invalid literal {text!r} in response")
@@ -0,0 +1,301 @@
+"""
+LLM Rate Governor - distributed request/token buckets and concurrency slots
+Keeps every worker's LLM calls within the provider quota per model, so load
+above the quota queues up instead of failing with throttling errors
+"""
+
+import asyncio
+import random
+import time
+import uuid
+import weakref
+from typing import Dict, Optional, Tuple
+from redis import asyncio as aioredis
+from app.core.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Poll interval while every concurrency slot is taken
+SLOT_POLL_MS = 250
+
+# Refill both buckets for the elapsed time, then take one request and the
+# estimated tokens plus a concurrency slot - or report how long to wait.
+# Capacities scale with the adaptive rate factor lowered on throttling.
+# Returns {wait_ms, tokens charged} (estimates above the bucket size are
+# charged as a full bucket, so release must refund against that amount).
+ACQUIRE_SCRIPT = """
+local time = redis.call("time")
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local rpm = tonumber(ARGV[1])
+local tpm = tonumber(ARGV[2])
+local max_concurrency = tonumber(ARGV[3])
+local requested = tonumber(ARGV[4])
+local lease_ttl_ms = tonumber(ARGV[6])
+
+local state = redis.call("hmget", KEYS[1], "requests", "tokens", "ts", "factor", "cooldown_until")
+local factor = tonumber(state[4]) or 1
+local rpm_cap = rpm * factor
+local tpm_cap = tpm * factor
+local requests = tonumber(state[1]) or rpm_cap
+local tokens = tonumber(state[2]) or tpm_cap
+local elapsed = math.max(now - (tonumber(state[3]) or now), 0)
+local cooldown_until = tonumber(state[5]) or 0
+
+local wait = 0
+if cooldown_until > now then
+    wait = cooldown_until - now
+end
+if rpm > 0 then
+    requests = math.min(rpm_cap, requests + elapsed * rpm_cap / 60000)
+    if requests < 1 then
+        wait = math.max(wait, (1 - requests) * 60000 / rpm_cap)
+    end
+end
+if tpm > 0 then
+    tokens = math.min(tpm_cap, tokens + elapsed * tpm_cap / 60000)
+    requested = math.min(requested, tpm_cap)
+    if tokens < requested then
+        wait = math.max(wait, (requested - tokens) * 60000 / tpm_cap)
+    end
+end
+if max_concurrency > 0 then
+    redis.call("zremrangebyscore", KEYS[2], "-inf", now)
+    if redis.call("zcard", KEYS[2]) >= max_concurrency then
+        wait = math.max(wait, tonumber(ARGV[7]))
+    end
+end
+
+if wait <= 0 then
+    if rpm > 0 then
+        requests = requests - 1
+    end
+    if tpm > 0 then
+        tokens = tokens - requested
+    end
+    if max_concurrency > 0 then
+        redis.call("zadd", KEYS[2], now + lease_ttl_ms, ARGV[5])
+        redis.call("pexpire", KEYS[2], lease_ttl_ms)
+    end
+end
+redis.call("hset", KEYS[1], "requests", requests, "tokens", tokens, "ts", now)
+redis.call("pexpire", KEYS[1], 3600000)
+return {math.ceil(wait), math.floor(requested)}
+"""
+
+# Free the slot, correct the token bucket from the estimate to actual usage
+# and, after a success, win back some of the rate lost to throttling
+RELEASE_SCRIPT = """
+redis.call("zrem", KEYS[2], ARGV[1])
+if redis.call("exists", KEYS[1]) == 0 then
+    return 0
+end
+local state = redis.call("hmget", KEYS[1], "tokens", "factor")
+local factor = tonumber(state[2]) or 1
+local tpm = tonumber(ARGV[2])
+if tpm > 0 and state[1] then
+    local tokens = math.min(tonumber(state[1]) + tonumber(ARGV[3]), tpm * factor)
+    redis.call("hset", KEYS[1], "tokens", tokens)
+end
+if factor < 1 and tonumber(ARGV[4]) > 0 then
+    redis.call("hset", KEYS[1], "factor", math.min(1, factor + tonumber(ARGV[4])))
+end
+return 1
+"""
+
+# Lower the rate factor and pause the model. Throttling reported by many
+# callers at once counts once per cooldown window.
+THROTTLE_SCRIPT = """
+local time = redis.call("time")
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local state = redis.call("hmget", KEYS[1], "factor", "cooldown_until")
+local factor = tonumber(state[1]) or 1
+if (tonumber(state[2]) or 0) > now then
+    return tostring(factor)
+end
+factor = math.max(tonumber(ARGV[2]), factor * tonumber(ARGV[1]))
+redis.call(
+    "hset", KEYS[1],
+    "factor", factor,
+    "cooldown_until", now + tonumber(ARGV[3]),
+    "requests", 0,
+    "tokens", 0,
+    "ts", now
+)
+redis.call("pexpire", KEYS[1], 3600000)
+return tostring(factor)
+"""
+
+
+class LLMQueueTimeout(Exception):
+    """Capacity for an LLM call did not free up before the caller's deadline"""
+
+
+class LLMRateGovernor:
+    """
+    Token-bucket rate limiter and concurrency limiter shared through Redis
+
+    Each provider/model gets a requests-per-minute bucket, a tokens-per-minute
+    bucket (charged with an estimate up front and corrected to actual usage
+    afterwards) and a set of leased concurrency slots. When the provider
+    throttles anyway, the buckets shrink (multiplicatively, down to
+    LLM_GOVERNOR_MIN_RATE_FACTOR) and all calls pause for a cooldown; every
+    successful call then grows them back by LLM_GOVERNOR_RECOVERY_STEP. The
+    governor fails open: if Redis is unavailable, calls go straight through.
+    """
+
+    def __init__(self):
+        # Async clients are bound to the event loop they connect on, and both
+        # the API server and each worker's pipeline runner have their own
+        self._scripts_by_loop: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    def _scripts(self) -> Optional[Dict]:
+        """Lua scripts registered on the running loop's Redis client"""
+        loop = asyncio.get_running_loop()
+        scripts = self._scripts_by_loop.get(loop)
+        if scripts is None:
+            try:
+                client = aioredis.from_url(settings.REDIS_URL, decode_responses=True)
+                scripts = {
+                    "acquire": client.register_script(ACQUIRE_SCRIPT),
+                    "release": client.register_script(RELEASE_SCRIPT),
+                    "throttle": client.register_script(THROTTLE_SCRIPT),
+                }
+            except Exception as e:
+                logger.error(f"Failed to initialize LLM rate governor: {e}")
+                return None
+            self._scripts_by_loop[loop] = scripts
+        return scripts
+
+    @staticmethod
+    def _keys(provider: str, model: str):
+        base = f"llm:governor:{provider}:{model}"
+        return [base, f"{base}:leases"]
+
+    @staticmethod
+    def limits(provider: str, model: str) -> Dict[str, int]:
+        """Configured rpm/tpm/concurrency for a provider and model"""
+        overrides = settings.LLM_GOVERNOR_LIMITS.get(f"{provider}:{model}", {})
+        return {
+            "rpm": overrides.get("rpm", settings.LLM_GOVERNOR_RPM),
+            "tpm": overrides.get("tpm", settings.LLM_GOVERNOR_TPM),
+            "concurrency": overrides.get("concurrency", settings.LLM_GOVERNOR_MAX_CONCURRENCY),
+        }
+
+    async def acquire(
+        self, provider: str, model: str, tokens: int, deadline: float
+    ) -> Tuple[Optional[str], int]:
+        """
+        Wait until the call fits the model's rate and concurrency limits
+
+        Args:
+            provider: LLM provider name
+            model: Model ID
+            tokens: Estimated input + output tokens of the call
+            deadline: time.time() after which to give up
+
+        Returns:
+            (lease ID, tokens charged) to pass to release(); the lease ID is
+            None if the call is not governed
+
+        Raises:
+            LLMQueueTimeout: If the deadline passes first
+        """
+        scripts = self._scripts()
+        if not scripts:
+            return None, tokens
+
+        limits = self.limits(provider, model)
+        lease_id = uuid.uuid4().hex
+        waited = 0.0
+        while True:
+            try:
+                wait_ms, charged = await scripts["acquire"](
+                    keys=self._keys(provider, model),
+                    args=[
+                        limits["rpm"],
+                        limits["tpm"],
+                        limits["concurrency"],
+                        tokens,
+                        lease_id,
+                        settings.LLM_GOVERNOR_LEASE_TTL_SECONDS * 1000,
+                        SLOT_POLL_MS,
+                    ],
+                )
+            except Exception as e:
+                logger.error(f"LLM rate governor unavailable, calling {model} ungoverned: {e}")
+                return None, tokens
+
+            if not wait_ms:
+                if waited:
+                    logger.info(f"LLM call to {model} waited {waited:.1f}s for capacity")
+                return lease_id, charged
+
+            # Jitter keeps queued callers from retrying in lockstep
+            delay = wait_ms / 1000 * random.uniform(1.0, 1.2)
+            if time.time() + delay > deadline:
+                raise LLMQueueTimeout(
+                    f"No capacity for {provider}:{model} within "
+                    f"{waited + max(deadline - time.time(), 0):.0f}s"
+                )
+            await asyncio.sleep(delay)
+            waited += delay
+
+    async def release(
+        self,
+        provider: str,
+        model: str,
+        lease_id: Optional[str],
+        charged_tokens: int,
+        used_tokens: Optional[int],
+        success: bool,
+    ):
+        """
+        Return the concurrency slot and settle the token estimate
+
+        Args:
+            lease_id: Value returned by acquire()
+            charged_tokens: Tokens charged by acquire()
+            used_tokens: Actual input + output tokens (None keeps the estimate)
+            success: Whether the call succeeded (recovers the rate factor)
+        """
+        scripts = self._scripts() if lease_id is not None else None
+        if not scripts:
+            return
+        adjustment = 0 if used_tokens is None else charged_tokens - used_tokens
+        try:
+            await scripts["release"](
+                keys=self._keys(provider, model),
+                args=[
+                    lease_id,
+                    self.limits(provider, model)["tpm"],
+                    adjustment,
+                    settings.LLM_GOVERNOR_RECOVERY_STEP if success else 0,
+                ],
+            )
+        except Exception as e:
+            logger.error(f"Failed to release LLM rate governor lease for {model}: {e}")
+
+    async def throttled(self, provider: str, model: str):
+        """Back off after the provider rejected a call for exceeding its quota"""
+        scripts = self._scripts()
+        if not scripts:
+            return
+        try:
+            factor = await scripts["throttle"](
+                keys=self._keys(provider, model)[:1],
+                args=[
+                    settings.LLM_GOVERNOR_THROTTLE_DECREASE,
+                    settings.LLM_GOVERNOR_MIN_RATE_FACTOR,
+                    settings.LLM_GOVERNOR_THROTTLE_COOLDOWN_MS,
+                ],
+            )
+            logger.warning(f"{provider}:{model} throttled, rate factor now {float(factor):.2f}")
+        except Exception as e:
+            logger.error(f"Failed to record throttling for {model}: {e}")
+
+
+# Singleton instance
+llm_rate_governor = LLMRateGovernor()
@@ -0,0 +1,17 @@
+"""
+Prompt Utilities - provider-neutral helpers for building LLM prompts
+"""
+
+# Rough characters per token of English text and JSON
+CHARS_PER_TOKEN = 4
+
+
+def compact_prompt(prompt: str) -> str:
+    """Strip every line and drop blank ones (the whitespace optimization)"""
+    lines = prompt.split('\n')
+    return '\n'.join(line.strip() for line in lines if line.strip())
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count of a text, for when the provider reports none"""
+    return len(text) // CHARS_PER_TOKEN
@@ -57,6 +57,7 @@ class RateLimits:
     CV_UPLOAD = "50/hour"
     GENERAL_API = "100/minute"
     SEARCH_QUERY = "30/minute"
+    CV_DOWNLOAD_URLS = "60/minute"  # Each call signs up to MAX_DOWNLOAD_URL_CVS CVs
 
     # Admin endpoints
     ADMIN_API = "200/minute"
@@ -4,8 +4,9 @@ Allows Celery tasks to publish events that WebSocket clients receive
 """
 
 import json
+import threading
 import redis
-from typing import Dict, Any
+from typing import Callable, Dict, Any, Tuple
 from app.core.config import settings
 import logging
 
@@ -25,6 +26,10 @@ class RedisEventBus:
             self.redis_client = None
             self.pubsub = None
 
+        # Trailing batch progress flushes scheduled in this process
+        self._trailing: Dict[Tuple[str, str], threading.Timer] = {}
+        self._trailing_lock = threading.Lock()
+
     def publish_cv_progress(
         self,
         user_id: str,
@@ -97,6 +102,124 @@ class RedisEventBus:
         except Exception as e:
             logger.error(f"Failed to publish batch progress: {e}")
 
+    def publish_batch_progress_coalesced(
+        self,
+        user_id: str,
+        batch_id: str,
+        build_queue_status: Callable[[], Dict[str, Any]],
+        final: bool = False,
+    ):
+        """
+        Publish batch progress at most BATCH_PROGRESS_MAX_EVENTS_PER_SECOND times per batch
+
+        The first update in a window is published right away (leading edge),
+        across all workers, via a short Redis lock. Later updates in the same
+        window are merged into one trailing event at the end of the window.
+        That event is built fresh, so it carries every change, including the
+        last CV. Final updates skip the window.
+
+        Args:
+            user_id: User UUID
+            batch_id: Batch UUID
+            build_queue_status: Builds the queue status (only called when publishing)
+            final: Publish immediately (e.g. the batch just finished)
+        """
+        if not self.redis_client:
+            return
+
+        if final or self._claim_progress_window(batch_id):
+            self.publish_batch_progress(user_id, batch_id, build_queue_status())
+            return
+
+        key = (user_id, batch_id)
+        with self._trailing_lock:
+            if key in self._trailing:
+                return
+            timer = threading.Timer(
+                self._progress_window_seconds,
+                self._flush_batch_progress,
+                args=(user_id, batch_id, build_queue_status),
+            )
+            timer.daemon = True
+            self._trailing[key] = timer
+        timer.start()
+
+    @property
+    def _progress_window_seconds(self) -> float:
+        return 1 / settings.BATCH_PROGRESS_MAX_EVENTS_PER_SECOND
+
+    def _claim_progress_window(self, batch_id: str) -> bool:
+        """Take the batch's publish slot for one window (shared by all workers)"""
+        try:
+            return bool(self.redis_client.set(
+                f"batch:{batch_id}:progress_window",
+                1,
+                nx=True,
+                px=int(self._progress_window_seconds * 1000),
+            ))
+        except Exception as e:
+            logger.error(f"Failed to claim batch progress window: {e}")
+            return True
+
+    def _flush_batch_progress(
+        self,
+        user_id: str,
+        batch_id: str,
+        build_queue_status: Callable[[], Dict[str, Any]],
+    ):
+        with self._trailing_lock:
+            self._trailing.pop((user_id, batch_id), None)
+
+        # If another worker holds the window now, it claimed it after our
+        # update and its event already includes it
+        if not self._claim_progress_window(batch_id):
+            return
+        try:
+            self.publish_batch_progress(user_id, batch_id, build_queue_status())
+        except Exception as e:
+            logger.error(f"Failed to flush batch progress: {e}")
+
+    def publish_batch_match_progress(
+        self,
+        user_id: str,
+        batch_id: str,
+        matched: int,
+        failed: int,
+        total: int,
+        **kwargs
+    ):
+        """
+        Publish progress of a batch JD matching run
+
+        Args:
+            user_id: User UUID
+            batch_id: Batch UUID
+            matched: CVs scored so far
+            failed: CVs that could not be scored so far
+            total: CVs in the run
+            **kwargs: Additional data
+        """
+        if not self.redis_client:
+            return
+
+        event = {
+            "type": "batch_match_progress",
+            "user_id": user_id,
+            "batch_id": batch_id,
+            "matched": matched,
+            "failed": failed,
+            "total": total,
+            "progress": int((matched + failed) * 100 / total) if total else 100,
+            **kwargs,
+        }
+
+        try:
+            channel = f"user:{user_id}:events"
+            self.redis_client.publish(channel, json.dumps(event))
+            logger.debug(f"Published batch match progress to {channel}: {matched + failed}/{total}")
+        except Exception as e:
+            logger.error(f"Failed to publish batch match progress: {e}")
+
     def publish_jd_progress(
         self,
         user_id: str,
@@ -0,0 +1,65 @@
+"""
+Stage timing recorder for pipeline progress tracking
+Records real start/end timings per stage and notifies listeners on stage start
+"""
+
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class StageTimer:
+    """
+    Collects per-stage timings for one pipeline run
+
+    Usage:
+        timer = StageTimer(on_stage_start=publish)
+        with timer.stage("EXTRACTING") as entry:
+            text = extract(...)
+            entry["chars"] = len(text)
+
+        cv.processing_stages = timer.to_dict()
+    """
+
+    def __init__(self, on_stage_start: Optional[Callable[[str], None]] = None):
+        self._on_stage_start = on_stage_start
+        self._started = time.perf_counter()
+        self.stages: List[Dict[str, Any]] = []
+
+    @contextmanager
+    def stage(self, name: str, **metadata):
+        """
+        Time a stage. The yielded dict can be annotated with extra metadata
+        """
+        if self._on_stage_start:
+            try:
+                self._on_stage_start(name)
+            except Exception as e:
+                # Progress notifications must never break the pipeline
+                logger.warning(f"Stage start listener failed for {name}: {e}")
+
+        entry: Dict[str, Any] = {
+            "stage": name,
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            **metadata,
+        }
+        start = time.perf_counter()
+        try:
+            yield entry
+        except BaseException:
+            entry["failed"] = True
+            raise
+        finally:
+            entry["duration_ms"] = round((time.perf_counter() - start) * 1000, 1)
+            self.stages.append(entry)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serializable summary for storing alongside the CV"""
+        return {
+            "stages": list(self.stages),
+            "total_ms": round((time.perf_counter() - self._started) * 1000, 1),
+        }
@@ -1,14 +1,37 @@
+import asyncio
+import functools
+from typing import Any, Callable, TypeVar
 from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 from app.core.config import settings
 
-engine = create_engine(settings.DATABASE_URL, pool_pre_ping=True)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+T = TypeVar("T")
+
+
+def _create_engine(max_overflow: int):
+    return create_engine(
+        settings.DATABASE_URL,
+        pool_pre_ping=True,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=max_overflow,
+    )
+
+
+# Workers replace the engine at startup (configure_worker_pool): use
+# get_engine() or SessionLocal instead of importing it
+_engine = _create_engine(settings.DB_MAX_OVERFLOW)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=_engine)
 
 Base = declarative_base()
 
 
+def get_engine() -> Engine:
+    """The process's current engine"""
+    return _engine
+
+
 def get_db():
     """Dependency to get database session."""
     db = SessionLocal()
@@ -16,3 +39,54 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def pipeline_session() -> Session:
+    """
+    Session for a CV pipeline running on a worker's event loop
+
+    Objects are not expired on commit, so the loop thread can read their
+    attributes between run_db() calls without issuing a query.
+    """
+    return SessionLocal(expire_on_commit=False)
+
+
+def release_connection(db: Session):
+    """
+    Return the session's connection to the pool before a slow await (LLM calls)
+
+    Ends a read-only transaction; a session with pending changes is left
+    alone. Loaded objects are expired as on any commit (except in
+    pipeline_session()s), so read the attributes needed during the await
+    before calling this.
+    """
+    if db.in_transaction() and not (db.new or db.dirty or db.deleted):
+        db.commit()
+
+
+async def run_db(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Run blocking session work on the event loop's default executor
+
+    In Celery workers that is the pipeline runner's DB executor (see
+    app/core/async_runner.py), so a slow query only holds up the pipeline
+    that issued it. A session must only be used by one thread at a time:
+    await each call before touching the session again.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, functools.partial(func, *args, **kwargs))
+
+
+def configure_worker_pool():
+    """
+    Make room in the pool for every CV pipeline a Celery worker runs at once
+
+    Each in-flight pipeline holds its own session, so the worker's pool gets
+    one connection per pipeline on top of DB_MAX_OVERFLOW. Called once at
+    worker start, before any connection is checked out; API processes keep
+    the plain DB_POOL_SIZE + DB_MAX_OVERFLOW.
+    """
+    global _engine
+    _engine.dispose()
+    _engine = _create_engine(settings.CV_PIPELINE_MAX_IN_FLIGHT + settings.DB_MAX_OVERFLOW)
+    SessionLocal.configure(bind=_engine)
@@ -2,12 +2,14 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
 from app.api.v1 import api_router
-from app.database import Base, engine
+from app.database import Base, get_engine
 from app.core.rate_limit import limiter, custom_rate_limit_handler
+from app.core.cache import cache_service
+from app.services.llm_usage_recorder import llm_usage_recorder
 from slowapi.errors import RateLimitExceeded
 
 # Create database tables
-Base.metadata.create_all(bind=engine)
+Base.metadata.create_all(bind=get_engine())
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -44,6 +46,13 @@ def root():
     }
 
 
+@app.on_event("shutdown")
+async def shutdown():
+    """Stop the cache invalidation listener, close Redis and flush LLM usage."""
+    await cache_service.close()
+    llm_usage_recorder.shutdown()
+
+
 @app.get("/health")
 def health_check():
     """Health check endpoint."""
@@ -17,6 +17,7 @@ from app.models.jd_builder import (
     LLMCall,
     CVParseDetail,
     GitHubAnalysis,
+    CVJDMatchCache,
     JDStatus,
     JDSource,
     LLMCallType,
@@ -40,6 +41,7 @@ __all__ = [
     "LLMCall",
     "CVParseDetail",
     "GitHubAnalysis",
+    "CVJDMatchCache",
     "JDStatus",
     "JDSource",
     "LLMCallType",
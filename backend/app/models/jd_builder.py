@@ -8,6 +8,7 @@ from sqlalchemy import (
     Integer,
     Float,
     Boolean,
+    UniqueConstraint,
 )
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -58,6 +59,7 @@ class JobDescription(Base):
 
     # Generated/Extracted Content
     structured_jd = Column(JSONB, nullable=True)  # Full structured JD output
+    revision = Column(Integer, nullable=False, default=1, server_default="1")  # Bumped whenever structured_jd changes
 
     # Source tracking
     source = Column(SQLEnum(JDSource), default=JDSource.BUILDER, nullable=False)
@@ -81,6 +83,7 @@ class JobDescription(Base):
     # Relationships
     user = relationship("User", back_populates="job_descriptions")
     llm_calls = relationship("LLMCall", back_populates="job_description", cascade="all, delete-orphan")
+    match_cache_entries = relationship("CVJDMatchCache", back_populates="job_description", cascade="all, delete-orphan")
 
 
 class LLMCallType(str, enum.Enum):
@@ -162,6 +165,9 @@ class CVParseDetail(Base):
     # Parsed structured data (full JSON from LLM)
     parsed_data = Column(JSONB, nullable=False)
 
+    # SHA-256 of file bytes + parsing prompt version (reuse parses of identical files)
+    content_hash = Column(String(64), nullable=True, index=True)
+
     # Quick access fields (denormalized for querying)
     candidate_name = Column(String, nullable=True, index=True)
     candidate_email = Column(String, nullable=True, index=True)
@@ -240,3 +246,39 @@ class GitHubAnalysis(Base):
     # Relationships
     cv_parse_detail = relationship("CVParseDetail", back_populates="github_analysis")
     user = relationship("User", back_populates="github_analyses")
+
+
+class CVJDMatchCache(Base):
+    """Memoized CV-JD match results keyed by parsed CV hash, JD revision, scoring method and prompt version"""
+
+    __tablename__ = "cv_jd_match_cache"
+    __table_args__ = (
+        UniqueConstraint(
+            "job_description_id", "jd_revision", "cv_data_hash", "scoring_method", "prompt_version",
+            name="uq_cv_jd_match_cache_key",
+        ),
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
+    user_id = Column(
+        UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, index=True
+    )
+    job_description_id = Column(
+        UUID(as_uuid=True), ForeignKey("job_descriptions.id"), nullable=False, index=True
+    )
+
+    # Cache key
+    cv_data_hash = Column(String(64), nullable=False)  # SHA-256 of the parsed CV data
+    jd_revision = Column(Integer, nullable=False)
+    scoring_method = Column(String, nullable=False)  # default/langchain
+    prompt_version = Column(String(12), nullable=False)  # CV_JD_MATCHING_PROMPT_VERSION
+
+    # Cached result
+    match_score = Column(Integer, nullable=True)
+    match_data = Column(JSONB, nullable=False)
+
+    # Timestamp
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    # Relationships
+    job_description = relationship("JobDescription", back_populates="match_cache_entries")
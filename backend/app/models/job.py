@@ -8,6 +8,7 @@ from sqlalchemy import (
     Integer,
     ARRAY,
     Boolean,
+    Index,
 )
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -111,6 +112,10 @@ class CV(Base):
     """Individual CV/Resume"""
 
     __tablename__ = "cvs"
+    __table_args__ = (
+        # Queue status: per-status counts and the queued CVs in upload order
+        Index("ix_cvs_batch_status_created", "batch_id", "status", "created_at"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
     batch_id = Column(
@@ -137,6 +142,9 @@ class CV(Base):
         SQLEnum(CVStatus), default=CVStatus.QUEUED, nullable=False, index=True
     )
     error_message = Column(Text, nullable=True)
+    processing_stages = Column(JSONB, nullable=True)  # Per-stage timings from the pipeline
+    processing_started_at = Column(DateTime(timezone=True), nullable=True)  # Last time a pipeline picked the CV up
+    processing_attempts = Column(Integer, nullable=False, default=0, server_default="0")  # Pipeline starts (stuck-CV recovery gives up after CV_PIPELINE_MAX_ATTEMPTS)
 
     # Source tracking
     source = Column(
@@ -111,6 +111,7 @@ class CVResponse(BaseModel):
     jd_match_data: Optional[dict] = None  # Full CV-JD matching analysis with scores, strengths, gaps, etc.
     parsed_data: Optional[dict] = None  # Parsed CV data from CVParseDetail
     github_data: Optional[dict] = None  # GitHub profile analysis data
+    processing_stages: Optional[dict] = None  # Per-stage pipeline timings
 
     class Config:
         from_attributes = True
@@ -235,6 +236,32 @@ class CVBulkDeleteRequest(BaseModel):
     cv_ids: List[UUID4]
 
 
+# CVs signed per POST /cvs/download-urls call (one page of the CV lists)
+MAX_DOWNLOAD_URL_CVS = 100
+
+
+class CVDownloadURLRequest(BaseModel):
+    """Schema for signing download URLs for a set of CVs"""
+
+    cv_ids: List[UUID4] = Field(..., min_length=1, max_length=MAX_DOWNLOAD_URL_CVS)
+    expiration: int = Field(3600, ge=60, le=604800)
+
+
+class CVDownloadURL(BaseModel):
+    """Schema for a single signed CV download URL"""
+
+    cv_id: UUID4
+    filename: str
+    download_url: Optional[str] = None
+
+
+class CVDownloadURLResponse(BaseModel):
+    """Schema for batched download URL response"""
+
+    urls: List[CVDownloadURL]
+    expires_in: int
+
+
 class DashboardStatsResponse(BaseModel):
     """Schema for dashboard statistics"""
 
@@ -4,14 +4,21 @@ Handles LLM calls with token tracking and cost calculation
 Integrated with TOON (Token-Oriented Object Notation) for 30-60% token savings
 """
 
+import asyncio
 import json
+import threading
 import time
-from typing import Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional
 import boto3
+from botocore.config import Config
 from botocore.exceptions import ClientError
 from sqlalchemy.orm import Session
 from app.core.config import settings
-from app.models.jd_builder import LLMCall, LLMCallType
+from app.core.prompt_utils import compact_prompt, estimate_tokens
+from app.models.jd_builder import LLMCallType
+from app.services.llm_usage_recorder import ABORTED_STREAM_MESSAGE, llm_usage_recorder
 from app.services.toon_service import toon_service
 import logging
 
@@ -38,9 +45,47 @@ TOKEN_PRICING = {
     },
 }
 
+# Largest max_tokens each model accepts (requests above it are rejected)
+MAX_OUTPUT_TOKENS = {
+    "anthropic.claude-sonnet-4-20250514": 64000,
+    "anthropic.claude-3-5-sonnet-20241022-v2:0": 8192,
+    "anthropic.claude-3-5-sonnet-20240620-v1:0": 8192,
+    "anthropic.claude-3-haiku-20240307-v1:0": 4096,
+}
+DEFAULT_MAX_OUTPUT_TOKENS = 4096
+
+# Error codes meaning the request exceeded the account's quota, lowercased:
+# InvokeModel reports "ThrottlingException" while the same error arriving on
+# a response stream (EventStreamError) is "throttlingException"
+THROTTLING_ERROR_CODES = {
+    "throttlingexception",
+    "toomanyrequestsexception",
+    "servicequotaexceededexception",
+}
+
+# Models that accept cache_control breakpoints (prompt caching)
+PROMPT_CACHING_MODELS = {
+    "anthropic.claude-sonnet-4-20250514",
+    "anthropic.claude-3-5-sonnet-20241022-v2:0",
+}
+
+# Cached prefix tokens are billed relative to the input price
+CACHE_WRITE_PRICE_MULTIPLIER = 1.25
+CACHE_READ_PRICE_MULTIPLIER = 0.1
+
+
+# System prompts are a handful of static rubrics: compact each one only once
+_compact_system_prompt = lru_cache(maxsize=32)(compact_prompt)
+
 
 class BedrockService:
-    """Service for interacting with AWS Bedrock and Claude models"""
+    """
+    Service for interacting with AWS Bedrock and Claude models
+
+    boto3 is synchronous, so model calls run in a dedicated thread pool sized
+    to the client's HTTP connection pool; awaiting invoke_claude never blocks
+    the event loop and concurrent calls overlap.
+    """
 
     def __init__(self):
         self.client = boto3.client(
@@ -48,14 +93,156 @@ class BedrockService:
             region_name=settings.AWS_REGION,
             aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
             aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+            config=Config(
+                max_pool_connections=settings.BEDROCK_MAX_POOL_CONNECTIONS,
+                tcp_keepalive=True,
+                connect_timeout=settings.BEDROCK_CONNECT_TIMEOUT,
+                read_timeout=settings.BEDROCK_READ_TIMEOUT,
+                # The rate governor re-queues throttled calls itself; botocore
+                # retrying them as well would multiply requests at the quota
+                retries={
+                    "max_attempts": 1 if settings.LLM_GOVERNOR_ENABLED else settings.BEDROCK_MAX_ATTEMPTS,
+                    "mode": "standard",
+                },
+            ),
+        )
+        self._executor = ThreadPoolExecutor(
+            max_workers=settings.BEDROCK_MAX_POOL_CONNECTIONS,
+            thread_name_prefix="bedrock",
         )
         self.default_model = "anthropic.claude-3-5-sonnet-20241022-v2:0"
 
-    def _calculate_cost(self, model_name: str, input_tokens: int, output_tokens: int) -> Dict[str, float]:
-        """Calculate cost based on token usage"""
+    def _invoke_model_sync(self, model_name: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        """Blocking Bedrock call, including reading the response stream (runs in the pool)"""
+        response = self.client.invoke_model(
+            modelId=model_name,
+            body=json.dumps(body),
+            contentType="application/json",
+            accept="application/json",
+        )
+        return json.loads(response["body"].read())
+
+    def _stream_model_sync(
+        self,
+        model_name: str,
+        body: Dict[str, Any],
+        emit: Callable[[Optional[str]], None],
+        cancelled: threading.Event,
+    ) -> Dict[str, Any]:
+        """
+        Blocking streamed Bedrock call (runs in the pool)
+
+        Text deltas are handed to emit() as they arrive, followed by None once
+        the stream ends. Returns a body shaped like invoke_model's response.
+        """
+        text_parts = []
+        usage = {"input_tokens": 0, "output_tokens": 0}
+        stop_reason = None
+        try:
+            response = self.client.invoke_model_with_response_stream(
+                modelId=model_name,
+                body=json.dumps(body),
+                contentType="application/json",
+                accept="application/json",
+            )
+            stream = response["body"]
+            for event in stream:
+                if cancelled.is_set():
+                    stop_reason = "aborted"
+                    stream.close()
+                    break
+                chunk = event.get("chunk")
+                if not chunk:
+                    continue
+                payload = json.loads(chunk["bytes"])
+                event_type = payload.get("type")
+
+                if event_type == "content_block_delta":
+                    text = payload.get("delta", {}).get("text")
+                    if text:
+                        text_parts.append(text)
+                        emit(text)
+                elif event_type == "message_start":
+                    usage.update(payload.get("message", {}).get("usage", {}))
+                elif event_type == "message_delta":
+                    stop_reason = payload.get("delta", {}).get("stop_reason") or stop_reason
+                    usage["output_tokens"] = payload.get("usage", {}).get(
+                        "output_tokens", usage["output_tokens"]
+                    )
+                elif event_type == "message_stop":
+                    metrics = payload.get("amazon-bedrock-invocationMetrics", {})
+                    usage["input_tokens"] = metrics.get("inputTokenCount", usage["input_tokens"])
+                    usage["output_tokens"] = metrics.get("outputTokenCount", usage["output_tokens"])
+                    if "cacheReadInputTokenCount" in metrics:
+                        usage["cache_read_input_tokens"] = metrics["cacheReadInputTokenCount"]
+                    if "cacheWriteInputTokenCount" in metrics:
+                        usage["cache_creation_input_tokens"] = metrics["cacheWriteInputTokenCount"]
+        finally:
+            emit(None)
+
+        return {
+            "content": [{"type": "text", "text": "".join(text_parts)}],
+            "usage": usage,
+            "stop_reason": stop_reason,
+        }
+
+    async def _stream_claude(
+        self,
+        model_name: str,
+        body: Dict[str, Any],
+        on_delta: Callable[[str], Any],
+    ) -> Dict[str, Any]:
+        """
+        Stream a completion, calling on_delta on the event loop for each text delta
+
+        on_delta returning False stops the generation early (the response is
+        then returned with stop_reason "aborted").
+        """
+        loop = asyncio.get_running_loop()
+        deltas: asyncio.Queue = asyncio.Queue()
+        cancelled = threading.Event()
+
+        def emit(text: Optional[str]):
+            loop.call_soon_threadsafe(deltas.put_nowait, text)
+
+        future = loop.run_in_executor(
+            self._executor, self._stream_model_sync, model_name, body, emit, cancelled
+        )
+        try:
+            while True:
+                text = await deltas.get()
+                if text is None:
+                    break
+                if not cancelled.is_set() and on_delta(text) is False:
+                    cancelled.set()
+        except BaseException:
+            # Don't leave the worker reading a stream nobody consumes
+            cancelled.set()
+            raise
+
+        return await future
+
+    def max_output_tokens(self, model_id: Optional[str] = None) -> int:
+        """Largest max_tokens the model accepts"""
+        return MAX_OUTPUT_TOKENS.get(model_id or self.default_model, DEFAULT_MAX_OUTPUT_TOKENS)
+
+    def _calculate_cost(
+        self,
+        model_name: str,
+        input_tokens: int,
+        output_tokens: int,
+        cache_write_tokens: int = 0,
+        cache_read_tokens: int = 0,
+    ) -> Dict[str, float]:
+        """Calculate cost based on token usage (input_tokens excludes cached prefix tokens)"""
         pricing = TOKEN_PRICING.get(model_name, TOKEN_PRICING[self.default_model])
 
-        input_cost = (input_tokens / 1_000_000) * pricing["input"]
+        billed_input_tokens = (
+            input_tokens
+            + cache_write_tokens * CACHE_WRITE_PRICE_MULTIPLIER
+            + cache_read_tokens * CACHE_READ_PRICE_MULTIPLIER
+        )
+        input_cost = (billed_input_tokens / 1_000_000) * pricing["input"]
         output_cost = (output_tokens / 1_000_000) * pricing["output"]
         total_cost = input_cost + output_cost
 
@@ -80,9 +267,7 @@ class BedrockService:
             Optimized prompt string
         """
         # Basic whitespace optimization (always applied)
-        lines = prompt.split('\n')
-        optimized_lines = [line.strip() for line in lines if line.strip()]
-        optimized = '\n'.join(optimized_lines)
+        optimized = compact_prompt(prompt)
 
         # Log token savings if TOON is enabled
         if use_toon and toon_service.enabled:
@@ -90,6 +275,23 @@ class BedrockService:
 
         return optimized
 
+    def _system_blocks(self, system_prompt: str, model_name: str, cache: bool) -> Any:
+        """
+        Build the system field, marking it as a cache breakpoint when requested
+
+        A cached system prompt is billed at a fraction of the input price on
+        every call that reuses it within the cache lifetime (and answers sooner),
+        so static rubrics belong there with the per-call data in the message.
+        """
+        system_text = _compact_system_prompt(system_prompt)
+        if not (
+            cache
+            and settings.BEDROCK_PROMPT_CACHING_ENABLED
+            and model_name in PROMPT_CACHING_MODELS
+        ):
+            return system_text
+        return [{"type": "text", "text": system_text, "cache_control": {"type": "ephemeral"}}]
+
     async def invoke_claude(
         self,
         prompt: str,
@@ -104,6 +306,8 @@ class BedrockService:
         cv_id: Optional[str] = None,
         cv_parse_detail_id: Optional[str] = None,
         use_toon: bool = True,
+        on_delta: Optional[Callable[[str], Any]] = None,
+        cache_system_prompt: bool = False,
     ) -> Dict[str, Any]:
         """
         Invoke Claude model via Bedrock with token tracking
@@ -120,9 +324,14 @@ class BedrockService:
             job_description_id: Optional JD ID for tracking
             cv_id: Optional CV ID for tracking
             cv_parse_detail_id: Optional CV parse detail ID for tracking
+            on_delta: Stream the response, passing each text delta to this
+                callback as it arrives; returning False stops generation
+            cache_system_prompt: Cache the (static) system prompt as a prompt
+                prefix on models that support it
 
         Returns:
-            Dictionary with response, tokens, and cost
+            Dictionary with response, tokens, cost, and stop_reason
+            (truncated is True when max_tokens cut the response off)
         """
         start_time = time.time()
         model_name = model_id or self.default_model
@@ -142,39 +351,52 @@ class BedrockService:
             }
 
             if system_prompt:
-                body["system"] = self._optimize_prompt(system_prompt)
-
-            # Invoke Bedrock
-            response = self.client.invoke_model(
-                modelId=model_name,
-                body=json.dumps(body),
-                contentType="application/json",
-                accept="application/json",
-            )
+                body["system"] = self._system_blocks(
+                    system_prompt, model_name, cache_system_prompt
+                )
+
+            # Invoke Bedrock off the event loop
+            if on_delta:
+                response_body = await self._stream_claude(model_name, body, on_delta)
+            else:
+                loop = asyncio.get_running_loop()
+                response_body = await loop.run_in_executor(
+                    self._executor, self._invoke_model_sync, model_name, body
+                )
 
-            # Parse response
-            response_body = json.loads(response["body"].read())
+            # Extract response text
+            content = response_body.get("content", [])
+            response_text = ""
+            if content and len(content) > 0:
+                response_text = content[0].get("text", "")
+            stop_reason = response_body.get("stop_reason")
+            aborted = stop_reason == "aborted"
 
             # Extract token usage
             usage = response_body.get("usage", {})
-            input_tokens = usage.get("input_tokens", 0)
+            uncached_input_tokens = usage.get("input_tokens", 0)
+            cache_write_tokens = usage.get("cache_creation_input_tokens") or 0
+            cache_read_tokens = usage.get("cache_read_input_tokens") or 0
+            input_tokens = uncached_input_tokens + cache_write_tokens + cache_read_tokens
             output_tokens = usage.get("output_tokens", 0)
+            if aborted:
+                # The stream was stopped before its final usage event, but
+                # everything generated so far is still billed
+                output_tokens = max(output_tokens, estimate_tokens(response_text))
             total_tokens = input_tokens + output_tokens
 
             # Calculate cost
-            cost = self._calculate_cost(model_name, input_tokens, output_tokens)
+            cost = self._calculate_cost(
+                model_name, uncached_input_tokens, output_tokens,
+                cache_write_tokens=cache_write_tokens,
+                cache_read_tokens=cache_read_tokens,
+            )
 
             # Calculate latency
             latency_ms = int((time.time() - start_time) * 1000)
 
-            # Extract response text
-            content = response_body.get("content", [])
-            response_text = ""
-            if content and len(content) > 0:
-                response_text = content[0].get("text", "")
-
-            # Track LLM call in database
-            llm_call = LLMCall(
+            # Track LLM call (written in the background)
+            llm_call_id = llm_usage_recorder.record(
                 user_id=user_id,
                 job_description_id=job_description_id,
                 cv_id=cv_id,
@@ -192,14 +414,13 @@ class BedrockService:
                 response_size_chars=len(response_text),
                 latency_ms=latency_ms,
                 success=True,
+                error_message=ABORTED_STREAM_MESSAGE if aborted else None,
             )
-            db.add(llm_call)
-            db.commit()
-            db.refresh(llm_call)
 
             logger.info(
                 f"LLM call successful: {call_type.value} | "
-                f"Tokens: {input_tokens}/{output_tokens} | "
+                f"Tokens: {input_tokens}/{output_tokens} "
+                f"(cache read/write: {cache_read_tokens}/{cache_write_tokens}) | "
                 f"Cost: ${cost['total_cost']:.6f} | "
                 f"Latency: {latency_ms}ms"
             )
@@ -211,18 +432,24 @@ class BedrockService:
                     "input_tokens": input_tokens,
                     "output_tokens": output_tokens,
                     "total_tokens": total_tokens,
+                    "cache_read_input_tokens": cache_read_tokens,
+                    "cache_creation_input_tokens": cache_write_tokens,
                 },
                 "cost": cost,
                 "latency_ms": latency_ms,
-                "llm_call_id": str(llm_call.id),
+                "llm_call_id": llm_call_id,
+                "stop_reason": stop_reason,
+                "truncated": stop_reason == "max_tokens",
             }
 
         except ClientError as e:
             error_message = str(e)
+            error_code = e.response.get("Error", {}).get("Code") or ""
+            throttled = error_code.lower() in THROTTLING_ERROR_CODES
             logger.error(f"Bedrock API error: {error_message}")
 
             # Track failed call
-            llm_call = LLMCall(
+            llm_usage_recorder.record(
                 user_id=user_id,
                 job_description_id=job_description_id,
                 cv_id=cv_id,
@@ -241,13 +468,12 @@ class BedrockService:
                 success=False,
                 error_message=error_message,
             )
-            db.add(llm_call)
-            db.commit()
 
             return {
                 "success": False,
                 "error": error_message,
                 "response": None,
+                "throttled": throttled,
             }
 
         except Exception as e:
@@ -255,7 +481,7 @@ class BedrockService:
             logger.error(error_message)
 
             # Track failed call
-            llm_call = LLMCall(
+            llm_usage_recorder.record(
                 user_id=user_id,
                 job_description_id=job_description_id,
                 cv_id=cv_id,
@@ -274,8 +500,6 @@ class BedrockService:
                 success=False,
                 error_message=error_message,
             )
-            db.add(llm_call)
-            db.commit()
 
             return {
                 "success": False,
@@ -3,28 +3,25 @@ CV-JD Matching Service
 Matches parsed CV data against Job Descriptions using LLM
 """
 
+import hashlib
 import json
 import os
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.prompt_utils import compact_prompt
+from app.database import release_connection, run_db
+from app.services.llm_batch import batch_ref, load_json_response, share_usage
 from app.services.llm_factory import llm_factory
-from app.models.jd_builder import LLMCallType, JobDescription
+from app.models.jd_builder import LLMCallType, JobDescription, CVJDMatchCache
 import logging
 
 logger = logging.getLogger(__name__)
 
 
-CV_JD_MATCHING_PROMPT = """You are an EXTREMELY STRICT technical recruiter. Your job is to ELIMINATE weak candidates, not find reasons to pass them.
-
-DEFAULT ASSUMPTION: This candidate is probably NOT qualified (40-50% match). Only score higher if they PROVE exceptional fit with concrete evidence.
-
-JOB DESCRIPTION:
-{jd_text}
-
-CANDIDATE CV DATA:
-{cv_data}
-
-⚠️  CRITICAL: The average score should be 35-55, NOT 70-85. If you consistently score above 65, you are TOO GENEROUS.
+# Rubric sections are shared by the single and batch matching prompts
+CV_JD_MATCHING_RULES = """⚠️  CRITICAL: The average score should be 35-55, NOT 70-85. If you consistently score above 65, you are TOO GENEROUS.
 
 REALISTIC SCORING DISTRIBUTION (BE HONEST):
 - 0-25: Completely unqualified, wrong field/level
@@ -137,9 +134,9 @@ CRITICAL QUALITY CHECKS (MUST PASS BEFORE SUBMITTING):
 ❌ DO NOT ignore outdated skills - React 2019 experience is 5 years old in 2024
 ❌ DO NOT score 80+ unless you're willing to recommend immediate hire
 
-Return ONLY this JSON:
+"""
 
-{{
+CV_JD_MATCHING_SCHEMA = """{{
   "evaluation_process": {{
     "total_required_skills": number,
     "skills_matched_count": number,
@@ -281,9 +278,9 @@ Return ONLY this JSON:
     "concerns_to_validate": ["critical gaps to verify"],
     "next_steps": "suggested action"
   }}
-}}
+}}"""
 
-FINAL VALIDATION:
+CV_JD_MATCHING_VALIDATION = """FINAL VALIDATION:
 - If missing >2 critical skills, score MUST be <60
 - If experience <50% required, score MUST be <50
 - If score >80, you MUST justify why candidate is exceptional
@@ -301,9 +298,67 @@ Every component score MUST have detailed reasoning showing the math:
 
 The final_reasoning MUST tie everything together in one clear sentence explaining why the score is trustworthy.
 
-This transparency ensures recruiters understand EXACTLY why we scored this candidate at X%.
+This transparency ensures recruiters understand EXACTLY why we scored this candidate at X%."""
+
+
+# Static rubrics go in the system prompt, compacted once at import time, so
+# providers can cache them as a prompt prefix; the JD and CV data follow in
+# the user message
+CV_JD_MATCHING_SYSTEM_PROMPT = compact_prompt(("""You are an EXTREMELY STRICT technical recruiter. Your job is to ELIMINATE weak candidates, not find reasons to pass them. The user message contains the job description and the candidate's CV data.
+
+DEFAULT ASSUMPTION: This candidate is probably NOT qualified (40-50% match). Only score higher if they PROVE exceptional fit with concrete evidence.
+
+""" + CV_JD_MATCHING_RULES + """Return ONLY this JSON:
+
+""" + CV_JD_MATCHING_SCHEMA + """
+
+""" + CV_JD_MATCHING_VALIDATION + """
+
+Return ONLY valid JSON, no additional text.""").format())
+
+CV_JD_MATCHING_PROMPT = """JOB DESCRIPTION:
+{jd_text}
+
+CANDIDATE CV DATA:
+{cv_data}"""
+
+
+CV_JD_BATCH_MATCHING_SYSTEM_PROMPT = compact_prompt(("""You are an EXTREMELY STRICT technical recruiter. The user message contains one job description and several candidates, each wrapped in START/END markers with a reference id. Score EACH candidate independently against the job description only - never compare candidates with each other or let one CV influence another's score.
+
+DEFAULT ASSUMPTION: Each candidate is probably NOT qualified (40-50% match). Only score higher if they PROVE exceptional fit with concrete evidence.
+
+""" + CV_JD_MATCHING_RULES + """For EACH candidate, build an evaluation object with exactly this structure:
+
+""" + CV_JD_MATCHING_SCHEMA + """
+
+""" + CV_JD_MATCHING_VALIDATION + """
+
+Return ONLY this JSON, with one entry per candidate in the same order, using the exact cv_ref given in the markers:
 
-Return ONLY valid JSON, no additional text."""
+{{
+  "results": [
+    {{
+      "cv_ref": "CV-1",
+      "evaluation": {{ object with the structure above }}
+    }}
+  ]
+}}
+
+OUTPUT BUDGET: keep each evaluation within about """ + str(settings.CV_MATCH_BATCH_PER_CV_TOKENS) + """ tokens. List at most the 5 most important entries in required_skills_matched and at most 3 in every other list, keep every reasoning, breakdown and explanation field to one short sentence, and never drop a candidate to save space.
+
+Return ONLY valid JSON, no additional text.""").format())
+
+CV_JD_BATCH_MATCHING_PROMPT = """JOB DESCRIPTION:
+{jd_text}
+
+CANDIDATES ({cv_count}):
+{cv_blocks}"""
+
+# Changes whenever either matching rubric changes, so cached matches scored
+# by an older prompt are never reused
+CV_JD_MATCHING_PROMPT_VERSION = hashlib.sha256(
+    (CV_JD_MATCHING_SYSTEM_PROMPT + CV_JD_BATCH_MATCHING_SYSTEM_PROMPT).encode("utf-8")
+).hexdigest()[:12]
 
 
 class CVJDMatcherService:
@@ -472,6 +527,33 @@ class CVJDMatcherService:
             # Fall back to a conservative score if validation fails
             return min(match_data.get("overall_match_score", 50), 50)
 
+    def _jd_text(self, job_description: JobDescription) -> str:
+        """Get JD text (prefer structured_jd, fallback to original_jd_text)"""
+        if job_description.structured_jd:
+            return json.dumps(job_description.structured_jd, indent=2)
+        return job_description.original_jd_text or ""
+
+    def _apply_validated_score(
+        self, match_data: Dict[str, Any], cv_id: str, jd_id: str
+    ) -> int:
+        """Run score validation and record any adjustment on match_data"""
+        llm_score = match_data.get("overall_match_score", 0)
+        validated_score = self._validate_and_adjust_score(match_data)
+
+        # Update match_data with validated score
+        if validated_score != llm_score:
+            match_data["original_llm_score"] = llm_score
+            match_data["overall_match_score"] = validated_score
+            match_data["score_adjusted"] = True
+            match_data["score_adjustment_reason"] = "Applied strict validation rules to prevent score inflation"
+            logger.warning(f"CV {cv_id}: Score adjusted from {llm_score} to {validated_score}")
+        else:
+            match_data["score_adjusted"] = False
+
+        logger.info(f"CV {cv_id} matched against JD {jd_id}: {validated_score}% (LLM: {llm_score}%)")
+
+        return validated_score
+
     async def match_cv_to_jd(
         self,
         cv_parsed_data: Dict[str, Any],
@@ -479,24 +561,63 @@ class CVJDMatcherService:
         db: Session,
         user_id: str,
         cv_id: str,
+        use_cache: bool = True,
+        interactive: bool = False,
     ) -> Dict[str, Any]:
         """
         Match a parsed CV against a Job Description using LLM
 
+        Results are memoized per (parsed CV hash, JD revision, scoring method),
+        so re-scoring an unchanged CV against an unchanged JD costs nothing.
+
         Args:
             cv_parsed_data: Parsed CV data dictionary
             job_description: JobDescription object
             db: Database session
             user_id: User ID for tracking
             cv_id: CV ID for tracking
+            use_cache: Set False to force a fresh LLM evaluation
+            interactive: An HTTP request waits on the result, so only queue
+                briefly for LLM capacity; a call still throttled then returns
+                a result with "throttled" set
 
         Returns:
             Matching result dictionary with score and analysis
         """
+        scoring_method = self._scoring_method()
+        cv_data_hash = self._cv_data_hash(cv_parsed_data)
+
+        if use_cache:
+            cached = await run_db(
+                self._get_cached_match, db, job_description, cv_data_hash, scoring_method
+            )
+            if cached:
+                logger.info(f"CV {cv_id} match served from cache for JD {job_description.id}")
+                return cached
+
+        result = await self._score_cv(
+            cv_parsed_data, job_description, db, user_id, cv_id, scoring_method, interactive
+        )
+        if result.get("success"):
+            await run_db(
+                self._store_match,
+                db, job_description, user_id, cv_data_hash, scoring_method, result,
+            )
+        return result
+
+    async def _score_cv(
+        self,
+        cv_parsed_data: Dict[str, Any],
+        job_description: JobDescription,
+        db: Session,
+        user_id: str,
+        cv_id: str,
+        scoring_method: str,
+        interactive: bool = False,
+    ) -> Dict[str, Any]:
+        """Evaluate one CV with the configured scoring method (no caching)"""
         try:
             # Check if we should use LangChain scoring method
-            scoring_method = os.getenv("CV_SCORING_METHOD", "default").lower()
-
             if scoring_method == "langchain":
                 logger.info(f"Using LangChain weighted scoring for CV {cv_id}")
                 from app.services.langchain_cv_scorer import langchain_cv_scoring_service
@@ -511,11 +632,7 @@ class CVJDMatcherService:
 
             # Default: Use existing strict scoring method
             logger.info(f"Using default strict scoring for CV {cv_id}")
-            # Get JD text (prefer structured_jd, fallback to original_jd_text)
-            if job_description.structured_jd:
-                jd_text = json.dumps(job_description.structured_jd, indent=2)
-            else:
-                jd_text = job_description.original_jd_text or ""
+            jd_text = self._jd_text(job_description)
 
             if not jd_text:
                 logger.warning(f"No JD text available for job_description {job_description.id}")
@@ -533,52 +650,35 @@ class CVJDMatcherService:
                 cv_data=cv_data_str,
             )
 
+            # Don't hold a pooled connection while the LLM generates
+            jd_id = str(job_description.id)
+            await run_db(release_connection, db)
+
             # Call LLM for matching
-            result = await llm_factory.get_service().invoke_model(
+            result = await llm_factory.get_service(interactive=interactive).invoke_model(
                 prompt=prompt,
                 db=db,
                 user_id=user_id,
                 call_type=LLMCallType.CV_MATCHING,
+                system_prompt=CV_JD_MATCHING_SYSTEM_PROMPT,
+                cache_system_prompt=True,
                 cv_id=cv_id,
-                jd_id=str(job_description.id),
-                max_tokens=6000,
+                job_description_id=jd_id,
+                max_tokens=settings.CV_MATCH_MAX_TOKENS,
                 temperature=0.3,
             )
 
+            if result.get("throttled"):
+                return {"success": False, "error": result.get("error"), "throttled": True}
             if not result["success"]:
                 raise ValueError(f"LLM matching failed: {result.get('error')}")
 
-            # Parse JSON response
-            try:
-                # Clean response (remove ```json ... ``` wrapper if present)
-                response_text = result["response"].strip()
-                if response_text.startswith("```"):
-                    response_text = response_text.strip("`")
-                    if response_text.startswith("json"):
-                        response_text = response_text[4:]
-                response_text = response_text.strip()
-
-                match_data = json.loads(response_text)
-            except json.JSONDecodeError as e:
-                logger.error(f"Failed to parse LLM matching response as JSON: {e}")
-                logger.error(f"Response: {result['response'][:500]}")
-                raise ValueError(f"Invalid JSON response from LLM: {e}")
+            match_data = load_json_response(result["response"])
 
             # Extract and validate score
-            llm_score = match_data.get("overall_match_score", 0)
-            validated_score = self._validate_and_adjust_score(match_data)
-
-            # Update match_data with validated score
-            if validated_score != llm_score:
-                match_data["original_llm_score"] = llm_score
-                match_data["overall_match_score"] = validated_score
-                match_data["score_adjusted"] = True
-                match_data["score_adjustment_reason"] = "Applied strict validation rules to prevent score inflation"
-                logger.warning(f"CV {cv_id}: Score adjusted from {llm_score} to {validated_score}")
-            else:
-                match_data["score_adjusted"] = False
-
-            logger.info(f"CV {cv_id} matched against JD {job_description.id}: {validated_score}% (LLM: {llm_score}%)")
+            validated_score = self._apply_validated_score(
+                match_data, cv_id, jd_id
+            )
 
             return {
                 "success": True,
@@ -595,6 +695,285 @@ class CVJDMatcherService:
                 "error": str(e),
             }
 
+    async def match_cvs_to_jd_batch(
+        self,
+        candidates: List[Tuple[str, Dict[str, Any]]],
+        job_description: JobDescription,
+        db: Session,
+        user_id: str,
+        use_cache: bool = True,
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Match several parsed CVs against one Job Description per LLM call
+
+        The JD and scoring rubric are sent once per chunk of up to
+        CV_MATCH_BATCH_SIZE candidates (fewer if the model's output limit
+        can't fit that many evaluations), and every returned evaluation goes
+        through the same score validation as match_cv_to_jd. Candidates
+        missing from a response (or a failed chunk) fall back to
+        match_cv_to_jd. Memoized results are returned without an LLM call.
+
+        Args:
+            candidates: (CV ID, parsed CV data) tuples
+            job_description: JobDescription object
+            db: Database session
+            user_id: User ID for tracking
+            use_cache: Set False to force fresh LLM evaluations
+
+        Returns:
+            Dictionary of CV ID -> matching result (same shape as match_cv_to_jd)
+        """
+        results: Dict[str, Dict[str, Any]] = {}
+        scoring_method = self._scoring_method()
+        cv_data_hashes: Dict[str, str] = {}
+
+        # Serve memoized results first; only the misses go to the LLM
+        pending: List[Tuple[str, Dict[str, Any]]] = []
+        for cv_id, cv_parsed_data in candidates:
+            cv_data_hashes[cv_id] = self._cv_data_hash(cv_parsed_data)
+            cached = None
+            if use_cache:
+                cached = await run_db(
+                    self._get_cached_match,
+                    db, job_description, cv_data_hashes[cv_id], scoring_method,
+                )
+            if cached:
+                results[cv_id] = cached
+            else:
+                pending.append((cv_id, cv_parsed_data))
+
+        if results:
+            logger.info(f"{len(results)}/{len(candidates)} CV matches served from cache for JD {job_description.id}")
+        candidates = pending
+
+        # LangChain scoring has its own per-candidate pipeline
+        jd_text = self._jd_text(job_description)
+        chunk_size = min(max(1, settings.CV_MATCH_BATCH_SIZE), self.match_batch_capacity())
+
+        if scoring_method == "langchain" or not jd_text or chunk_size == 1:
+            for cv_id, cv_parsed_data in candidates:
+                results[cv_id] = await self.match_cv_to_jd(
+                    cv_parsed_data, job_description, db, user_id, cv_id,
+                    use_cache=False,
+                )
+            return results
+
+        for start in range(0, len(candidates), chunk_size):
+            chunk = candidates[start:start + chunk_size]
+
+            batch_matched: Dict[str, Dict[str, Any]] = {}
+            result: Optional[Dict[str, Any]] = None
+            if len(chunk) > 1:
+                try:
+                    batch_matched, result = await self._invoke_batch_match(
+                        chunk, jd_text, job_description, db, user_id
+                    )
+                except Exception as e:
+                    logger.warning(f"Batch CV-JD matching failed, falling back to single calls: {e}")
+
+            share = len(batch_matched) or 1
+            for index, (cv_id, cv_parsed_data) in enumerate(chunk):
+                match_data = batch_matched.get(batch_ref(index))
+
+                if match_data is None:
+                    # Split failure (or chunk of one): match this CV on its own
+                    results[cv_id] = await self.match_cv_to_jd(
+                        cv_parsed_data, job_description, db, user_id, cv_id,
+                        use_cache=False,
+                    )
+                    continue
+
+                validated_score = self._apply_validated_score(
+                    match_data, cv_id, str(job_description.id)
+                )
+                await run_db(
+                    self._store_match,
+                    db, job_description, user_id, cv_data_hashes[cv_id], scoring_method,
+                    {"match_score": validated_score, "match_data": match_data},
+                )
+
+                usage, cost = share_usage(result, share)
+                results[cv_id] = {
+                    "success": True,
+                    "match_score": validated_score,
+                    "match_data": match_data,
+                    "usage": usage,
+                    "cost": cost,
+                    "batched": True,
+                }
+
+        return results
+
+    async def _invoke_batch_match(
+        self,
+        chunk: List[Tuple[str, Dict[str, Any]]],
+        jd_text: str,
+        job_description: JobDescription,
+        db: Session,
+        user_id: str,
+    ) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, Any]]:
+        """
+        Score a chunk of CVs in one request and split the response by cv_ref
+
+        Returns:
+            (cv_ref -> match data for every valid entry, raw LLM result)
+        """
+        cv_blocks = "\n\n".join(
+            f"=== {batch_ref(index)} START ===\n"
+            f"{json.dumps(cv_parsed_data, indent=2)}\n"
+            f"=== {batch_ref(index)} END ==="
+            for index, (_, cv_parsed_data) in enumerate(chunk)
+        )
+        prompt = CV_JD_BATCH_MATCHING_PROMPT.format(
+            cv_count=len(chunk),
+            jd_text=jd_text,
+            cv_blocks=cv_blocks,
+        )
+
+        # Don't hold a pooled connection while the LLM generates
+        jd_id = str(job_description.id)
+        await run_db(release_connection, db)
+
+        result = await llm_factory.get_service().invoke_model(
+            prompt=prompt,
+            db=db,
+            user_id=user_id,
+            call_type=LLMCallType.CV_MATCHING,
+            system_prompt=CV_JD_BATCH_MATCHING_SYSTEM_PROMPT,
+            cache_system_prompt=True,
+            job_description_id=jd_id,
+            max_tokens=settings.CV_MATCH_BATCH_PER_CV_TOKENS * len(chunk),
+            temperature=0.3,
+        )
+
+        if not result["success"]:
+            raise ValueError(f"LLM batch matching failed: {result.get('error')}")
+
+        response_data = load_json_response(result["response"])
+        entries = response_data.get("results") if isinstance(response_data, dict) else None
+        if not isinstance(entries, list):
+            raise ValueError("Batch response has no results list")
+
+        batch_matched: Dict[str, Dict[str, Any]] = {}
+        for entry in entries:
+            if not isinstance(entry, dict):
+                continue
+            cv_ref = str(entry.get("cv_ref", "")).strip()
+            match_data = entry.get("evaluation")
+            if isinstance(match_data, dict) and "overall_match_score" in match_data:
+                batch_matched[cv_ref] = match_data
+
+        logger.info(
+            f"Batch matched {len(batch_matched)}/{len(chunk)} CVs against JD {jd_id} | "
+            f"Tokens: {result['usage'].get('input_tokens')}/{result['usage'].get('output_tokens')}"
+        )
+
+        return batch_matched, result
+
+    @staticmethod
+    def match_batch_capacity() -> int:
+        """
+        CVs that fit in one batched matching call
+
+        Every CV gets CV_MATCH_BATCH_PER_CV_TOKENS of output (the batch
+        prompt trims evaluations to fit it), and the call's max_tokens must
+        stay within CV_MATCH_BATCH_MAX_TOKENS and the model's output limit.
+        """
+        batch_max_tokens = min(
+            settings.CV_MATCH_BATCH_MAX_TOKENS,
+            llm_factory.get_service().max_output_tokens(),
+        )
+        return max(1, batch_max_tokens // settings.CV_MATCH_BATCH_PER_CV_TOKENS)
+
+    def check_batch_capacity(self):
+        """Warn (once, at worker startup) when batch matching can't share calls"""
+        if settings.CV_MATCH_BATCH_SIZE > 1 and self.match_batch_capacity() < 2:
+            logger.warning(
+                "Batch matching disabled: the output budget fits only one CV per call "
+                "(raise CV_MATCH_BATCH_MAX_TOKENS, lower CV_MATCH_BATCH_PER_CV_TOKENS "
+                "or use a model with a larger output limit)"
+            )
+
+    @staticmethod
+    def _scoring_method() -> str:
+        """Active scoring method (part of the match cache key)"""
+        return os.getenv("CV_SCORING_METHOD", "default").lower()
+
+    @staticmethod
+    def _cv_data_hash(cv_parsed_data: Dict[str, Any]) -> str:
+        """Stable SHA-256 of the parsed CV data"""
+        canonical = json.dumps(cv_parsed_data, sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def _get_cached_match(
+        self,
+        db: Session,
+        job_description: JobDescription,
+        cv_data_hash: str,
+        scoring_method: str,
+    ) -> Optional[Dict[str, Any]]:
+        """Look up a memoized match result for the JD's current revision and prompt"""
+        entry = db.query(CVJDMatchCache).filter(
+            CVJDMatchCache.job_description_id == job_description.id,
+            CVJDMatchCache.jd_revision == (job_description.revision or 1),
+            CVJDMatchCache.cv_data_hash == cv_data_hash,
+            CVJDMatchCache.scoring_method == scoring_method,
+            CVJDMatchCache.prompt_version == CV_JD_MATCHING_PROMPT_VERSION,
+        ).first()
+
+        if not entry:
+            return None
+
+        return {
+            "success": True,
+            "match_score": entry.match_score,
+            "match_data": entry.match_data,
+            "usage": {"input_tokens": 0, "output_tokens": 0, "total_tokens": 0},
+            "cost": 0.0,
+            "cache_hit": True,
+        }
+
+    def _store_match(
+        self,
+        db: Session,
+        job_description: JobDescription,
+        user_id: str,
+        cv_data_hash: str,
+        scoring_method: str,
+        result: Dict[str, Any],
+    ):
+        """
+        Memoize a successful match result (a concurrent duplicate is ignored)
+
+        Never leaves the session in a failed transaction: the caller goes on
+        to save the score on the CV with it.
+        """
+        try:
+            # A duplicate only rolls back the savepoint
+            with db.begin_nested():
+                db.add(CVJDMatchCache(
+                    user_id=user_id,
+                    job_description_id=job_description.id,
+                    cv_data_hash=cv_data_hash,
+                    jd_revision=job_description.revision or 1,
+                    scoring_method=scoring_method,
+                    prompt_version=CV_JD_MATCHING_PROMPT_VERSION,
+                    match_score=result.get("match_score"),
+                    match_data=result.get("match_data"),
+                ))
+        except IntegrityError:
+            logger.debug(f"Match for JD {job_description.id} already cached")
+            return
+        except Exception as e:
+            logger.warning(f"Failed to cache match result for JD {job_description.id}: {e}")
+            return
+
+        try:
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Failed to cache match result for JD {job_description.id}: {e}")
+
 
 # Singleton instance
 cv_jd_matcher_service = CVJDMatcherService()
@@ -4,14 +4,24 @@ Handles PDF/DOCX parsing and LLM-based CV extraction with skill recency tracking
 Optimized with TOON encoding for 30-60% token savings
 """
 
-import json
+import asyncio
+import hashlib
 import io
-from typing import Dict, Any, Optional
-import PyPDF2
-import pdfplumber
+import time
+from contextlib import ExitStack
+from typing import BinaryIO, Callable, Dict, Any, List, Optional, Tuple, Union
 from docx import Document
 from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.prompt_utils import compact_prompt
+from app.core.extraction_pool import extraction_pool
+from app.core.json_stream import IncrementalJSONScanner, JSONStreamError
+from app.core.stage_timer import StageTimer
+from app.database import release_connection, run_db
+from app.services.llm_batch import batch_ref, load_json_response, share_usage
 from app.services.llm_factory import llm_factory
+from app.services.llm_usage_recorder import llm_usage_recorder
+from app.services.pdf_extractor import pdf_text_extractor
 from app.services.toon_service import toon_service
 from app.models.jd_builder import LLMCallType, CVParseDetail
 from app.models.job import CV
@@ -20,16 +30,8 @@ import logging
 logger = logging.getLogger(__name__)
 
 
-CV_PARSING_PROMPT = """You are an expert CV parser. Extract structured information from this CV/resume with special attention to skill recency and usage timeline.
-
-CV TEXT:
-{cv_text}
-
-Extract ALL information accurately. Don't hallucinate or infer details not present.
-
-Return ONLY this JSON:
-
-{{
+# JSON structure extracted for every CV (shared by single and batch prompts)
+CV_PARSING_SCHEMA = """{{
   "personal_info": {{
     "name": "extracted or null",
     "email": "extracted or null",
@@ -227,9 +229,9 @@ Return ONLY this JSON:
       "actively_learning": ["skills with recent usage or side projects"]
     }}
   }}
-}}
+}}"""
 
-CRITICAL RULES:
+CV_PARSING_RULES = """CRITICAL RULES:
 1. Calculate skill recency based on work history dates
 2. Map skills to specific jobs and timeframes
 3. Identify red flags (job hopping, gaps, outdated skills)
@@ -237,46 +239,149 @@ CRITICAL RULES:
 5. Be conservative - don't make up information
 6. Return ONLY valid JSON, no additional text"""
 
+# Static rubrics go in the system prompt, compacted once at import time, so
+# providers can cache them as a prompt prefix; the CV text follows in the
+# user message
+CV_PARSING_SYSTEM_PROMPT = compact_prompt("""You are an expert CV parser. Extract structured information from the CV/resume in the user message with special attention to skill recency and usage timeline.
 
-class CVParserService:
-    """Service for parsing CVs and extracting structured data"""
+Extract ALL information accurately. Don't hallucinate or infer details not present.
 
-    def extract_text_from_pdf(self, file_content: bytes) -> str:
-        """Extract text from PDF file using pdfplumber (better for complex layouts)"""
-        try:
-            pdf_file = io.BytesIO(file_content)
-            text_parts = []
+Return ONLY this JSON:
 
-            with pdfplumber.open(pdf_file) as pdf:
-                for page in pdf.pages:
-                    text = page.extract_text()
-                    if text:
-                        text_parts.append(text)
+""" + CV_PARSING_SCHEMA.format() + """
 
-            return "\n\n".join(text_parts)
+""" + CV_PARSING_RULES)
 
-        except Exception as e:
-            logger.warning(f"pdfplumber failed, falling back to PyPDF2: {e}")
-            # Fallback to PyPDF2
+CV_PARSING_PROMPT = """CV TEXT:
+{cv_text}"""
+
+
+CV_BATCH_PARSING_SYSTEM_PROMPT = compact_prompt("""You are an expert CV parser. The user message contains several separate CVs/resumes, each wrapped in START/END markers with a reference id. Extract structured information from EACH CV independently with special attention to skill recency and usage timeline. Never mix details between CVs.
+
+Extract ALL information accurately. Don't hallucinate or infer details not present.
+
+For EACH CV, build an object with exactly this structure:
+
+""" + CV_PARSING_SCHEMA.format() + """
+
+Return ONLY this JSON, with one entry per CV in the same order, using the exact cv_ref given in the markers:
+
+{
+  "results": [
+    {
+      "cv_ref": "CV-1",
+      "parsed": { object with the structure above }
+    }
+  ]
+}
+
+OUTPUT BUDGET: keep each CV's object within about """ + str(settings.CV_PARSE_BATCH_PER_CV_TOKENS) + """ tokens. List at most 3 usage_timeline entries per skill and at most 5 responsibilities and achievements per role, write short phrases rather than sentences, and use null instead of repeating information. Never drop a CV to save space.
+
+""" + CV_PARSING_RULES)
+
+CV_BATCH_PARSING_PROMPT = """{cv_count} CVs:
+
+{cv_blocks}"""
+
+
+# Changes whenever the extracted structure or rules change, so cached parses
+# produced by an older prompt are never reused
+CV_PARSING_PROMPT_VERSION = hashlib.sha256(
+    (CV_PARSING_SCHEMA + CV_PARSING_RULES).encode("utf-8")
+).hexdigest()[:12]
+
+# Fields published while the parsing response is still streaming
+# (JSON path in the response -> progress event key)
+PARTIAL_FIELDS = {
+    ("personal_info", "name"): "candidate_name",
+    ("personal_info", "location"): "location",
+    ("summary", "current_role"): "current_role",
+    ("summary", "current_company"): "current_company",
+    ("summary", "total_experience_years"): "total_experience_years",
+    ("summary", "career_level"): "career_level",
+}
+
+
+class _PartialFieldHandler:
+    """
+    on_delta callback feeding a streamed parse response to a JSON scanner
+
+    reset() is called by the governed LLM service before it re-sends a
+    throttled call, so deltas streamed by the failed attempt don't corrupt
+    the scanner's view of the new response.
+    """
+
+    def __init__(
+        self,
+        scanner: IncrementalJSONScanner,
+        on_partial: Optional[Callable[[Dict[str, Any]], None]],
+    ):
+        self.scanner = scanner
+        self.on_partial = on_partial
+        self.fields: Dict[str, Any] = {}
+
+    def reset(self):
+        self.scanner.reset()
+        self.fields = {}
+
+    def __call__(self, text: str) -> Optional[bool]:
+        try:
+            values = self.scanner.feed(text)
+        except JSONStreamError as e:
+            logger.warning(f"Abandoning malformed CV parse response: {e}")
+            return False
+
+        updated = False
+        for path, value in values:
+            field = PARTIAL_FIELDS.get(path)
+            if field and value not in (None, "") and self.fields.get(field) != value:
+                self.fields[field] = value
+                updated = True
+
+        if updated and self.on_partial:
             try:
-                pdf_file = io.BytesIO(file_content)
-                pdf_reader = PyPDF2.PdfReader(pdf_file)
-                text_parts = []
-
-                for page in pdf_reader.pages:
-                    text = page.extract_text()
-                    if text:
-                        text_parts.append(text)
-
-                return "\n\n".join(text_parts)
-            except Exception as e2:
-                logger.error(f"PDF parsing failed: {e2}")
-                raise ValueError(f"Failed to parse PDF: {e2}")
-
-    def extract_text_from_docx(self, file_content: bytes) -> str:
-        """Extract text from DOCX file"""
+                self.on_partial(dict(self.fields))
+            except Exception as e:
+                logger.warning(f"Failed to publish partial CV fields: {e}")
+        return None
+
+
+class CVParserService:
+    """Service for parsing CVs and extracting structured data"""
+
+    def extract_text_from_pdf(
+        self, file_content: Union[bytes, BinaryIO], stats: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """
+        Extract text from PDF file with the tiered extractor
+
+        PyPDF2's text layer is used when it is dense and clean; pdfplumber
+        (better for complex layouts) only runs when it is sparse or garbled.
+
+        Args:
+            file_content: Raw PDF bytes or a seekable binary file
+            stats: Optional dict filled with the chosen tier and per-tier timings
+        """
+        text, extraction_stats = pdf_text_extractor.extract(
+            file_content,
+            max_chars=settings.CV_PDF_MAX_CHARS,
+            min_chars_per_page=settings.CV_PDF_MIN_CHARS_PER_PAGE,
+            parallel_min_pages=settings.CV_PDF_PARALLEL_MIN_PAGES,
+            workers=settings.CV_PDF_EXTRACT_WORKERS,
+            pages_per_task=settings.CV_PDF_PAGES_PER_TASK,
+        )
+        if stats is not None:
+            stats.update(extraction_stats)
+        return text
+
+    def extract_text_from_docx(self, file_content: Union[bytes, BinaryIO]) -> str:
+        """Extract text from DOCX file (raw bytes or a seekable binary file)"""
         try:
-            docx_file = io.BytesIO(file_content)
+            if isinstance(file_content, (bytes, bytearray)):
+                docx_file = io.BytesIO(file_content)
+            else:
+                docx_file = file_content
+                docx_file.seek(0)
             doc = Document(docx_file)
             text_parts = []
 
@@ -300,118 +405,567 @@ class CVParserService:
     async def parse_cv(
         self,
         cv: CV,
-        file_content: bytes,
+        file_content: Union[bytes, BinaryIO],
         db: Session,
         user_id: str,
+        stage_timer: Optional[StageTimer] = None,
+        on_partial: Optional[Callable[[Dict[str, Any]], None]] = None,
     ) -> Dict[str, Any]:
         """
         Parse CV file and extract structured data using LLM
 
         Args:
             cv: CV database object
-            file_content: Raw file bytes
+            file_content: Raw file bytes or a seekable binary file
             db: Database session
             user_id: User ID for tracking
+            stage_timer: Optional recorder for stage timings/progress events
+            on_partial: Optional callback receiving the PARTIAL_FIELDS found
+                so far while the LLM response streams in
 
         Returns:
             Parsed CV data dictionary
         """
-        try:
-            # Extract text based on file extension
-            filename_lower = cv.filename.lower()
+        stage_timer = stage_timer or StageTimer()
 
-            if filename_lower.endswith('.pdf'):
-                cv_text = self.extract_text_from_pdf(file_content)
-            elif filename_lower.endswith('.docx') or filename_lower.endswith('.doc'):
-                cv_text = self.extract_text_from_docx(file_content)
-            else:
-                raise ValueError(f"Unsupported file format: {cv.filename}")
+        try:
+            # Identical file already parsed for this user: skip extraction and LLM
+            content_hash = await self._content_hash(file_content)
+            cached = await run_db(
+                self._reuse_cached_parse, cv, content_hash, db, user_id, stage_timer
+            )
+            if cached:
+                return cached
 
-            if not cv_text or len(cv_text.strip()) < 100:
-                raise ValueError("Extracted text is too short or empty")
+            cv_text = await self._extract_cv_text(cv, file_content, stage_timer)
 
             # Save parsed text to CV
             cv.parsed_text = cv_text
-            db.commit()
+            await run_db(db.commit)
+
+            return await self._parse_cv_text(
+                cv, cv_text, db, user_id, stage_timer,
+                content_hash=content_hash, on_partial=on_partial,
+            )
+
+        except Exception as e:
+            logger.error(f"CV parsing error: {e}")
+            return {
+                "success": False,
+                "error": str(e),
+            }
+
+    def batch_parse_capacity(self) -> int:
+        """
+        CVs that fit in one batched parsing call
+
+        Every CV gets CV_PARSE_BATCH_PER_CV_TOKENS of output (the batch
+        prompt trims lists to fit it), and the call's max_tokens must stay
+        within CV_PARSE_BATCH_MAX_TOKENS and the model's output limit.
+        Below 2, batch mode cannot share any calls.
+        """
+        batch_max_tokens = min(
+            settings.CV_PARSE_BATCH_MAX_TOKENS,
+            llm_factory.get_service().max_output_tokens(),
+        )
+        return max(1, batch_max_tokens // settings.CV_PARSE_BATCH_PER_CV_TOKENS)
+
+    async def parse_cv_batch(
+        self,
+        items: List[Tuple[CV, Union[bytes, BinaryIO], Optional[StageTimer]]],
+        db: Session,
+        user_id: str,
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Parse several CVs with a single LLM call
+
+        The CV texts are packed into one request that shares the instruction
+        header, and the structured response is split back into one
+        CVParseDetail per CV. Any CV that cannot be matched to a valid entry
+        in the response (or a failed batch call) falls back to parse_cv's
+        single-CV path.
+
+        Args:
+            items: (CV, raw file bytes or file, optional StageTimer) tuples
+            db: Database session
+            user_id: User ID for tracking
+
+        Returns:
+            Dictionary of CV id -> result dictionary (same shape as parse_cv)
+        """
+        results: Dict[str, Dict[str, Any]] = {}
+        extracted: List[Tuple[CV, str, StageTimer]] = []
+        content_hashes: Dict[str, str] = {}
+
+        to_extract: List[Tuple[CV, Union[bytes, BinaryIO], StageTimer]] = []
+        for cv, file_content, stage_timer in items:
+            stage_timer = stage_timer or StageTimer()
+            try:
+                content_hash = await self._content_hash(file_content)
+                cached = await run_db(
+                    self._reuse_cached_parse, cv, content_hash, db, user_id, stage_timer
+                )
+            except Exception as e:
+                logger.error(f"CV parsing error for {cv.id}: {e}")
+                results[str(cv.id)] = {"success": False, "error": str(e)}
+                continue
+            if cached:
+                results[str(cv.id)] = cached
+                continue
+            content_hashes[str(cv.id)] = content_hash
+            to_extract.append((cv, file_content, stage_timer))
+
+        # Extract concurrently; the extraction pool bounds the actual parallelism
+        texts = await asyncio.gather(
+            *[
+                self._extract_cv_text(cv, file_content, stage_timer)
+                for cv, file_content, stage_timer in to_extract
+            ],
+            return_exceptions=True,
+        )
+        for (cv, _, stage_timer), cv_text in zip(to_extract, texts):
+            if isinstance(cv_text, Exception):
+                logger.error(f"CV parsing error for {cv.id}: {cv_text}")
+                results[str(cv.id)] = {"success": False, "error": str(cv_text)}
+                continue
+            cv.parsed_text = cv_text
+            extracted.append((cv, cv_text, stage_timer))
+
+        await run_db(db.commit)
 
-            # Prepare prompt
-            prompt = CV_PARSING_PROMPT.format(cv_text=cv_text)
+        per_call = self.batch_parse_capacity()
 
-            # Call LLM to parse CV
+        # CV id -> (parsed data, batch call result, CVs sharing the call)
+        batch_parsed: Dict[str, Tuple[Dict[str, Any], Dict[str, Any], int]] = {}
+        for start in range(0, len(extracted), per_call):
+            chunk = extracted[start:start + per_call]
+            if len(chunk) < 2:
+                continue
+            try:
+                chunk_parsed, result = await self._invoke_batch_parse(chunk, db, user_id)
+            except Exception as e:
+                logger.warning(f"Batch CV parsing failed, falling back to single calls: {e}")
+                continue
+            share = len(chunk_parsed) or 1
+            for index, (cv, _, _) in enumerate(chunk):
+                parsed_data = chunk_parsed.get(batch_ref(index))
+                if parsed_data is not None:
+                    batch_parsed[str(cv.id)] = (parsed_data, result, share)
+
+        for cv, cv_text, stage_timer in extracted:
+            entry = batch_parsed.get(str(cv.id))
+            if entry is None:
+                # Split failure (or batch of one): parse this CV on its own
+                try:
+                    results[str(cv.id)] = await self._parse_cv_text(
+                        cv, cv_text, db, user_id, stage_timer,
+                        content_hash=content_hashes.get(str(cv.id)),
+                    )
+                except Exception as e:
+                    logger.error(f"CV parsing error for {cv.id}: {e}")
+                    results[str(cv.id)] = {"success": False, "error": str(e)}
+                continue
+            parsed_data, result, share = entry
+
+            try:
+                cv_parse_detail = await run_db(
+                    self._save_parse_detail, cv, parsed_data, db, user_id, stage_timer,
+                    content_hash=content_hashes.get(str(cv.id)),
+                )
+            except Exception as e:
+                await run_db(db.rollback)
+                logger.error(f"Failed to save batch-parsed CV {cv.id}: {e}")
+                results[str(cv.id)] = {"success": False, "error": str(e)}
+                continue
+
+            usage, cost = share_usage(result, share)
+            results[str(cv.id)] = {
+                "success": True,
+                "parse_detail_id": str(cv_parse_detail.id),
+                "parsed_data": parsed_data,
+                "usage": usage,
+                "cost": cost,
+                "batched": True,
+            }
+
+        return results
+
+    async def extract_text(
+        self,
+        filename: str,
+        file_content: Union[bytes, BinaryIO],
+        stats: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """
+        Extract text based on file extension without blocking the event loop
+
+        Extraction runs in the bounded per-format extraction pool.
+
+        Args:
+            filename: Original filename (selects the extractor)
+            file_content: Raw file bytes or a seekable binary file
+            stats: Optional dict filled with PDF extraction tier/timings
+
+        Returns:
+            Extracted text
+        """
+        filename_lower = filename.lower()
+
+        if filename_lower.endswith('.pdf'):
+            return await extraction_pool.run(
+                "pdf", file_content, self.extract_text_from_pdf, stats=stats
+            )
+        elif filename_lower.endswith('.docx') or filename_lower.endswith('.doc'):
+            return await extraction_pool.run(
+                "docx", file_content, self.extract_text_from_docx
+            )
+        else:
+            raise ValueError(f"Unsupported file format: {filename}")
+
+    async def _extract_cv_text(
+        self, cv: CV, file_content: Union[bytes, BinaryIO], stage_timer: StageTimer
+    ) -> str:
+        """Extract and validate CV text based on file extension"""
+        with stage_timer.stage("EXTRACTING") as extract_stage:
+            extraction_stats: Dict[str, Any] = {}
+            try:
+                cv_text = await self.extract_text(
+                    cv.filename, file_content, stats=extraction_stats
+                )
+            finally:
+                if extraction_stats:
+                    extract_stage["pdf"] = extraction_stats
+            extract_stage["chars"] = len(cv_text or "")
+
+        if not cv_text or len(cv_text.strip()) < 100:
+            raise ValueError("Extracted text is too short or empty")
+
+        return cv_text
+
+    async def _parse_cv_text(
+        self,
+        cv: CV,
+        cv_text: str,
+        db: Session,
+        user_id: str,
+        stage_timer: StageTimer,
+        content_hash: Optional[str] = None,
+        on_partial: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Parse already-extracted CV text with a single LLM call
+
+        With LLM_STREAMING_ENABLED the response is scanned as it streams:
+        PARTIAL_FIELDS are passed to on_partial as soon as they are complete,
+        and a response that stops being JSON is abandoned mid-generation. A
+        malformed or truncated response is retried once with a larger
+        output budget.
+        """
+        # Prepare prompt
+        prompt = CV_PARSING_PROMPT.format(cv_text=cv_text)
+        llm_service = llm_factory.get_service()
+        model_max_tokens = llm_service.max_output_tokens()
+        max_tokens = min(settings.CV_PARSE_MAX_TOKENS, model_max_tokens)
+        total_usage: Dict[str, int] = {}
+        total_cost = 0.0
+        cv_id = str(cv.id)
+
+        # Don't hold a pooled connection while the LLM generates
+        await run_db(release_connection, db)
+
+        # Call LLM to parse CV
+        with stage_timer.stage("PARSING_WITH_AI") as llm_stage:
+            for attempt in range(2):
+                scanner = None
+                on_delta = None
+                if settings.LLM_STREAMING_ENABLED:
+                    scanner = IncrementalJSONScanner()
+                    on_delta = self._partial_field_handler(scanner, on_partial)
+
+                result = await llm_service.invoke_model(
+                    prompt=prompt,
+                    db=db,
+                    user_id=user_id,
+                    call_type=LLMCallType.CV_PARSING,
+                    system_prompt=CV_PARSING_SYSTEM_PROMPT,
+                    cache_system_prompt=True,
+                    cv_id=cv_id,
+                    max_tokens=max_tokens,  # Need more tokens for detailed CV parsing
+                    temperature=0.3,  # Lower temperature for more consistent extraction
+                    on_delta=on_delta,
+                )
+                llm_stage["llm_latency_ms"] = result.get("latency_ms")
+                if not result["success"]:
+                    break
+                # Every attempt is billed, so report the usage of all of them
+                for key, value in result["usage"].items():
+                    total_usage[key] = total_usage.get(key, 0) + value
+                llm_stage["usage"] = dict(total_usage)
+                total_cost += result["cost"]["total_cost"]
+
+                if result.get("truncated"):
+                    retry_reason = "truncated"
+                elif scanner is not None and not scanner.complete:
+                    retry_reason = "malformed"
+                else:
+                    break
+                if attempt:
+                    break
+                retry_max_tokens = max(
+                    max_tokens, min(settings.CV_PARSE_RETRY_MAX_TOKENS, model_max_tokens)
+                )
+                if retry_reason == "truncated" and retry_max_tokens <= max_tokens:
+                    # Already at the model's output limit: a retry would truncate again
+                    break
+
+                logger.warning(f"CV {cv_id} parse response was {retry_reason}, retrying")
+                llm_stage["retry_reason"] = retry_reason
+                max_tokens = retry_max_tokens
+
+        if not result["success"]:
+            raise ValueError(f"LLM parsing failed: {result.get('error')}")
+
+        parsed_data = load_json_response(result["response"])
+
+        cv_parse_detail = await run_db(
+            self._save_parse_detail,
+            cv, parsed_data, db, user_id, stage_timer, content_hash=content_hash,
+        )
+
+        return {
+            "success": True,
+            "parse_detail_id": str(cv_parse_detail.id),
+            "parsed_data": parsed_data,
+            "usage": total_usage,
+            "cost": total_cost,
+        }
+
+    @staticmethod
+    def _partial_field_handler(
+        scanner: IncrementalJSONScanner,
+        on_partial: Optional[Callable[[Dict[str, Any]], None]],
+    ) -> "_PartialFieldHandler":
+        """
+        Build the on_delta callback for a streamed parsing call
+
+        Feeds each delta to the scanner and reports new PARTIAL_FIELDS values.
+        Returns False (stop generating) once the response cannot be JSON.
+        """
+        return _PartialFieldHandler(scanner, on_partial)
+
+    async def _invoke_batch_parse(
+        self,
+        extracted: List[Tuple[CV, str, StageTimer]],
+        db: Session,
+        user_id: str,
+    ) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, Any]]:
+        """
+        Send several CV texts in one request and split the response by cv_ref
+
+        Returns:
+            (cv_ref -> parsed data for every valid entry, raw LLM result)
+        """
+        cv_blocks = "\n\n".join(
+            f"=== {batch_ref(index)} START ===\n{cv_text}\n=== {batch_ref(index)} END ==="
+            for index, (_, cv_text, _) in enumerate(extracted)
+        )
+        prompt = CV_BATCH_PARSING_PROMPT.format(
+            cv_count=len(extracted),
+            cv_blocks=cv_blocks,
+        )
+
+        # Don't hold a pooled connection while the LLM generates
+        await run_db(release_connection, db)
+
+        # The one shared LLM call is timed as PARSING_WITH_AI for every CV
+        with ExitStack() as stack:
+            llm_stages = [
+                stack.enter_context(
+                    stage_timer.stage("PARSING_WITH_AI", batch_size=len(extracted))
+                )
+                for _, _, stage_timer in extracted
+            ]
             result = await llm_factory.get_service().invoke_model(
                 prompt=prompt,
                 db=db,
                 user_id=user_id,
                 call_type=LLMCallType.CV_PARSING,
-                cv_id=str(cv.id),
-                max_tokens=8000,  # Need more tokens for detailed CV parsing
-                temperature=0.3,  # Lower temperature for more consistent extraction
-            )
-
-            if not result["success"]:
-                raise ValueError(f"LLM parsing failed: {result.get('error')}")
-
-            # Parse JSON response
-            try:
-                # Clean response (remove ```json ... ``` wrapper if present)
-                response_text = result["response"].strip()
-                if response_text.startswith("```"):
-                    response_text = response_text.strip("`")
-                    if response_text.startswith("json"):
-                        response_text = response_text[4:]
-                response_text = response_text.strip()
-                
-                parsed_data = json.loads(response_text)
-            except json.JSONDecodeError as e:
-                logger.error(f"Failed to parse LLM response as JSON: {e}")
-                logger.error(f"Response: {result['response'][:500]}")
-                raise ValueError(f"Invalid JSON response from LLM: {e}")
-
-            # Extract quick access fields
-            personal_info = parsed_data.get("personal_info", {})
-            summary = parsed_data.get("summary", {})
-            meta = parsed_data.get("meta", {})
-            skill_freshness = meta.get("skill_freshness_summary", {})
-
-            # Create CVParseDetail record
-            cv_parse_detail = CVParseDetail(
-                cv_id=cv.id,
-                user_id=user_id,
-                parsed_data=parsed_data,
-                candidate_name=personal_info.get("name"),
-                candidate_email=personal_info.get("email"),
-                current_role=summary.get("current_role"),
-                current_company=summary.get("current_company"),
-                total_experience_years=summary.get("total_experience_years"),
-                career_level=summary.get("career_level"),
-                current_skills_count=skill_freshness.get("current_skills_count", 0),
-                outdated_skills_count=skill_freshness.get("outdated_skills_count", 0),
-                github_username=personal_info.get("github", "").split("/")[-1] if personal_info.get("github") else None,
-                cv_quality_score=self._calculate_quality_score(meta.get("cv_quality", "medium")),
-                parsing_confidence=meta.get("parsing_confidence"),
-                red_flags_count=len(meta.get("red_flags", [])),
+                system_prompt=CV_BATCH_PARSING_SYSTEM_PROMPT,
+                cache_system_prompt=True,
+                max_tokens=settings.CV_PARSE_BATCH_PER_CV_TOKENS * len(extracted),
+                temperature=0.3,
             )
-
+            for llm_stage in llm_stages:
+                llm_stage["llm_latency_ms"] = result.get("latency_ms")
+
+        if not result["success"]:
+            raise ValueError(f"LLM batch parsing failed: {result.get('error')}")
+
+        response_data = load_json_response(result["response"])
+        entries = response_data.get("results") if isinstance(response_data, dict) else None
+        if not isinstance(entries, list):
+            raise ValueError("Batch response has no results list")
+
+        batch_parsed: Dict[str, Dict[str, Any]] = {}
+        for entry in entries:
+            if not isinstance(entry, dict):
+                continue
+            cv_ref = str(entry.get("cv_ref", "")).strip()
+            parsed_data = entry.get("parsed")
+            if isinstance(parsed_data, dict) and "personal_info" in parsed_data:
+                batch_parsed[cv_ref] = parsed_data
+
+        logger.info(
+            f"Batch parsed {len(batch_parsed)}/{len(extracted)} CVs in one call | "
+            f"Tokens: {result['usage'].get('input_tokens')}/{result['usage'].get('output_tokens')}"
+        )
+
+        return batch_parsed, result
+
+    def _save_parse_detail(
+        self,
+        cv: CV,
+        parsed_data: Dict[str, Any],
+        db: Session,
+        user_id: str,
+        stage_timer: StageTimer,
+        content_hash: Optional[str] = None,
+    ) -> CVParseDetail:
+        """Create the CVParseDetail row for a parsed CV"""
+        # Extract quick access fields
+        personal_info = parsed_data.get("personal_info", {})
+        summary = parsed_data.get("summary", {})
+        meta = parsed_data.get("meta", {})
+        skill_freshness = meta.get("skill_freshness_summary", {})
+
+        # Create CVParseDetail record
+        cv_parse_detail = CVParseDetail(
+            cv_id=cv.id,
+            user_id=user_id,
+            parsed_data=parsed_data,
+            content_hash=content_hash,
+            candidate_name=personal_info.get("name"),
+            candidate_email=personal_info.get("email"),
+            current_role=summary.get("current_role"),
+            current_company=summary.get("current_company"),
+            total_experience_years=summary.get("total_experience_years"),
+            career_level=summary.get("career_level"),
+            current_skills_count=skill_freshness.get("current_skills_count", 0),
+            outdated_skills_count=skill_freshness.get("outdated_skills_count", 0),
+            github_username=personal_info.get("github", "").split("/")[-1] if personal_info.get("github") else None,
+            cv_quality_score=self._calculate_quality_score(meta.get("cv_quality", "medium")),
+            parsing_confidence=meta.get("parsing_confidence"),
+            red_flags_count=len(meta.get("red_flags", [])),
+        )
+
+        with stage_timer.stage("SAVING_PARSE_DETAIL"):
             db.add(cv_parse_detail)
             db.commit()
             db.refresh(cv_parse_detail)
 
-            logger.info(f"Successfully parsed CV {cv.id} for candidate: {cv_parse_detail.candidate_name}")
+        logger.info(f"Successfully parsed CV {cv.id} for candidate: {cv_parse_detail.candidate_name}")
+
+        return cv_parse_detail
+
+    @staticmethod
+    def compute_content_hash(file_content: Union[bytes, BinaryIO]) -> str:
+        """SHA-256 of the raw file bytes plus the parsing prompt version"""
+        if isinstance(file_content, (bytes, bytearray)):
+            digest = hashlib.sha256(file_content)
+        else:
+            # Stream spooled files instead of loading them whole
+            digest = hashlib.sha256()
+            file_content.seek(0)
+            for chunk in iter(lambda: file_content.read(1024 * 1024), b""):
+                digest.update(chunk)
+            file_content.seek(0)
+        digest.update(CV_PARSING_PROMPT_VERSION.encode("utf-8"))
+        return digest.hexdigest()
+
+    async def _content_hash(self, file_content: Union[bytes, BinaryIO]) -> str:
+        """
+        compute_content_hash in the loop's executor
 
-            return {
-                "success": True,
-                "parse_detail_id": str(cv_parse_detail.id),
-                "parsed_data": parsed_data,
-                "usage": result["usage"],
-                "cost": result["cost"]["total_cost"],
-            }
+        Hashing a multi-MB file on the shared pipeline loop would stall
+        every other pipeline; hashlib releases the GIL while it works.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.compute_content_hash, file_content)
 
-        except Exception as e:
-            logger.error(f"CV parsing error: {e}")
-            return {
-                "success": False,
-                "error": str(e),
-            }
+    def _reuse_cached_parse(
+        self,
+        cv: CV,
+        content_hash: str,
+        db: Session,
+        user_id: str,
+        stage_timer: StageTimer,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Reuse the parse of an identical file previously uploaded by this user
+
+        Copies the cached parsed data into a new CVParseDetail for this CV and
+        records a zero-cost LLMCall so usage stats still show the request.
+
+        Returns:
+            Result dictionary (same shape as parse_cv) or None on a cache miss
+        """
+        start_time = time.time()
+
+        with stage_timer.stage("PARSE_CACHE_LOOKUP") as lookup_stage:
+            cached_detail = (
+                db.query(CVParseDetail)
+                .filter(
+                    CVParseDetail.content_hash == content_hash,
+                    CVParseDetail.user_id == user_id,
+                    CVParseDetail.cv_id != cv.id,
+                )
+                .order_by(CVParseDetail.created_at.desc())
+                .first()
+            )
+            lookup_stage["hit"] = cached_detail is not None
+
+        if not cached_detail:
+            return None
+
+        # Keep the extracted text alongside the reused parse
+        if cached_detail.cv and cached_detail.cv.parsed_text:
+            cv.parsed_text = cached_detail.cv.parsed_text
+
+        cv_parse_detail = self._save_parse_detail(
+            cv, cached_detail.parsed_data, db, user_id, stage_timer,
+            content_hash=content_hash,
+        )
+
+        llm_usage_recorder.record(
+            user_id=user_id,
+            cv_id=cv.id,
+            cv_parse_detail_id=cv_parse_detail.id,
+            call_type=LLMCallType.CV_PARSING,
+            model_name="content-hash-cache",
+            provider="cache",
+            input_tokens=0,
+            output_tokens=0,
+            total_tokens=0,
+            input_cost=0.0,
+            output_cost=0.0,
+            total_cost=0.0,
+            latency_ms=int((time.time() - start_time) * 1000),
+            success=True,
+        )
+
+        logger.info(
+            f"Reused parse of CV {cached_detail.cv_id} for CV {cv.id} "
+            f"(content hash {content_hash[:12]})"
+        )
+
+        return {
+            "success": True,
+            "parse_detail_id": str(cv_parse_detail.id),
+            "parsed_data": cv_parse_detail.parsed_data,
+            "usage": {"input_tokens": 0, "output_tokens": 0, "total_tokens": 0},
+            "cost": 0.0,
+            "cache_hit": True,
+        }
 
     def _calculate_quality_score(self, quality: str) -> int:
         """Convert quality string to numeric score"""
@@ -7,9 +7,10 @@ Optimized with TOON encoding for 30-60% token savings
 import json
 from typing import Dict, Any, Optional
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import flag_modified
 from app.services.llm_factory import llm_factory
 from app.services.toon_service import toon_service
-from app.models.jd_builder import LLMCallType, JobDescription, JDStatus, JDSource
+from app.models.jd_builder import LLMCallType, JobDescription, JDStatus, JDSource, CVJDMatchCache
 import logging
 
 logger = logging.getLogger(__name__)
@@ -261,8 +262,8 @@ class JDBuilderService:
             jd.status = JDStatus.GENERATING
             db.commit()
 
-            # Call LLM to generate JD
-            llm_service = llm_factory.get_service()
+            # Call LLM to generate JD (the request waits on it, so don't queue long)
+            llm_service = llm_factory.get_service(interactive=True)
             result = await llm_service.invoke_model(
                 prompt=prompt,
                 db=db,
@@ -277,6 +278,8 @@ class JDBuilderService:
                 jd.status = JDStatus.FAILED
                 jd.error_message = result.get("error")
                 db.commit()
+                if result.get("throttled"):
+                    return {"success": False, "error": result.get("error"), "throttled": True}
                 raise ValueError(f"LLM generation failed: {result.get('error')}")
 
             # Parse JSON response
@@ -292,6 +295,7 @@ class JDBuilderService:
             # Save structured JD
             jd.structured_jd = structured_jd
             jd.status = JDStatus.COMPLETED
+            self._mark_jd_changed(jd, db)
             db.commit()
             db.refresh(jd)
 
@@ -336,8 +340,8 @@ class JDBuilderService:
             # Prepare prompt
             prompt = JD_PARSING_PROMPT.format(jd_text=jd_text)
 
-            # Call LLM to parse JD
-            llm_service = llm_factory.get_service()
+            # Call LLM to parse JD (the request waits on it, so don't queue long)
+            llm_service = llm_factory.get_service(interactive=True)
             result = await llm_service.invoke_model(
                 prompt=prompt,
                 db=db,
@@ -348,6 +352,8 @@ class JDBuilderService:
             )
 
             if not result["success"]:
+                if result.get("throttled"):
+                    return {"success": False, "error": result.get("error"), "throttled": True}
                 raise ValueError(f"LLM parsing failed: {result.get('error')}")
 
             # Parse JSON response
@@ -401,10 +407,12 @@ class JDBuilderService:
                 extracted_data = jd.structured_jd.get("extracted_data", {})
                 extracted_data.update(user_provided_fields)
                 jd.structured_jd["extracted_data"] = extracted_data
+                flag_modified(jd, "structured_jd")
 
                 # Clear missing_fields since they've been provided
                 jd.missing_fields = None
                 jd.status = JDStatus.COMPLETED
+                self._mark_jd_changed(jd, db)
                 db.commit()
                 db.refresh(jd)
 
@@ -425,6 +433,18 @@ class JDBuilderService:
                 "error": str(e),
             }
 
+    def _mark_jd_changed(self, jd: JobDescription, db: Session):
+        """
+        Bump the JD revision and drop memoized match results for older revisions
+
+        Called whenever structured_jd changes; the caller commits.
+        """
+        jd.revision = (jd.revision or 1) + 1
+        db.query(CVJDMatchCache).filter(
+            CVJDMatchCache.job_description_id == jd.id,
+            CVJDMatchCache.jd_revision < jd.revision,
+        ).delete(synchronize_session=False)
+
 
 # Singleton instance
 jd_builder_service = JDBuilderService()
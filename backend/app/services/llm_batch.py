@@ -0,0 +1,58 @@
+"""
+LLM Batch Helpers
+Shared by the CV parser and CV-JD matcher for batched (several CVs per call)
+prompts and JSON responses
+"""
+
+import json
+from typing import Any, Dict, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def batch_ref(index: int) -> str:
+    """Reference id used to tag a CV inside a batch prompt"""
+    return f"CV-{index + 1}"
+
+
+def load_json_response(response: str) -> Dict[str, Any]:
+    """
+    Parse an LLM response as JSON, stripping ```json fences
+
+    Raises:
+        ValueError: If the response is not valid JSON
+    """
+    try:
+        # Clean response (remove ```json ... ``` wrapper if present)
+        response_text = response.strip()
+        if response_text.startswith("```"):
+            response_text = response_text.strip("`")
+            if response_text.startswith("json"):
+                response_text = response_text[4:]
+        response_text = response_text.strip()
+
+        return json.loads(response_text)
+    except json.JSONDecodeError as e:
+        logger.error(f"Failed to parse LLM response as JSON: {e}")
+        logger.error(f"Response: {response[:500]}")
+        raise ValueError(f"Invalid JSON response from LLM: {e}")
+
+
+def share_usage(result: Dict[str, Any], share: int) -> Tuple[Dict[str, int], float]:
+    """
+    Attribute an even share of a batch call's usage to each CV in it
+
+    Args:
+        result: invoke_model result of the batch call
+        share: Number of CVs the call served
+
+    Returns:
+        (usage, cost) for one CV
+    """
+    share = share or 1
+    usage = {
+        key: value // share
+        for key, value in result["usage"].items()
+    }
+    return usage, result["cost"]["total_cost"] / share
@@ -2,8 +2,11 @@
 LLM Factory to switch between providers
 """
 
-from typing import Any
+import time
+from typing import Any, Dict, Optional
 from app.core.config import settings
+from app.core.llm_rate_governor import LLMQueueTimeout, llm_rate_governor
+from app.core.prompt_utils import estimate_tokens
 from app.services.bedrock import bedrock_service
 from app.services.openai_service import openai_service
 
@@ -11,23 +14,125 @@ import logging
 
 logger = logging.getLogger(__name__)
 
-class LLMFactory:
+
+class GovernedLLMService:
+    """
+    Puts the distributed rate governor in front of a provider service
+
+    Every invoke_model call first waits for request/token/concurrency capacity
+    for its model, so bursts from many workers queue up at the provider quota
+    instead of failing. Calls the provider still throttles are re-queued
+    (after the governor backs off) up to LLM_GOVERNOR_MAX_THROTTLE_RETRIES
+    times, all within max_wait_seconds; after that the call returns a
+    throttled error result. Other attributes are passed through to the
+    wrapped service.
+    """
+
+    def __init__(self, service: Any, provider: str, max_wait_seconds: float):
+        self.service = service
+        self.provider = provider
+        self.max_wait_seconds = max_wait_seconds
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.service, name)
+
     @staticmethod
-    def get_service() -> Any:
+    def _estimate_tokens(prompt: str, system_prompt: Optional[str], max_tokens: int) -> int:
+        """Input estimate plus the full output budget (what provider quotas reserve)"""
+        return estimate_tokens(prompt) + estimate_tokens(system_prompt or "") + max_tokens
+
+    async def invoke_model(self, prompt: str, **kwargs) -> Dict[str, Any]:
+        """
+        Invoke the wrapped service's model once capacity is available
+
+        Takes the same arguments and returns the same result as the provider
+        service's invoke_model. A streaming on_delta callback that has a
+        reset() method is reset before a throttled call is re-sent, since
+        the retry streams its response from the start.
+        """
+        model = kwargs.get("model_id") or self.service.default_model
+        reserved_tokens = self._estimate_tokens(
+            prompt, kwargs.get("system_prompt"), kwargs.get("max_tokens", 4096)
+        )
+        deadline = time.time() + self.max_wait_seconds
+
+        for attempt in range(settings.LLM_GOVERNOR_MAX_THROTTLE_RETRIES + 1):
+            try:
+                lease_id, charged_tokens = await llm_rate_governor.acquire(
+                    self.provider, model, reserved_tokens, deadline
+                )
+            except LLMQueueTimeout as e:
+                logger.error(f"LLM call not sent: {e}")
+                return {
+                    "success": False,
+                    "error": str(e),
+                    "response": None,
+                    "throttled": True,
+                }
+
+            result = None
+            try:
+                result = await self.service.invoke_model(prompt=prompt, **kwargs)
+            finally:
+                usage = (result or {}).get("usage")
+                await llm_rate_governor.release(
+                    self.provider,
+                    model,
+                    lease_id,
+                    charged_tokens,
+                    usage.get("total_tokens") if usage else None,
+                    success=bool(result and result.get("success")),
+                )
+
+            if not result.get("throttled"):
+                return result
+
+            await llm_rate_governor.throttled(self.provider, model)
+            # The retry streams a new response from the start
+            reset_stream = getattr(kwargs.get("on_delta"), "reset", None)
+            if reset_stream:
+                reset_stream()
+            logger.warning(
+                f"LLM call to {self.provider}:{model} throttled, re-queueing "
+                f"(attempt {attempt + 1}/{settings.LLM_GOVERNOR_MAX_THROTTLE_RETRIES + 1})"
+            )
+
+        return result
+
+
+class LLMFactory:
+    def __init__(self):
+        self._governed = {
+            provider: GovernedLLMService(service, provider, settings.LLM_GOVERNOR_MAX_WAIT_SECONDS)
+            for provider, service in (("bedrock", bedrock_service), ("openai", openai_service))
+        }
+        self._interactive = {
+            provider: GovernedLLMService(
+                service, provider, settings.LLM_GOVERNOR_INTERACTIVE_MAX_WAIT_SECONDS
+            )
+            for provider, service in (("bedrock", bedrock_service), ("openai", openai_service))
+        }
+
+    def get_service(self, interactive: bool = False) -> Any:
         """
         Get the configured LLM service instance
+
+        Args:
+            interactive: The caller holds an HTTP request open, so only wait
+                LLM_GOVERNOR_INTERACTIVE_MAX_WAIT_SECONDS for capacity before
+                returning a throttled result
         """
         provider = settings.LLM_PROVIDER.lower()
-        
+
         logger.info(f"Using LLM Provider: {provider}")
-        
-        if provider == "openai":
-            return openai_service
-        elif provider == "bedrock":
-            return bedrock_service
-        else:
+
+        if provider not in ("openai", "bedrock"):
             # Default to bedrock if unknown
             logger.warning(f"Unknown LLM provider '{provider}', defaulting to Bedrock")
-            return bedrock_service
+            provider = "bedrock"
+
+        if settings.LLM_GOVERNOR_ENABLED:
+            return (self._interactive if interactive else self._governed)[provider]
+        return openai_service if provider == "openai" else bedrock_service
 
 llm_factory = LLMFactory()
@@ -0,0 +1,184 @@
+"""
+LLM Usage Recorder
+Buffers LLMCall telemetry rows in memory and bulk-inserts them from a
+background thread, keeping the usage bookkeeping off the model-call path
+"""
+
+import atexit
+import os
+import threading
+import uuid
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, Optional
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from app.core.config import settings
+from app.database import SessionLocal
+from app.models.jd_builder import LLMCall
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Flushes a row may fail (e.g. its CV was deleted) before it is dropped
+MAX_ROW_ATTEMPTS = 3
+
+# Marks rows of streamed calls stopped early, whose token counts are estimates
+ABORTED_STREAM_MESSAGE = "Stream aborted by caller; token counts estimated from the streamed text"
+
+
+class LLMUsageRecorder:
+    """
+    Write-behind recorder for LLMCall rows
+
+    record() assigns the row's id and timestamp up front and returns the id
+    immediately, so callers get a stable llm_call_id without a round trip.
+    Rows are inserted in one statement per flush, every
+    LLM_USAGE_FLUSH_INTERVAL seconds or sooner once LLM_USAGE_FLUSH_SIZE rows
+    are waiting. The buffer is flushed on shutdown.
+    """
+
+    def __init__(self, flush_interval: float, flush_size: int, max_buffer: int):
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self.max_buffer = max_buffer
+        self._buffer: Deque[Dict[str, Any]] = deque()
+        self._attempts: Dict[uuid.UUID, int] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._thread_pid: Optional[int] = None
+
+    def _ensure_thread(self):
+        # One writer per process (forked workers start their own)
+        if self._thread is None or self._thread_pid != os.getpid():
+            with self._lock:
+                if self._thread is None or self._thread_pid != os.getpid():
+                    self._thread = threading.Thread(
+                        target=self._run, name="llm-usage-recorder", daemon=True
+                    )
+                    self._thread_pid = os.getpid()
+                    self._thread.start()
+
+    def record(self, **fields) -> str:
+        """
+        Queue an LLMCall row for insertion
+
+        Args:
+            **fields: LLMCall column values
+
+        Returns:
+            The row's id (as a string)
+        """
+        row = {
+            "id": uuid.uuid4(),
+            "created_at": datetime.now(timezone.utc),
+            **fields,
+        }
+        self._ensure_thread()
+
+        with self._lock:
+            if len(self._buffer) >= self.max_buffer:
+                dropped = self._buffer.popleft()
+                logger.error(f"LLM usage buffer full, dropping call {dropped['id']}")
+            self._buffer.append(row)
+            pending = len(self._buffer)
+
+        if pending >= self.flush_size:
+            self._wakeup.set()
+
+        return str(row["id"])
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def flush(self):
+        """Insert every buffered row"""
+        with self._flush_lock:
+            with self._lock:
+                rows = list(self._buffer)
+                self._buffer.clear()
+            if rows:
+                self._insert(rows)
+
+    def _insert(self, rows: List[Dict[str, Any]]):
+        # executemany needs the same keys in every row: insert rows with the
+        # same columns together, so omitted columns keep their defaults
+        # instead of being written as NULL
+        shapes: Dict[frozenset, List[Dict[str, Any]]] = {}
+        for row in rows:
+            shapes.setdefault(frozenset(row), []).append(row)
+
+        db = SessionLocal()
+        try:
+            for shape_rows in shapes.values():
+                db.execute(insert(LLMCall), shape_rows)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Bulk insert of {len(rows)} LLM calls failed, retrying one by one: {e}")
+        else:
+            if self._attempts:
+                for row in rows:
+                    self._attempts.pop(row["id"], None)
+            return
+        finally:
+            db.close()
+
+        # One bad row (e.g. a CV deleted meanwhile) must not lose the batch
+        retry = []
+        db = SessionLocal()
+        try:
+            for row in rows:
+                try:
+                    with db.begin_nested():
+                        db.execute(insert(LLMCall), [row])
+                except IntegrityError as e:
+                    attempts = self._attempts.get(row["id"], 0) + 1
+                    if attempts >= MAX_ROW_ATTEMPTS:
+                        self._attempts.pop(row["id"], None)
+                        logger.error(f"Dropping LLM call {row['id']} after {attempts} attempts: {e}")
+                    else:
+                        self._attempts[row["id"]] = attempts
+                        retry.append(row)
+                else:
+                    self._attempts.pop(row["id"], None)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Failed to record {len(rows)} LLM calls: {e}")
+            retry = rows
+        finally:
+            db.close()
+
+        if retry:
+            # Rows referencing uncommitted parents get another chance next flush
+            with self._lock:
+                self._buffer.extendleft(reversed(retry))
+
+    def shutdown(self):
+        """Stop the writer thread and flush what is left"""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None and self._thread_pid == os.getpid():
+            self._thread.join(timeout=self.flush_interval + 5)
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"Final LLM usage flush failed: {e}")
+        if self._buffer:
+            logger.error(f"{len(self._buffer)} LLM calls could not be recorded before shutdown")
+
+
+# Singleton instance
+llm_usage_recorder = LLMUsageRecorder(
+    flush_interval=settings.LLM_USAGE_FLUSH_INTERVAL,
+    flush_size=settings.LLM_USAGE_FLUSH_SIZE,
+    max_buffer=settings.LLM_USAGE_MAX_BUFFER,
+)
+atexit.register(llm_usage_recorder.shutdown)
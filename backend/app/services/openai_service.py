@@ -5,11 +5,13 @@ Handles LLM calls with token tracking and cost calculation
 
 import json
 import time
-from typing import Dict, Any, Optional
-from openai import AsyncOpenAI, OpenAIError
+from typing import Any, Callable, Dict, Optional, Tuple
+from openai import AsyncOpenAI, OpenAIError, RateLimitError
 from sqlalchemy.orm import Session
 from app.core.config import settings
-from app.models.jd_builder import LLMCall, LLMCallType
+from app.core.prompt_utils import estimate_tokens
+from app.models.jd_builder import LLMCallType
+from app.services.llm_usage_recorder import ABORTED_STREAM_MESSAGE, llm_usage_recorder
 import logging
 
 logger = logging.getLogger(__name__)
@@ -32,6 +34,17 @@ TOKEN_PRICING = {
     },
 }
 
+# Largest max_tokens each model accepts (requests above it are rejected)
+MAX_OUTPUT_TOKENS = {
+    "gpt-4o": 16384,
+    "gpt-4o-mini": 16384,
+    "gpt-4-turbo": 4096,
+}
+DEFAULT_MAX_OUTPUT_TOKENS = 4096
+
+# Prompt-cached input tokens are billed at half the input price
+CACHED_INPUT_PRICE_MULTIPLIER = 0.5
+
 
 class OpenAIService:
     """Service for interacting with OpenAI models"""
@@ -39,15 +52,34 @@ class OpenAIService:
     def __init__(self):
         self.client = None
         if settings.OPENAI_API_KEY:
-            self.client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+            # The rate governor re-queues throttled calls itself; the SDK
+            # retrying them as well would multiply requests at the quota
+            self.client = AsyncOpenAI(
+                api_key=settings.OPENAI_API_KEY,
+                max_retries=0 if settings.LLM_GOVERNOR_ENABLED else 2,
+            )
         self.default_model = "gpt-4o-mini"
 
-    def _calculate_cost(self, model_name: str, input_tokens: int, output_tokens: int) -> Dict[str, float]:
-        """Calculate cost based on token usage"""
+    def max_output_tokens(self, model_id: Optional[str] = None) -> int:
+        """Largest max_tokens the model accepts"""
+        return MAX_OUTPUT_TOKENS.get(model_id or self.default_model, DEFAULT_MAX_OUTPUT_TOKENS)
+
+    def _calculate_cost(
+        self,
+        model_name: str,
+        input_tokens: int,
+        output_tokens: int,
+        cached_input_tokens: int = 0,
+    ) -> Dict[str, float]:
+        """Calculate cost based on token usage (cached_input_tokens is part of input_tokens)"""
         # Default to gpt-4o pricing if model not found
         pricing = TOKEN_PRICING.get(model_name, TOKEN_PRICING["gpt-4o"])
 
-        input_cost = (input_tokens / 1_000_000) * pricing["input"]
+        billed_input_tokens = (
+            input_tokens - cached_input_tokens
+            + cached_input_tokens * CACHED_INPUT_PRICE_MULTIPLIER
+        )
+        input_cost = (billed_input_tokens / 1_000_000) * pricing["input"]
         output_cost = (output_tokens / 1_000_000) * pricing["output"]
         total_cost = input_cost + output_cost
 
@@ -57,6 +89,44 @@ class OpenAIService:
             "total_cost": round(total_cost, 6),
         }
 
+    async def _stream_completion(
+        self,
+        params: Dict[str, Any],
+        on_delta: Callable[[str], Any],
+    ) -> Tuple[str, Optional[Any], Optional[str]]:
+        """
+        Stream a chat completion, passing each text delta to on_delta
+
+        on_delta returning False closes the stream early (finish reason
+        "aborted"; usage is then unavailable and invoke_model estimates it).
+
+        Returns:
+            (response_text, usage, finish_reason)
+        """
+        stream = await self.client.chat.completions.create(
+            **params,
+            stream=True,
+            stream_options={"include_usage": True},
+        )
+        text_parts = []
+        usage = None
+        finish_reason = None
+        async for chunk in stream:
+            if chunk.usage:
+                usage = chunk.usage
+            if not chunk.choices:
+                continue
+            choice = chunk.choices[0]
+            finish_reason = choice.finish_reason or finish_reason
+            text = choice.delta.content if choice.delta else None
+            if text:
+                text_parts.append(text)
+                if on_delta(text) is False:
+                    await stream.close()
+                    finish_reason = "aborted"
+                    break
+        return "".join(text_parts), usage, finish_reason
+
     async def invoke_model(
         self,
         prompt: str,
@@ -71,9 +141,15 @@ class OpenAIService:
         cv_id: Optional[str] = None,
         cv_parse_detail_id: Optional[str] = None,
         use_toon: bool = True, # Kept for interface compatibility, though TOON is less critical for OpenAI
+        on_delta: Optional[Callable[[str], Any]] = None,
+        cache_system_prompt: bool = False,  # OpenAI caches long shared prefixes automatically
     ) -> Dict[str, Any]:
         """
         Invoke OpenAI model with token tracking
+
+        With on_delta the response is streamed and each text delta is passed
+        to the callback as it arrives (returning False stops generation).
+        The system prompt goes first so a static one forms a cacheable prefix.
         """
         if not self.client:
             return {
@@ -91,31 +167,50 @@ class OpenAIService:
             
             messages.append({"role": "user", "content": prompt})
 
+            params = {
+                "model": model_name,
+                "messages": messages,
+                "max_tokens": max_tokens,
+                "temperature": temperature,
+            }
+
             # Invoke OpenAI
-            response = await self.client.chat.completions.create(
-                model=model_name,
-                messages=messages,
-                max_tokens=max_tokens,
-                temperature=temperature,
-            )
+            if on_delta:
+                response_text, usage, finish_reason = await self._stream_completion(
+                    params, on_delta
+                )
+            else:
+                response = await self.client.chat.completions.create(**params)
+                response_text = response.choices[0].message.content or ""
+                usage = response.usage
+                finish_reason = response.choices[0].finish_reason
 
-            # Extract response
-            response_text = response.choices[0].message.content
-            
-            # Extract token usage
-            usage = response.usage
-            input_tokens = usage.prompt_tokens
-            output_tokens = usage.completion_tokens
-            total_tokens = usage.total_tokens
+            # Extract token usage (missing when a stream was stopped early,
+            # but everything generated so far is still billed)
+            aborted = finish_reason == "aborted"
+            if usage:
+                input_tokens = usage.prompt_tokens
+                output_tokens = usage.completion_tokens
+            elif aborted:
+                input_tokens = estimate_tokens(prompt) + estimate_tokens(system_prompt or "")
+                output_tokens = estimate_tokens(response_text)
+            else:
+                input_tokens = output_tokens = 0
+            total_tokens = input_tokens + output_tokens
+            prompt_details = getattr(usage, "prompt_tokens_details", None)
+            cached_input_tokens = getattr(prompt_details, "cached_tokens", None) or 0
 
             # Calculate cost
-            cost = self._calculate_cost(model_name, input_tokens, output_tokens)
+            cost = self._calculate_cost(
+                model_name, input_tokens, output_tokens,
+                cached_input_tokens=cached_input_tokens,
+            )
 
             # Calculate latency
             latency_ms = int((time.time() - start_time) * 1000)
 
-            # Track LLM call in database
-            llm_call = LLMCall(
+            # Track LLM call (written in the background)
+            llm_call_id = llm_usage_recorder.record(
                 user_id=user_id,
                 job_description_id=job_description_id,
                 cv_id=cv_id,
@@ -133,14 +228,12 @@ class OpenAIService:
                 response_size_chars=len(response_text),
                 latency_ms=latency_ms,
                 success=True,
+                error_message=ABORTED_STREAM_MESSAGE if aborted else None,
             )
-            db.add(llm_call)
-            db.commit()
-            db.refresh(llm_call)
 
             logger.info(
                 f"OpenAI call successful: {call_type.value} | "
-                f"Tokens: {input_tokens}/{output_tokens} | "
+                f"Tokens: {input_tokens}/{output_tokens} (cached: {cached_input_tokens}) | "
                 f"Cost: ${cost['total_cost']:.6f} | "
                 f"Latency: {latency_ms}ms"
             )
@@ -152,10 +245,13 @@ class OpenAIService:
                     "input_tokens": input_tokens,
                     "output_tokens": output_tokens,
                     "total_tokens": total_tokens,
+                    "cache_read_input_tokens": cached_input_tokens,
                 },
                 "cost": cost,
                 "latency_ms": latency_ms,
-                "llm_call_id": str(llm_call.id),
+                "llm_call_id": llm_call_id,
+                "stop_reason": finish_reason,
+                "truncated": finish_reason == "length",
             }
 
         except OpenAIError as e:
@@ -163,7 +259,7 @@ class OpenAIService:
             logger.error(f"OpenAI API error: {error_message}")
 
             # Track failed call
-            llm_call = LLMCall(
+            llm_usage_recorder.record(
                 user_id=user_id,
                 job_description_id=job_description_id,
                 cv_id=cv_id,
@@ -182,13 +278,12 @@ class OpenAIService:
                 success=False,
                 error_message=error_message,
             )
-            db.add(llm_call)
-            db.commit()
 
             return {
                 "success": False,
                 "error": error_message,
                 "response": None,
+                "throttled": isinstance(e, RateLimitError),
             }
 
         except Exception as e:
@@ -196,7 +291,7 @@ class OpenAIService:
             logger.error(error_message)
             
             # Track failed call
-            llm_call = LLMCall(
+            llm_usage_recorder.record(
                 user_id=user_id,
                 job_description_id=job_description_id,
                 cv_id=cv_id,
@@ -215,8 +310,6 @@ class OpenAIService:
                 success=False,
                 error_message=error_message,
             )
-            db.add(llm_call)
-            db.commit()
 
             return {
                 "success": False,
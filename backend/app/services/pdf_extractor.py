@@ -0,0 +1,262 @@
+"""
+PDF Text Extraction
+Tiered extraction: the cheap PyPDF2 text layer first, pdfplumber's layout
+parse only when that text is sparse or garbled. Long documents are split
+into page ranges extracted in a process pool, and reading stops once enough
+text has been collected.
+
+Kept free of app imports so spawned pool workers start cheaply.
+"""
+
+import atexit
+import io
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple, Union
+import PyPDF2
+import pdfplumber
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Artifacts left by fonts without a usable text mapping
+GARBLED_MARKERS = ("(cid:", "\ufffd")
+
+# Raw bytes or a seekable binary file (e.g. a spooled S3 download)
+PDFSource = Union[bytes, BinaryIO]
+
+
+def _as_stream(source: PDFSource) -> BinaryIO:
+    """Seekable stream over the source, rewound to the start (no copy for files)"""
+    if isinstance(source, (bytes, bytearray)):
+        return io.BytesIO(source)
+    source.seek(0)
+    return source
+
+
+def _as_bytes(source: PDFSource) -> bytes:
+    """Raw bytes of the source (needed to ship it to pool processes)"""
+    if isinstance(source, (bytes, bytearray)):
+        return bytes(source)
+    source.seek(0)
+    return source.read()
+
+
+def _pypdf2_pages(file_content: PDFSource, max_chars: int) -> Tuple[List[str], int, int]:
+    """
+    Read the PyPDF2 text layer page by page
+
+    Returns:
+        (page texts, total pages, pages read)
+    """
+    reader = PyPDF2.PdfReader(_as_stream(file_content))
+    total_pages = len(reader.pages)
+    text_parts = []
+    chars = 0
+    pages_read = 0
+
+    for page in reader.pages:
+        pages_read += 1
+        text = page.extract_text()
+        if text:
+            text_parts.append(text)
+            chars += len(text)
+        if chars >= max_chars:
+            break
+
+    return text_parts, total_pages, pages_read
+
+
+def _pdfplumber_page_range(
+    file_content: PDFSource, start: int, end: Optional[int], max_chars: int
+) -> Tuple[List[str], int]:
+    """
+    Extract pages [start, end) with pdfplumber (runs inside pool workers)
+
+    Returns:
+        (page texts, pages read)
+    """
+    text_parts = []
+    chars = 0
+    pages_read = 0
+
+    with pdfplumber.open(_as_stream(file_content)) as pdf:
+        for page in pdf.pages[start:end]:
+            pages_read += 1
+            text = page.extract_text()
+            if text:
+                text_parts.append(text)
+                chars += len(text)
+            if chars >= max_chars:
+                break
+
+    return text_parts, pages_read
+
+
+class PDFTextExtractor:
+    """Tiered PDF text extractor with a lazily created process pool"""
+
+    def __init__(self):
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_pid: Optional[int] = None
+        self._pool_lock = threading.Lock()
+
+    def _get_pool(self, workers: int) -> ProcessPoolExecutor:
+        # Spawned (not forked) children: the parent runs many threads
+        if self._pool is None or self._pool_pid != os.getpid():
+            with self._pool_lock:
+                if self._pool is None or self._pool_pid != os.getpid():
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                    )
+                    self._pool_pid = os.getpid()
+        return self._pool
+
+    def shutdown(self):
+        """Stop the pool workers for this process"""
+        if self._pool is not None and self._pool_pid == os.getpid():
+            self._pool.shutdown(wait=False, cancel_futures=True)
+        self._pool = None
+
+    @staticmethod
+    def is_usable_text(text: str, pages_read: int, min_chars_per_page: int) -> bool:
+        """
+        Decide whether a text layer is good enough to skip layout parsing
+
+        Sparse text (scanned pages, images of text) or text full of unmapped
+        glyphs is rejected.
+        """
+        stripped = text.strip()
+        if not stripped:
+            return False
+
+        if len(stripped) / max(pages_read, 1) < min_chars_per_page:
+            return False
+
+        garbled = sum(stripped.count(marker) for marker in GARBLED_MARKERS)
+        if garbled / len(stripped) > 0.01:
+            return False
+
+        visible = [ch for ch in stripped if not ch.isspace()]
+        alnum_ratio = sum(ch.isalnum() for ch in visible) / max(len(visible), 1)
+        return alnum_ratio >= 0.6
+
+    def extract(
+        self,
+        file_content: PDFSource,
+        max_chars: int,
+        min_chars_per_page: int,
+        parallel_min_pages: int,
+        workers: int,
+        pages_per_task: int,
+    ) -> Tuple[str, Dict[str, Any]]:
+        """
+        Extract text from a PDF, choosing the cheapest tier that works
+
+        Args:
+            file_content: Raw PDF bytes or a seekable binary file
+            max_chars: Stop reading pages once this much text is collected
+            min_chars_per_page: Text layer density below which pdfplumber is used
+            parallel_min_pages: Page count from which pdfplumber runs in the pool
+            workers: Process pool size
+            pages_per_task: Pages per pool task
+
+        Returns:
+            (text, stats) where stats records the chosen tier and per-tier timings
+        """
+        stats: Dict[str, Any] = {}
+
+        # Tier 1: PyPDF2 text layer
+        start = time.perf_counter()
+        fast_text = ""
+        total_pages: Optional[int] = None
+        try:
+            text_parts, total_pages, pages_read = _pypdf2_pages(file_content, max_chars)
+            fast_text = "\n\n".join(text_parts)
+            stats["pages"] = total_pages
+            stats["pages_read"] = pages_read
+        except Exception as e:
+            pages_read = 0
+            logger.warning(f"PyPDF2 failed, trying pdfplumber: {e}")
+        stats["pypdf2_ms"] = round((time.perf_counter() - start) * 1000, 1)
+
+        if self.is_usable_text(fast_text, pages_read, min_chars_per_page):
+            stats["tier"] = "pypdf2"
+            stats["truncated"] = pages_read < (total_pages or 0)
+            return fast_text, stats
+
+        # Tier 2: pdfplumber layout parse (sparse/garbled text layer)
+        start = time.perf_counter()
+        try:
+            if total_pages and total_pages >= parallel_min_pages and workers > 1:
+                text, pages_read = self._extract_parallel(
+                    file_content, total_pages, max_chars, workers, pages_per_task
+                )
+                stats["tier"] = "pdfplumber_parallel"
+            else:
+                text_parts, pages_read = _pdfplumber_page_range(file_content, 0, None, max_chars)
+                text = "\n\n".join(text_parts)
+                stats["tier"] = "pdfplumber"
+            stats["pages_read"] = pages_read
+        except Exception as e:
+            if not fast_text:
+                logger.error(f"PDF parsing failed: {e}")
+                raise ValueError(f"Failed to parse PDF: {e}")
+            logger.warning(f"pdfplumber failed, keeping PyPDF2 text: {e}")
+            text = ""
+        stats["pdfplumber_ms"] = round((time.perf_counter() - start) * 1000, 1)
+
+        # A sparse text layer still beats nothing
+        if len(text.strip()) < len(fast_text.strip()):
+            text = fast_text
+            stats["tier"] = "pypdf2"
+
+        stats["truncated"] = stats.get("pages_read", 0) < (total_pages or 0)
+        return text, stats
+
+    def _extract_parallel(
+        self,
+        file_content: PDFSource,
+        total_pages: int,
+        max_chars: int,
+        workers: int,
+        pages_per_task: int,
+    ) -> Tuple[str, int]:
+        """Extract page ranges in the process pool, keeping page order"""
+        pool = self._get_pool(workers)
+        file_content = _as_bytes(file_content)
+        futures = [
+            pool.submit(
+                _pdfplumber_page_range,
+                file_content,
+                start,
+                min(start + pages_per_task, total_pages),
+                max_chars,
+            )
+            for start in range(0, total_pages, pages_per_task)
+        ]
+
+        text_parts: List[str] = []
+        chars = 0
+        pages_read = 0
+        for index, future in enumerate(futures):
+            parts, read = future.result()
+            text_parts.extend(parts)
+            chars += sum(len(part) for part in parts)
+            pages_read += read
+            if chars >= max_chars:
+                # Enough text: drop ranges that have not started yet
+                for pending in futures[index + 1:]:
+                    pending.cancel()
+                break
+
+        return "\n\n".join(text_parts), pages_read
+
+
+# Singleton instance
+pdf_text_extractor = PDFTextExtractor()
+atexit.register(pdf_text_extractor.shutdown)
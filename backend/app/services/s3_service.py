@@ -1,12 +1,66 @@
+import asyncio
+import threading
+import time
 import boto3
 from botocore.exceptions import ClientError
 from botocore.config import Config
-from typing import BinaryIO, Optional
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Optional, Tuple
+from tempfile import SpooledTemporaryFile
 from datetime import datetime
 import uuid
 from pathlib import Path
 
 from app.core.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# DeleteObjects accepts at most 1000 keys per request
+S3_DELETE_BATCH_LIMIT = 1000
+
+
+class PresignedURLCache:
+    """
+    LRU cache of presigned download URLs
+
+    SigV4 signing is pure-Python HMAC work, so listing pages re-signing every
+    CV on every request adds up. A URL is reused until less than a quarter of
+    its lifetime remains, so callers always get at least 75% of the expiration
+    they asked for.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, Tuple[str, float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if not entry:
+                return None
+            url, signed_at, expires_at = entry
+            if expires_at - now < (expires_at - signed_at) / 4:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return url
+
+    def set(self, key: Tuple, url: str, expiration: int):
+        now = time.time()
+        with self._lock:
+            self._entries[key] = (url, now, now + expiration)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
 
 
 class S3Service:
@@ -19,9 +73,18 @@ class S3Service:
             aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
             region_name=settings.AWS_REGION,
             endpoint_url=f"https://s3.{settings.AWS_REGION}.amazonaws.com",
-            config=Config(signature_version="s3v4", s3={"addressing_style": "virtual"}),
+            config=Config(
+                signature_version="s3v4",
+                s3={"addressing_style": "virtual"},
+                max_pool_connections=settings.S3_MAX_POOL_CONNECTIONS,
+                tcp_keepalive=True,
+                connect_timeout=settings.S3_CONNECT_TIMEOUT,
+                read_timeout=settings.S3_READ_TIMEOUT,
+                retries={"max_attempts": settings.S3_MAX_ATTEMPTS, "mode": "adaptive"},
+            ),
         )
         self.bucket_name = settings.S3_BUCKET_NAME
+        self.presigned_url_cache = PresignedURLCache(settings.S3_PRESIGN_CACHE_SIZE)
 
     def generate_s3_key(
         self,
@@ -102,20 +165,32 @@ class S3Service:
         expiration: Optional[int] = None,
         filename: Optional[str] = None,
         content_type: Optional[str] = None,
+        use_cache: bool = True,
     ) -> str:
         """
         Generate presigned URL for downloading or uploading file
 
+        Download URLs are served from the local signing cache while they are
+        still comfortably valid; upload URLs are always signed fresh.
+
         Args:
             s3_key: S3 object key
             client_method: 'get_object' for download, 'put_object' for upload
             expiration: URL expiration in seconds (default from settings)
             filename: Optional filename for Content-Disposition header (downloads only)
             content_type: Optional content type for uploads
+            use_cache: Reuse a cached download URL when possible
         """
         try:
             expiration = expiration or settings.S3_PRESIGNED_URL_EXPIRATION
 
+            cache_key = None
+            if use_cache and client_method == "get_object":
+                cache_key = (s3_key, filename, expiration)
+                cached_url = self.presigned_url_cache.get(cache_key)
+                if cached_url:
+                    return cached_url
+
             params = {
                 "Bucket": self.bucket_name,
                 "Key": s3_key,
@@ -133,11 +208,42 @@ class S3Service:
                 client_method, Params=params, ExpiresIn=expiration
             )
 
+            if cache_key:
+                self.presigned_url_cache.set(cache_key, url, expiration)
+
             return url
 
         except ClientError as e:
             raise Exception(f"Failed to generate presigned URL: {str(e)}")
 
+    def generate_presigned_urls(
+        self,
+        files: Iterable[Tuple[str, Optional[str]]],
+        expiration: Optional[int] = None,
+    ) -> Dict[str, Optional[str]]:
+        """
+        Generate download URLs for a page of files at once
+
+        Args:
+            files: (s3_key, filename) pairs
+            expiration: URL expiration in seconds (default from settings)
+
+        Returns:
+            Dictionary of s3_key -> presigned URL (None if signing failed)
+        """
+        urls: Dict[str, Optional[str]] = {}
+        for s3_key, filename in files:
+            if s3_key in urls:
+                continue
+            try:
+                urls[s3_key] = self.generate_presigned_url(
+                    s3_key=s3_key, filename=filename, expiration=expiration
+                )
+            except Exception as e:
+                logger.warning(f"Failed to generate presigned URL for {filename}: {e}")
+                urls[s3_key] = None
+        return urls
+
     def delete_file(self, s3_key: str) -> bool:
         """Delete file from S3"""
         try:
@@ -156,16 +262,27 @@ class S3Service:
         if not s3_keys:
             return {"deleted": 0, "errors": []}
 
+        deleted = 0
+        errors = []
+        for start in range(0, len(s3_keys), S3_DELETE_BATCH_LIMIT):
+            result = self.delete_files_chunk(s3_keys[start:start + S3_DELETE_BATCH_LIMIT])
+            deleted += result["deleted"]
+            errors.extend(result["errors"])
+
+        return {"deleted": deleted, "errors": errors}
+
+    def delete_files_chunk(self, s3_keys: list[str]) -> dict:
+        """Delete up to S3_DELETE_BATCH_LIMIT files with one DeleteObjects call"""
         try:
             # Prepare objects for deletion
             objects = [{"Key": key} for key in s3_keys]
 
             response = self.s3_client.delete_objects(
-                Bucket=self.bucket_name, Delete={"Objects": objects}
+                Bucket=self.bucket_name, Delete={"Objects": objects, "Quiet": True}
             )
 
-            deleted = len(response.get("Deleted", []))
             errors = response.get("Errors", [])
+            deleted = len(s3_keys) - len(errors)
 
             return {"deleted": deleted, "errors": errors}
 
@@ -203,6 +320,117 @@ class S3Service:
         except ClientError as e:
             raise Exception(f"Failed to download file from S3: {str(e)}")
 
+    def download_to_spool(
+        self,
+        s3_key: str,
+        max_size: Optional[int] = None,
+    ) -> SpooledTemporaryFile:
+        """
+        Stream file content from S3 into a spooled temporary file
+
+        Small files stay in memory; anything above S3_DOWNLOAD_SPOOL_MAX_BYTES
+        rolls over to disk, so concurrent downloads don't hold whole files in RAM.
+        The caller owns the returned file and must close it.
+
+        Args:
+            s3_key: S3 object key
+            max_size: Reject objects larger than this many bytes
+
+        Returns:
+            File object positioned at the start of the content
+        """
+        max_size = max_size or settings.CV_EXTRACT_MAX_FILE_BYTES
+        spool = SpooledTemporaryFile(max_size=settings.S3_DOWNLOAD_SPOOL_MAX_BYTES)
+
+        try:
+            response = self.s3_client.get_object(Bucket=self.bucket_name, Key=s3_key)
+
+            content_length = response.get("ContentLength") or 0
+            if content_length > max_size:
+                raise ValueError(f"File too large: {content_length} bytes (limit {max_size})")
+
+            size = 0
+            for chunk in response["Body"].iter_chunks(chunk_size=settings.S3_DOWNLOAD_CHUNK_BYTES):
+                size += len(chunk)
+                if size > max_size:
+                    raise ValueError(f"File too large: over {max_size} bytes")
+                spool.write(chunk)
+
+            spool.seek(0)
+            return spool
+
+        except ClientError as e:
+            spool.close()
+            raise Exception(f"Failed to download file from S3: {str(e)}")
+        except Exception:
+            spool.close()
+            raise
+
+
+class AsyncS3Service:
+    """
+    Async facade over S3Service for FastAPI handlers and async pipelines
+
+    boto3 calls run in a dedicated thread pool sized to the client's HTTP
+    connection pool, so they never block the event loop and never queue for
+    a connection inside botocore. Presigned URLs are signed locally and stay
+    on the sync service.
+    """
+
+    def __init__(self, service: S3Service):
+        self.service = service
+        self._executor = ThreadPoolExecutor(
+            max_workers=settings.S3_MAX_POOL_CONNECTIONS,
+            thread_name_prefix="s3",
+        )
+
+    async def _run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, lambda: func(*args, **kwargs))
+
+    async def download_file(self, s3_key: str) -> bytes:
+        """Download file content from S3 as bytes"""
+        return await self._run(self.service.download_file, s3_key)
+
+    async def download_to_spool(
+        self, s3_key: str, max_size: Optional[int] = None
+    ) -> SpooledTemporaryFile:
+        """Stream file content from S3 into a spooled temporary file"""
+        return await self._run(self.service.download_to_spool, s3_key, max_size)
+
+    async def delete_file(self, s3_key: str) -> bool:
+        """Delete file from S3"""
+        return await self._run(self.service.delete_file, s3_key)
+
+    async def delete_files(self, s3_keys: list[str]) -> dict:
+        """
+        Delete multiple files from S3, sending the 1000-key chunks concurrently
+
+        Returns:
+            dict with deleted count and errors
+        """
+        if not s3_keys:
+            return {"deleted": 0, "errors": []}
+
+        results = await asyncio.gather(*[
+            self._run(self.service.delete_files_chunk, s3_keys[start:start + S3_DELETE_BATCH_LIMIT])
+            for start in range(0, len(s3_keys), S3_DELETE_BATCH_LIMIT)
+        ])
+
+        return {
+            "deleted": sum(result["deleted"] for result in results),
+            "errors": [error for result in results for error in result["errors"]],
+        }
+
+    async def file_exists(self, s3_key: str) -> bool:
+        """Check if file exists in S3"""
+        return await self._run(self.service.file_exists, s3_key)
+
+    async def head(self, s3_key: str) -> dict:
+        """Get file metadata from S3"""
+        return await self._run(self.service.get_file_metadata, s3_key)
+
 
-# Singleton instance
+# Singleton instances
 s3_service = S3Service()
+async_s3_service = AsyncS3Service(s3_service)
@@ -6,35 +6,67 @@ Independent processing that fetches JD from batch for scalability
 
 import asyncio
 import time
-from typing import Dict, Any, Optional
+from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from tempfile import SpooledTemporaryFile
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from celery import Task
 from sqlalchemy import func
 from sqlalchemy.orm import Session
+from app.core.async_runner import cv_pipeline_runner
+from app.core.batch_counters import batch_counters, TRACKED_STATUSES
 from app.core.celery_config import celery_app
+from app.core.config import settings
 from app.core.redis_events import redis_event_bus
-from app.database import SessionLocal
+from app.core.stage_timer import StageTimer
+from app.database import SessionLocal, pipeline_session, release_connection, run_db
 from app.models.job import CV, CVStatus, CVBatch
-from app.models.jd_builder import JobDescription
+from app.models.jd_builder import CVParseDetail, JobDescription
 from app.services.cv_parser import cv_parser_service
 from app.services.cv_jd_matcher import cv_jd_matcher_service
-from app.services.s3_service import s3_service
+from app.services.s3_service import async_s3_service
 import logging
 
 logger = logging.getLogger(__name__)
 
 # Processing stages with progress percentages
+# Each stage is published when the corresponding work actually starts
 PROCESSING_STAGES = {
     "QUEUED": (0, "Waiting in queue..."),
     "DOWNLOADING": (10, "Downloading CV from storage..."),
     "EXTRACTING": (20, "Extracting text from document..."),
-    "ANALYZING_STRUCTURE": (30, "Analyzing CV structure..."),
-    "PARSING_WITH_AI": (50, "Parsing CV with AI..."),
+    "PARSING_WITH_AI": (40, "Parsing CV with AI..."),
     "MATCHING_JD": (70, "Matching against job requirements..."),
-    "ANALYZING_GITHUB": (80, "Analyzing GitHub profile..."),
     "FINALIZING": (90, "Finalizing results..."),
     "COMPLETED": (100, "Processing completed"),
 }
 
+# Error stored on CVs the stuck-CV sweep gives up on
+STUCK_CV_ERROR = "Processing was interrupted too many times"
+
+
+# Progress events, batch counters and Celery state updates are blocking Redis
+# round trips: pipelines hand them to this thread instead of stalling every
+# other pipeline on the shared event loop. One thread keeps them in order.
+_events_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cv-events")
+
+
+def _log_event_error(future):
+    if future.exception() is not None:
+        logger.warning(f"Failed to publish CV pipeline event: {future.exception()}")
+
+
+def _in_background(func: Callable, *args, **kwargs):
+    """Queue a blocking Redis call on the events thread without waiting for it"""
+    _events_executor.submit(func, *args, **kwargs).add_done_callback(_log_event_error)
+
+
+async def _on_events_thread(func: Callable, *args, **kwargs):
+    """Run a blocking Redis call on the events thread, after everything queued before it"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_events_executor, lambda: func(*args, **kwargs))
+
 
 class CVProcessingTask(Task):
     """Base task for CV processing with error handling"""
@@ -46,22 +78,42 @@ class CVProcessingTask(Task):
             db = SessionLocal()
             try:
                 cv = db.query(CV).filter(CV.id == cv_id).first()
-                if cv:
+                if cv and cv.status != CVStatus.FAILED:
+                    previous_status = cv.status
                     cv.status = CVStatus.FAILED
                     cv.error_message = str(exc)
-                    db.commit()
 
                     # Update batch stats
-                    batch = db.query(CVBatch).filter(CVBatch.id == cv.batch_id).first()
-                    if batch:
-                        batch.failed_cvs += 1
-                        db.commit()
+                    _increment_batch_stat(db, cv.batch_id, CVBatch.failed_cvs)
+                    db.commit()
+                    batch_counters.transition(str(cv.batch_id), previous_status, CVStatus.FAILED)
 
                 logger.error(f"CV processing failed for {cv_id}: {exc}")
             finally:
                 db.close()
 
 
+def _increment_batch_stat(db: Session, batch_id, column):
+    """Atomically add one to a CVBatch counter column (no read-modify-write)"""
+    db.query(CVBatch).filter(CVBatch.id == batch_id).update(
+        {column: func.coalesce(column, 0) + 1}, synchronize_session=False
+    )
+
+
+def _publish_batch_progress(user_id: str, batch_id: str):
+    """Publish coalesced batch progress, immediately once nothing is left to process"""
+    counters = batch_counters.read(batch_id)
+    final = bool(counters) and (
+        counters[CVStatus.QUEUED.value] + counters[CVStatus.PROCESSING.value] <= 0
+    )
+    redis_event_bus.publish_batch_progress_coalesced(
+        user_id,
+        batch_id,
+        lambda: get_queue_status(batch_id),
+        final=final,
+    )
+
+
 def _publish_progress(
     user_id: str,
     cv_id: str,
@@ -84,6 +136,21 @@ def _publish_progress(
     )
 
 
+def _partial_fields_publisher(cv: CV, user_id: str) -> Callable[[Dict[str, Any]], None]:
+    """Publish fields streamed out of the AI parse (name, current role...) early"""
+    cv_id = str(cv.id)
+    batch_id = str(cv.batch_id)
+    filename = cv.filename
+
+    def _on_partial(fields: Dict[str, Any]):
+        _in_background(
+            _publish_progress,
+            user_id, cv_id, batch_id, "PARSING_WITH_AI", filename, partial=fields,
+        )
+
+    return _on_partial
+
+
 @celery_app.task(base=CVProcessingTask, bind=True, name="app.tasks.process_cv")
 def process_cv_task(self, cv_id: str, user_id: str) -> Dict[str, Any]:
     """
@@ -92,254 +159,793 @@ def process_cv_task(self, cv_id: str, user_id: str) -> Dict[str, Any]:
     Architecture:
     - Independent processing: Fetches JD from the batch's account
     - Scalable: Can process CVs from multiple accounts in parallel
-    - Progress tracking: 9 detailed stages with real-time updates
+    - Progress tracking: stages published as real work starts, timings stored on the CV
     - Smart matching: Compares CV against JD when available
+    - Native async: The pipeline runs on the worker's persistent event loop,
+      so many CVs can await the LLM concurrently in one process
+
+    The task returns (and its message is acked) once the pipeline is
+    admitted to the loop, so the task result only records the start;
+    progress and the outcome are published as events and stored on the CV.
+    A pipeline lost with its worker is not redelivered by Celery: the
+    recover_stuck_cvs sweep re-queues its CV.
 
     Args:
         cv_id: CV UUID
         user_id: User UUID
 
     Returns:
-        Processing result dictionary
+        Dictionary confirming the pipeline was started
     """
-    db = SessionLocal()
-    start_time = time.time()
-    total_usage = {"input_tokens": 0, "output_tokens": 0}
-    total_cost = 0.0
+    cv_pipeline_runner.submit(_process_cv(cv_id, user_id))
+    return {"success": True, "cv_id": cv_id, "started": True}
 
-    try:
-        # Get CV from database
-        cv = db.query(CV).filter(CV.id == cv_id).first()
-        if not cv:
-            raise ValueError(f"CV not found: {cv_id}")
-
-        # Get batch to fetch associated JD
-        batch = db.query(CVBatch).filter(CVBatch.id == cv.batch_id).first()
-        if not batch:
-            raise ValueError(f"Batch not found: {cv.batch_id}")
-
-        # Fetch Job Description from batch (independent of account)
-        job_description: Optional[JobDescription] = None
-        if batch.job_description_id:
-            job_description = db.query(JobDescription).filter(
-                JobDescription.id == batch.job_description_id
-            ).first()
-            logger.info(f"Fetched JD {batch.job_description_id} for CV {cv_id}")
 
-        # Update status to processing
+@celery_app.task(base=CVProcessingTask, bind=True, name="app.tasks.process_cv_group")
+def process_cv_group_task(self, cv_ids: List[str], user_id: str) -> Dict[str, Any]:
+    """
+    Process several CVs of the same batch, parsing them with one LLM call
+
+    Used when CV_PARSE_BATCH_SIZE > 1. Each CV still gets its own progress
+    events, stage timings and failure handling; CVs the batched call could
+    not parse fall back to single-CV parsing inside the parser service.
+    Like process_cv_task, it returns once the group pipeline is started.
+
+    Args:
+        cv_ids: CV UUIDs (same batch)
+        user_id: User UUID
+
+    Returns:
+        Dictionary confirming the pipeline was started
+    """
+    cv_pipeline_runner.submit(_process_cv_group(cv_ids, user_id))
+    return {"success": True, "cv_ids": cv_ids, "started": True}
+
+
+@celery_app.task(bind=True, name="app.tasks.match_batch")
+def match_batch_task(
+    self,
+    batch_id: str,
+    user_id: str,
+    cv_ids: List[str],
+    job_description_id: str,
+    use_cache: bool = True,
+) -> Dict[str, Any]:
+    """
+    Score parsed CVs of a batch against the batch's Job Description
+
+    CVs are sent in groups of CV_MATCH_BATCH_SIZE per LLM call, with up to
+    CV_MATCH_BATCH_CONCURRENCY groups in flight. Each group's scores are
+    saved as soon as it finishes and progress is published as
+    batch_match_progress events. The task returns once matching is started
+    on the worker's event loop.
+
+    Args:
+        batch_id: Batch UUID
+        user_id: User UUID
+        cv_ids: Parsed CVs to score
+        job_description_id: Job Description UUID
+        use_cache: Set False to bypass memoized match results
+
+    Returns:
+        Dictionary confirming matching was started
+    """
+    cv_pipeline_runner.submit(
+        _match_batch(batch_id, user_id, cv_ids, job_description_id, use_cache)
+    )
+    return {"success": True, "batch_id": batch_id, "total": len(cv_ids), "started": True}
+
+
+async def _match_batch(
+    batch_id: str,
+    user_id: str,
+    cv_ids: List[str],
+    job_description_id: str,
+    use_cache: bool,
+) -> Dict[str, Any]:
+    """Batch matching coroutine executed on the worker's shared event loop"""
+    chunk_size = max(1, settings.CV_MATCH_BATCH_SIZE)
+    chunks = [cv_ids[i:i + chunk_size] for i in range(0, len(cv_ids), chunk_size)]
+    semaphore = asyncio.Semaphore(max(1, settings.CV_MATCH_BATCH_CONCURRENCY))
+    counts = {"matched": 0, "failed": 0}
+
+    async def _run_chunk(chunk_ids: List[str]):
+        async with semaphore:
+            # One session per group: concurrent groups never share a transaction
+            db = pipeline_session()
+            try:
+                matched = await _match_cv_chunk(
+                    db, chunk_ids, job_description_id, user_id, use_cache
+                )
+            except Exception as e:
+                logger.error(f"Batch matching failed for CVs {chunk_ids}: {e}")
+                matched = 0
+            finally:
+                await run_db(db.close)
+
+        counts["matched"] += matched
+        counts["failed"] += len(chunk_ids) - matched
+        await _on_events_thread(
+            redis_event_bus.publish_batch_match_progress,
+            user_id, batch_id, total=len(cv_ids), **counts,
+        )
+
+    await asyncio.gather(*[_run_chunk(chunk) for chunk in chunks])
+
+    logger.info(
+        f"Batch {batch_id} matching finished: {counts['matched']}/{len(cv_ids)} CVs scored"
+    )
+    return {
+        "success": counts["matched"] > 0,
+        "batch_id": batch_id,
+        "total": len(cv_ids),
+        **counts,
+    }
+
+
+async def _match_cv_chunk(
+    db: Session,
+    cv_ids: List[str],
+    job_description_id: str,
+    user_id: str,
+    use_cache: bool,
+) -> int:
+    """Score one group of parsed CVs and save the results; returns how many were scored"""
+    job_description, rows = await run_db(_load_match_chunk, db, cv_ids, job_description_id)
+    if not rows:
+        return 0
+
+    match_results = await cv_jd_matcher_service.match_cvs_to_jd_batch(
+        candidates=[(str(cv.id), detail.parsed_data) for cv, detail in rows],
+        job_description=job_description,
+        db=db,
+        user_id=user_id,
+        use_cache=use_cache,
+    )
+
+    # Persist score and match data on each CV
+    matched = 0
+    for cv, _ in rows:
+        match_result = match_results.get(str(cv.id)) or {}
+        if match_result.get("success"):
+            cv.jd_match_score = match_result.get("match_score")
+            cv.jd_match_data = match_result.get("match_data")
+            matched += 1
+    await run_db(db.commit)
+    return matched
+
+
+def _load_match_chunk(
+    db: Session, cv_ids: List[str], job_description_id: str
+) -> Tuple[JobDescription, List[Tuple[CV, CVParseDetail]]]:
+    """Fetch the JD and the parsed CVs of one matching group"""
+    job_description = db.query(JobDescription).filter(
+        JobDescription.id == job_description_id
+    ).first()
+    if not job_description:
+        raise ValueError(f"Job Description not found: {job_description_id}")
+
+    rows = [
+        (cv, detail)
+        for cv, detail in db.query(CV, CVParseDetail)
+        .join(CVParseDetail, CVParseDetail.cv_id == CV.id)
+        .filter(CV.id.in_(cv_ids))
+        .all()
+        if detail.parsed_data
+    ]
+    return job_description, rows
+
+
+def _make_stage_timer(
+    cv: CV,
+    user_id: str,
+    job_description: Optional[JobDescription],
+) -> StageTimer:
+    """Create a StageTimer that publishes user-facing stages as they start"""
+    cv_id = str(cv.id)
+    batch_id = str(cv.batch_id)
+    filename = cv.filename
+
+    def _publish_stage(stage_key: str, extra: Dict[str, Any]):
+        _publish_progress(user_id, cv_id, batch_id, stage_key, filename, **extra)
+
+    def _on_stage_start(stage_key: str):
+        # Only user-facing stages are published; internal ones are just timed
+        if stage_key not in PROCESSING_STAGES:
+            return
+        extra = {}
+        if stage_key == "MATCHING_JD" and job_description:
+            extra["jd_title"] = job_description.job_title
+        _in_background(_publish_stage, stage_key, extra)
+
+    return StageTimer(on_stage_start=_on_stage_start)
+
+
+def _load_cv_context(db: Session, cv_id: str):
+    """Fetch the CV, its batch and the batch's Job Description"""
+    cv = db.query(CV).filter(CV.id == cv_id).first()
+    if not cv:
+        raise ValueError(f"CV not found: {cv_id}")
+
+    # Get batch to fetch associated JD
+    batch = db.query(CVBatch).filter(CVBatch.id == cv.batch_id).first()
+    if not batch:
+        raise ValueError(f"Batch not found: {cv.batch_id}")
+
+    # Fetch Job Description from batch (independent of account)
+    job_description: Optional[JobDescription] = None
+    if batch.job_description_id:
+        job_description = db.query(JobDescription).filter(
+            JobDescription.id == batch.job_description_id
+        ).first()
+        logger.info(f"Fetched JD {batch.job_description_id} for CV {cv_id}")
+
+    return cv, batch, job_description
+
+
+def _mark_processing(db: Session, cvs: List[CV]):
+    """Mark CVs PROCESSING and stamp the start the stuck-CV sweep measures from"""
+    started_at = db.query(func.now()).scalar()
+    for cv in cvs:
         cv.status = CVStatus.PROCESSING
-        db.commit()
+        cv.processing_started_at = started_at
+        cv.processing_attempts = (cv.processing_attempts or 0) + 1
 
-        # Stage 1: Downloading (10%)
-        _publish_progress(user_id, cv_id, str(cv.batch_id), "DOWNLOADING", cv.filename)
-        self.update_state(state="PROGRESS", meta={"progress": 10, "stage": "DOWNLOADING"})
 
-        file_content = s3_service.download_file(cv.s3_key)
-        if not file_content:
-            raise ValueError(f"Failed to download file from S3: {cv.s3_key}")
+def _start_cv(db: Session, cv_id: str):
+    """Load the CV's context and mark it PROCESSING; also returns its previous status"""
+    cv, batch, job_description = _load_cv_context(db, cv_id)
+    previous_status = cv.status
+    _mark_processing(db, [cv])
+    db.commit()
+    return cv, batch, job_description, previous_status
 
-        # Stage 2: Extracting text (20%)
-        _publish_progress(user_id, cv_id, str(cv.batch_id), "EXTRACTING", cv.filename)
-        self.update_state(state="PROGRESS", meta={"progress": 20, "stage": "EXTRACTING"})
 
-        # Brief pause to show stage transition
-        time.sleep(0.5)
+def _start_cv_group(db: Session, cv_ids: List[str]):
+    """
+    Load every CV's context and mark them PROCESSING in one commit
+
+    Returns:
+        ((CV, batch, JD, previous status) tuples, CV id -> load error)
+    """
+    contexts = []
+    errors: Dict[str, Exception] = {}
+    for cv_id in cv_ids:
+        try:
+            cv, batch, job_description = _load_cv_context(db, cv_id)
+        except Exception as e:
+            errors[cv_id] = e
+            continue
+        contexts.append((cv, batch, job_description, cv.status))
+    _mark_processing(db, [context[0] for context in contexts])
+    db.commit()
+    return contexts, errors
+
+
+async def _download_cv(s3_key: str, stage_timer: StageTimer) -> SpooledTemporaryFile:
+    """
+    Stream the CV file into a spooled temp file without blocking the event loop
+
+    The caller owns the returned file and must close it.
+    """
+    with stage_timer.stage("DOWNLOADING") as download_stage:
+        file_content = await async_s3_service.download_to_spool(s3_key)
+        file_content.seek(0, 2)
+        size = file_content.tell()
+        file_content.seek(0)
+        if not size:
+            file_content.close()
+            raise ValueError(f"Failed to download file from S3: {s3_key}")
+        download_stage["bytes"] = size
+    return file_content
+
+
+def _result_cost(result: Dict[str, Any]) -> float:
+    """Safe cost handling for parser/matcher results"""
+    cost = result.get("cost", 0.0)
+    if isinstance(cost, dict):
+        cost = float(cost.get("total_cost", cost.get("cost", 0.0)))
+    return float(cost)
+
+
+async def _process_cv(cv_id: str, user_id: str) -> Dict[str, Any]:
+    """
+    CV pipeline coroutine executed on the worker's shared event loop
+
+    The Celery task has already returned, so progress goes out only as
+    events and the CV row; its task result stays "started". Every
+    SQLAlchemy call goes through run_db so a slow query only stalls this
+    pipeline.
+    """
+    db = pipeline_session()
+    start_time = time.time()
+    stage_timer: Optional[StageTimer] = None
+    file_content: Optional[SpooledTemporaryFile] = None
+
+    try:
+        # Update status to processing
+        cv, batch, job_description, previous_status = await run_db(_start_cv, db, cv_id)
+        _in_background(
+            batch_counters.transition, str(cv.batch_id), previous_status, CVStatus.PROCESSING
+        )
 
-        # Stage 3: Analyzing structure (30%)
-        _publish_progress(user_id, cv_id, str(cv.batch_id), "ANALYZING_STRUCTURE", cv.filename)
-        self.update_state(state="PROGRESS", meta={"progress": 30, "stage": "ANALYZING_STRUCTURE"})
+        stage_timer = _make_stage_timer(cv, user_id, job_description)
 
-        # Stage 4: Parsing with AI (50%)
-        _publish_progress(user_id, cv_id, str(cv.batch_id), "PARSING_WITH_AI", cv.filename)
-        self.update_state(state="PROGRESS", meta={"progress": 50, "stage": "PARSING_WITH_AI"})
+        # Stage 1: Downloading (without holding a pooled connection)
+        s3_key = cv.s3_key
+        await run_db(release_connection, db)
+        file_content = await _download_cv(s3_key, stage_timer)
 
-        # Parse CV using LLM (async)
-        result = asyncio.run(
-            cv_parser_service.parse_cv(cv, file_content, db, user_id)
+        # Stages 2-3: Extracting text and parsing with AI (driven by the parser)
+        result = await cv_parser_service.parse_cv(
+            cv, file_content, db, user_id, stage_timer=stage_timer,
+            on_partial=_partial_fields_publisher(cv, user_id),
         )
 
         if not result["success"]:
             raise ValueError(result.get("error", "CV parsing failed"))
 
-        # Track usage and cost
-        total_usage["input_tokens"] += result["usage"].get("input_tokens", 0)
-        total_usage["output_tokens"] += result["usage"].get("output_tokens", 0)
-        
-        # Safe cost handling
-        task_cost = result.get("cost", 0.0)
-        if isinstance(task_cost, dict):
-            task_cost = float(task_cost.get("total_cost", task_cost.get("cost", 0.0)))
-        total_cost += float(task_cost)
-
-        parsed_data = result["parsed_data"]
-
-        # Stage 5: Matching against JD (70%) - Only if JD exists
-        if job_description:
-            _publish_progress(
-                user_id, cv_id, str(cv.batch_id), "MATCHING_JD", cv.filename,
-                jd_title=job_description.job_title
+        return await _complete_cv(
+            db, cv, batch, job_description,
+            result, stage_timer, user_id, start_time,
+        )
+
+    except Exception as e:
+        logger.error(f"Error processing CV {cv_id}: {e}")
+        await run_db(_record_cv_failure, db, cv_id, user_id, e, stage_timer)
+        raise
+
+    finally:
+        if file_content is not None:
+            file_content.close()
+        await run_db(db.close)
+
+
+async def _process_cv_group(cv_ids: List[str], user_id: str) -> Dict[str, Any]:
+    """Group pipeline: per-CV download, one batched parse, per-CV completion"""
+    db = pipeline_session()
+    start_time = time.time()
+    contexts = []
+    stage_timers: Dict[str, StageTimer] = {}
+    downloads: List[Any] = []
+    results: Dict[str, Any] = {}
+
+    try:
+        started, errors = await run_db(_start_cv_group, db, cv_ids)
+        for cv_id, e in errors.items():
+            logger.error(f"Error processing CV {cv_id}: {e}")
+            results[cv_id] = {"success": False, "error": str(e)}
+        for cv, batch, job_description, previous_status in started:
+            stage_timer = _make_stage_timer(cv, user_id, job_description)
+            stage_timers[str(cv.id)] = stage_timer
+            contexts.append((cv, batch, job_description, stage_timer))
+            _in_background(
+                batch_counters.transition,
+                str(cv.batch_id), previous_status, CVStatus.PROCESSING,
             )
-            self.update_state(state="PROGRESS", meta={"progress": 70, "stage": "MATCHING_JD"})
-
-            # Perform CV-JD matching
-            match_result = asyncio.run(
-                cv_jd_matcher_service.match_cv_to_jd(
-                    cv_parsed_data=parsed_data,
-                    job_description=job_description,
-                    db=db,
-                    user_id=user_id,
-                    cv_id=cv_id,
+
+        # Stage 1: Download every CV concurrently (without holding a pooled connection)
+        s3_keys = [cv.s3_key for cv, _, _, _ in contexts]
+        await run_db(release_connection, db)
+        downloads = await asyncio.gather(
+            *[
+                _download_cv(s3_key, stage_timer)
+                for s3_key, (_, _, _, stage_timer) in zip(s3_keys, contexts)
+            ],
+            return_exceptions=True,
+        )
+
+        parse_items = []
+        downloaded = []
+        for context, file_content in zip(contexts, downloads):
+            cv, _, _, stage_timer = context
+            if isinstance(file_content, Exception):
+                logger.error(f"Error processing CV {cv.id}: {file_content}")
+                await run_db(_record_cv_failure, db, str(cv.id), user_id, file_content, stage_timer)
+                results[str(cv.id)] = {"success": False, "error": str(file_content)}
+                continue
+            parse_items.append((cv, file_content, stage_timer))
+            downloaded.append(context)
+
+        # Stages 2-3: Extract every CV, then parse them in one LLM call
+        parse_results = await cv_parser_service.parse_cv_batch(parse_items, db, user_id)
+
+        # Stage 4: Score every parsed CV against the shared JD in batched calls
+        match_results = await _match_group(downloaded, parse_results, db, user_id)
+
+        # Stages 5-6: Finalize and publish per CV
+        for cv, batch, job_description, stage_timer in downloaded:
+            cv_id = str(cv.id)
+            try:
+                result = parse_results.get(cv_id) or {"success": False}
+                if not result["success"]:
+                    raise ValueError(result.get("error", "CV parsing failed"))
+
+                results[cv_id] = await _complete_cv(
+                    db, cv, batch, job_description,
+                    result, stage_timer, user_id, start_time,
+                    match_result=match_results.get(cv_id),
                 )
-            )
+            except Exception as e:
+                logger.error(f"Error processing CV {cv_id}: {e}")
+                await run_db(_record_cv_failure, db, cv_id, user_id, e, stage_timer)
+                results[cv_id] = {"success": False, "error": str(e)}
 
-            if match_result["success"]:
-                # Save match score and data
-                cv.jd_match_score = match_result["match_score"]
-                cv.jd_match_data = match_result["match_data"]
-                db.commit()
-
-                # Track usage
-                total_usage["input_tokens"] += match_result["usage"].get("input_tokens", 0)
-                total_usage["output_tokens"] += match_result["usage"].get("output_tokens", 0)
-                
-                # Safe cost handling for matching
-                match_cost = match_result.get("cost", 0.0)
-                if isinstance(match_cost, dict):
-                    match_cost = float(match_cost.get("total_cost", match_cost.get("cost", 0.0)))
-                total_cost += float(match_cost)
-
-                logger.info(f"CV {cv_id} matched with score: {match_result['match_score']}%")
-            else:
-                logger.warning(f"JD matching failed for CV {cv_id}: {match_result.get('error')}")
+        return {"success": True, "results": results}
+
+    except Exception as e:
+        # A group-wide stage failed: don't leave the unfinished CVs PROCESSING
+        logger.error(f"Error processing CV group {cv_ids}: {e}")
+        for cv_id in stage_timers:
+            if cv_id not in results:
+                await run_db(_record_cv_failure, db, cv_id, user_id, e, stage_timers[cv_id])
+        raise
+
+    finally:
+        for file_content in downloads:
+            if not isinstance(file_content, BaseException):
+                file_content.close()
+        await run_db(db.close)
+
+
+async def _match_group(
+    contexts: List[Tuple[CV, CVBatch, Optional[JobDescription], StageTimer]],
+    parse_results: Dict[str, Dict[str, Any]],
+    db: Session,
+    user_id: str,
+) -> Dict[str, Dict[str, Any]]:
+    """Match a group's parsed CVs against their shared JD with the batch matcher"""
+    matchable = [
+        (cv, job_description, stage_timer)
+        for cv, _, job_description, stage_timer in contexts
+        if job_description and (parse_results.get(str(cv.id)) or {}).get("success")
+    ]
+    if not matchable:
+        return {}
 
-        # Stage 6 & 7: Optional Analysis (GitHub) & Finalizing
-        # We wrap this in a sub-try block to ensure that if these optional steps fail
-        # but the CV was already successfully scored, we don't mark the whole CV as FAILED.
+    # All CVs in a group come from the same batch, so they share one JD
+    job_description = matchable[0][1]
+
+    # The batched LLM call is timed as MATCHING_JD for every CV
+    with ExitStack() as stack:
+        match_stages = [
+            stack.enter_context(
+                stage_timer.stage("MATCHING_JD", batch_size=len(matchable))
+            )
+            for _, _, stage_timer in matchable
+        ]
         try:
-            # Stage 6: Analyzing GitHub (80%) - Optional
-            # Can be implemented later if github_username is found
-            github_username = parsed_data.get("personal_info", {}).get("github", "").split("/")[-1] if parsed_data.get("personal_info", {}).get("github") else None
-            if github_username:
-                _publish_progress(
-                    user_id, cv_id, str(cv.batch_id), "ANALYZING_GITHUB", cv.filename,
-                    github_username=github_username
-                )
-                self.update_state(state="PROGRESS", meta={"progress": 80, "stage": "ANALYZING_GITHUB"})
-                time.sleep(0.5)  # Placeholder for future GitHub analysis
-
-            # Stage 7: Finalizing (90%)
-            _publish_progress(user_id, cv_id, str(cv.batch_id), "FINALIZING", cv.filename)
-            self.update_state(state="PROGRESS", meta={"progress": 90, "stage": "FINALIZING"})
-        
-        except Exception as step_error:
-            logger.error(f"Optional step failed for CV {cv_id}: {step_error}")
-            # Continue to completion - core analysis was successful
-
-        # Update CV status
-        cv.status = CVStatus.COMPLETED
-        cv.processed_at = db.query(func.now()).scalar()
-        db.commit()
-
-        # Update batch stats
-        batch.processed_cvs += 1
-        db.commit()
-
-        # Calculate processing time
-        processing_time = time.time() - start_time
-
-        # Stage 8: Completed (100%)
+            match_results = await cv_jd_matcher_service.match_cvs_to_jd_batch(
+                candidates=[
+                    (str(cv.id), parse_results[str(cv.id)]["parsed_data"])
+                    for cv, _, _ in matchable
+                ],
+                job_description=job_description,
+                db=db,
+                user_id=user_id,
+            )
+        except Exception as e:
+            logger.warning(f"Group JD matching failed: {e}")
+            match_results = {}
+        for (cv, _, _), match_stage in zip(matchable, match_stages):
+            match_stage["success"] = (match_results.get(str(cv.id)) or {}).get("success", False)
+
+    return match_results
+
+
+async def _complete_cv(
+    db: Session,
+    cv: CV,
+    batch: CVBatch,
+    job_description: Optional[JobDescription],
+    result: Dict[str, Any],
+    stage_timer: StageTimer,
+    user_id: str,
+    start_time: float,
+    match_result: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """Run JD matching on a parsed CV, then persist and publish completion"""
+    cv_id = str(cv.id)
+
+    # Track usage and cost
+    total_usage = {
+        "input_tokens": result["usage"].get("input_tokens", 0),
+        "output_tokens": result["usage"].get("output_tokens", 0),
+    }
+    total_cost = _result_cost(result)
+
+    parsed_data = result["parsed_data"]
+
+    # Stage 4: Matching against JD - Only if JD exists (group runs match up front)
+    if job_description and match_result is None:
+        with stage_timer.stage("MATCHING_JD") as match_stage:
+            match_result = await cv_jd_matcher_service.match_cv_to_jd(
+                cv_parsed_data=parsed_data,
+                job_description=job_description,
+                db=db,
+                user_id=user_id,
+                cv_id=cv_id,
+            )
+            match_stage["success"] = match_result["success"]
+
+    if match_result and match_result["success"]:
+        # Save match score and data
+        cv.jd_match_score = match_result["match_score"]
+        cv.jd_match_data = match_result["match_data"]
+        await run_db(db.commit)
+
+        # Track usage
+        total_usage["input_tokens"] += match_result["usage"].get("input_tokens", 0)
+        total_usage["output_tokens"] += match_result["usage"].get("output_tokens", 0)
+        total_cost += _result_cost(match_result)
+
+        logger.info(f"CV {cv_id} matched with score: {match_result['match_score']}%")
+    elif match_result:
+        logger.warning(f"JD matching failed for CV {cv_id}: {match_result.get('error')}")
+
+    # Stage 5: Finalizing - persist status and batch stats
+    with stage_timer.stage("FINALIZING"):
+        await run_db(_finalize_cv, db, cv, batch)
+
+    # Store stage timings together with the final status
+    cv.processing_stages = stage_timer.to_dict()
+    await run_db(db.commit)
+    # Read everything the events thread needs here: the session isn't thread-safe
+    batch_id = str(cv.batch_id)
+    filename = cv.filename
+    match_score = cv.jd_match_score
+    duration_seconds = (
+        (cv.processed_at - cv.created_at).total_seconds() if cv.created_at else None
+    )
+
+    # Calculate processing time
+    processing_time = time.time() - start_time
+
+    def _publish_completion():
+        batch_counters.transition(
+            batch_id,
+            CVStatus.PROCESSING,
+            CVStatus.COMPLETED,
+            duration_seconds=duration_seconds,
+        )
+
+        # Stage 6: Completed (100%)
         _publish_progress(
-            user_id, cv_id, str(cv.batch_id), "COMPLETED", cv.filename,
+            user_id, cv_id, batch_id, "COMPLETED", filename,
             parse_detail_id=result["parse_detail_id"],
-            match_score=cv.jd_match_score,
+            match_score=match_score,
             processing_time=round(processing_time, 2)
         )
 
         # Publish batch progress update
-        queue_status = get_queue_status(str(cv.batch_id))
-        redis_event_bus.publish_batch_progress(
-            user_id=user_id,
-            batch_id=str(cv.batch_id),
-            queue_status=queue_status,
-        )
+        _publish_batch_progress(user_id, batch_id)
 
-        self.update_state(
-            state="SUCCESS",
-            meta={
-                "progress": 100,
-                "stage": "COMPLETED",
-                "cv_id": cv_id,
-                "parse_detail_id": result["parse_detail_id"],
-                "match_score": cv.jd_match_score,
-                "usage": total_usage,
-                "cost": total_cost,
-                "processing_time": processing_time,
-            },
-        )
+    # Awaited so the pipeline holds its in-flight slot until its completion is published
+    await _on_events_thread(_publish_completion)
 
-        return {
-            "success": True,
-            "cv_id": cv_id,
-            "parse_detail_id": result["parse_detail_id"],
-            "match_score": cv.jd_match_score,
-            "usage": total_usage,
-            "cost": total_cost,
-            "processing_time": processing_time,
-        }
+    return {
+        "success": True,
+        "cv_id": cv_id,
+        "parse_detail_id": result["parse_detail_id"],
+        "match_score": match_score,
+        "usage": total_usage,
+        "cost": total_cost,
+        "processing_time": processing_time,
+    }
 
-    except Exception as e:
-        logger.error(f"Error processing CV {cv_id}: {e}")
 
-        # Update CV status
-        try:
-            cv = db.query(CV).filter(CV.id == cv_id).first()
-            if cv:
-                # CRITICAL FIX: If we have a match score, do not mark as FAILED.
-                # Treat as COMPLETED with a warning in the error message.
-                if cv.jd_match_score is not None:
-                     cv.status = CVStatus.COMPLETED
-                     cv.error_message = f"Completed with warning: {str(e)}"
-                     logger.warning(f"Marking CV {cv_id} as COMPLETED despite error: {e}")
-                     # Ensure we increment processed stats if not already done?
-                     # Since we are in the main except, we failed before lines 226.
-                     # We should check if we need to increment processed count.
-                     # For safety, let's treat it as a success for the batch too.
-                     batch = db.query(CVBatch).filter(CVBatch.id == cv.batch_id).first()
-                     if batch:
-                         batch.processed_cvs += 1
-                else:
-                    cv.status = CVStatus.FAILED
-                    cv.error_message = str(e)
-                    # Update batch stats (failure)
-                    batch = db.query(CVBatch).filter(CVBatch.id == cv.batch_id).first()
-                    if batch:
-                        batch.failed_cvs += 1
-                
-                db.commit()
+def _finalize_cv(db: Session, cv: CV, batch: CVBatch):
+    """Mark the CV completed and count it in the batch stats (committed with the stage timings)"""
+    cv.status = CVStatus.COMPLETED
+    cv.processed_at = db.query(func.now()).scalar()
+
+    # Update batch stats
+    _increment_batch_stat(db, batch.id, CVBatch.processed_cvs)
+    db.flush()
+
+
+def _record_cv_failure(
+    db: Session,
+    cv_id: str,
+    user_id: str,
+    error: Exception,
+    stage_timer: Optional[StageTimer],
+):
+    """Mark a CV as failed (or completed with warning) and publish the error"""
+    e = error
+
+    # Update CV status
+    try:
+        db.rollback()
+        cv = db.query(CV).filter(CV.id == cv_id).first()
+        if cv:
+            previous_status = cv.status
+            # CRITICAL FIX: If we have a match score, do not mark as FAILED.
+            # Treat as COMPLETED with a warning in the error message.
+            if cv.jd_match_score is not None:
+                 cv.status = CVStatus.COMPLETED
+                 cv.error_message = f"Completed with warning: {str(e)}"
+                 logger.warning(f"Marking CV {cv_id} as COMPLETED despite error: {e}")
+                 # Ensure we increment processed stats if not already done?
+                 # Since we are in the main except, we failed before lines 226.
+                 # We should check if we need to increment processed count.
+                 # For safety, let's treat it as a success for the batch too.
+                 _increment_batch_stat(db, cv.batch_id, CVBatch.processed_cvs)
+            else:
+                cv.status = CVStatus.FAILED
+                cv.error_message = str(e)
+                # Update batch stats (failure)
+                _increment_batch_stat(db, cv.batch_id, CVBatch.failed_cvs)
+
+            if stage_timer:
+                cv.processing_stages = stage_timer.to_dict()
+
+            db.commit()
+            batch_id = str(cv.batch_id)
+            status = cv.status
+
+            def _publish_failure():
+                batch_counters.transition(batch_id, previous_status, status)
 
                 # Publish error event
                 redis_event_bus.publish_cv_progress(
                     user_id=user_id,
                     cv_id=cv_id,
-                    batch_id=str(cv.batch_id),
+                    batch_id=batch_id,
                     progress=0,
                     status=f"Failed: {str(e)}",
                     stage="FAILED",
                     error=str(e),
                 )
-        except Exception as db_error:
-            logger.error(f"Failed to update CV status: {db_error}")
+                _publish_batch_progress(user_id, batch_id)
+
+            _in_background(_publish_failure)
+    except Exception as db_error:
+        logger.error(f"Failed to update CV status: {db_error}")
 
-        raise
 
+@celery_app.task(name="app.tasks.recover_stuck_cvs")
+def recover_stuck_cvs_task() -> Dict[str, Any]:
+    """
+    Re-queue CVs whose pipeline died with its worker
+
+    Pipeline tasks are acked once the pipeline starts, so Celery does not
+    redeliver them when a worker crashes or is OOM-killed; their CVs stay
+    PROCESSING. This sweep (celery beat every CV_PIPELINE_RECOVERY_INTERVAL
+    seconds, and once per worker start) re-queues CVs PROCESSING for longer
+    than CV_PIPELINE_STUCK_AFTER_SECONDS, and marks them FAILED once they
+    have been started CV_PIPELINE_MAX_ATTEMPTS times (e.g. a file that
+    crashes the worker every time).
+
+    Returns:
+        Dictionary with the requeued and failed CV ids
+    """
+    db = SessionLocal()
+    try:
+        requeued, failed = _claim_stuck_cvs(db)
     finally:
         db.close()
 
+    for cv_id, batch_id, user_id in requeued:
+        batch_counters.transition(batch_id, CVStatus.PROCESSING, CVStatus.QUEUED)
+        process_cv_task.delay(cv_id=cv_id, user_id=user_id)
+        redis_event_bus.publish_cv_progress(
+            user_id=user_id,
+            cv_id=cv_id,
+            batch_id=batch_id,
+            progress=0,
+            status="Re-queued after worker failure",
+        )
+    for cv_id, batch_id, user_id in failed:
+        batch_counters.transition(batch_id, CVStatus.PROCESSING, CVStatus.FAILED)
+        redis_event_bus.publish_cv_progress(
+            user_id=user_id,
+            cv_id=cv_id,
+            batch_id=batch_id,
+            progress=0,
+            status=f"Failed: {STUCK_CV_ERROR}",
+            stage="FAILED",
+            error=STUCK_CV_ERROR,
+        )
+    for batch_id, user_id in {(batch_id, user_id) for _, batch_id, user_id in requeued + failed}:
+        _publish_batch_progress(user_id, batch_id)
+
+    if requeued or failed:
+        logger.warning(f"Recovered stuck CVs: {len(requeued)} re-queued, {len(failed)} failed")
+    return {
+        "requeued": [cv_id for cv_id, _, _ in requeued],
+        "failed": [cv_id for cv_id, _, _ in failed],
+    }
+
+
+def _claim_stuck_cvs(
+    db: Session,
+) -> Tuple[List[Tuple[str, str, str]], List[Tuple[str, str, str]]]:
+    """
+    Move CVs stuck in PROCESSING back to QUEUED (or FAILED) in one commit
+
+    Rows are locked with SKIP LOCKED, so sweeps running at the same time on
+    several workers never claim the same CV twice.
+
+    Returns:
+        ((cv_id, batch_id, user_id) re-queued, (cv_id, batch_id, user_id) failed)
+    """
+    cutoff = func.now() - timedelta(seconds=settings.CV_PIPELINE_STUCK_AFTER_SECONDS)
+    stuck = (
+        db.query(CV)
+        .filter(
+            CV.status == CVStatus.PROCESSING,
+            # CVs started before processing_started_at existed
+            func.coalesce(CV.processing_started_at, CV.created_at) < cutoff,
+        )
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+
+    requeued, failed = [], []
+    for cv in stuck:
+        ids = (str(cv.id), str(cv.batch_id), str(cv.user_id))
+        if cv.processing_attempts >= settings.CV_PIPELINE_MAX_ATTEMPTS:
+            cv.status = CVStatus.FAILED
+            cv.error_message = STUCK_CV_ERROR
+            _increment_batch_stat(db, cv.batch_id, CVBatch.failed_cvs)
+            failed.append(ids)
+        else:
+            cv.status = CVStatus.QUEUED
+            requeued.append(ids)
+    db.commit()
+    return requeued, failed
+
+
+def _aggregate_batch_counters(db: Session, batch_id: str) -> Optional[Dict[str, float]]:
+    """
+    Aggregate a batch's status counters from Postgres (seeds the Redis counters)
+
+    Returns:
+        Counters dictionary, or None if the batch does not exist
+    """
+    batch_exists = db.query(CVBatch.id).filter(CVBatch.id == batch_id).first()
+    if not batch_exists:
+        return None
+
+    # Count by status (served by ix_cvs_batch_status_created)
+    status_counts = dict(
+        db.query(CV.status, func.count(CV.id))
+        .filter(CV.batch_id == batch_id)
+        .group_by(CV.status)
+        .all()
+    )
+
+    # Processing time of completed CVs
+    duration_count, duration_sum = (
+        db.query(
+            func.count(CV.id),
+            func.sum(func.extract("epoch", CV.processed_at - CV.created_at)),
+        )
+        .filter(
+            CV.batch_id == batch_id,
+            CV.status == CVStatus.COMPLETED,
+            CV.processed_at.isnot(None),
+            CV.created_at.isnot(None),
+        )
+        .one()
+    )
+
+    counters = {status.value: status_counts.get(status, 0) for status in TRACKED_STATUSES}
+    # Shortlisted/rejected CVs still count towards the batch total
+    counters["other"] = sum(status_counts.values()) - sum(counters.values())
+    counters["duration_sum"] = float(duration_sum or 0)
+    counters["duration_count"] = duration_count
+    return counters
+
 
 def get_queue_status(batch_id: str) -> Dict[str, Any]:
     """
     Get queue status for a batch with dynamic time estimation
 
+    Counts come from the batch's Redis counters; Postgres is only aggregated
+    when they are missing or due for reconciliation.
+
     Args:
         batch_id: Batch UUID
 
@@ -349,34 +955,29 @@ def get_queue_status(batch_id: str) -> Dict[str, Any]:
     db = SessionLocal()
 
     try:
-        batch = db.query(CVBatch).filter(CVBatch.id == batch_id).first()
-        if not batch:
-            return {"error": "Batch not found"}
-
-        cvs = db.query(CV).filter(CV.batch_id == batch_id).all()
+        counters = batch_counters.read(batch_id)
+        if counters is None:
+            version = batch_counters.version(batch_id)
+            counters = _aggregate_batch_counters(db, batch_id)
+            if counters is None:
+                return {"error": "Batch not found"}
+            batch_counters.store(batch_id, counters, version)
 
-        # Count by status
-        queued = sum(1 for cv in cvs if cv.status == CVStatus.QUEUED)
-        processing = sum(1 for cv in cvs if cv.status == CVStatus.PROCESSING)
-        completed = sum(1 for cv in cvs if cv.status == CVStatus.COMPLETED)
-        failed = sum(1 for cv in cvs if cv.status == CVStatus.FAILED)
+        queued = max(counters[CVStatus.QUEUED.value], 0)
+        processing = max(counters[CVStatus.PROCESSING.value], 0)
+        completed = max(counters[CVStatus.COMPLETED.value], 0)
+        failed = max(counters[CVStatus.FAILED.value], 0)
 
-        total = len(cvs)
+        total = queued + processing + completed + failed + counters.get("other", 0)
         processed_count = completed + failed
 
         # Calculate percentage
         percentage = (processed_count / total * 100) if total > 0 else 0
 
         # Calculate dynamic average processing time from completed CVs
-        completed_cvs = [cv for cv in cvs if cv.status == CVStatus.COMPLETED and cv.processed_at and cv.created_at]
-
-        if len(completed_cvs) >= 2:
+        if counters["duration_count"] >= 2:
             # Use actual average processing time from completed CVs
-            total_time = sum(
-                (cv.processed_at - cv.created_at).total_seconds()
-                for cv in completed_cvs
-            )
-            avg_time_per_cv = total_time / len(completed_cvs)
+            avg_time_per_cv = counters["duration_sum"] / counters["duration_count"]
         else:
             # Default estimate: 40 seconds per CV (includes JD matching)
             avg_time_per_cv = 40
@@ -385,18 +986,25 @@ def get_queue_status(batch_id: str) -> Dict[str, Any]:
         remaining_cvs = queued + processing
         estimated_time_seconds = remaining_cvs * avg_time_per_cv
 
-        # Build queue details for each CV
-        queue_details = []
-        position = 1
-        for cv in sorted(cvs, key=lambda x: x.created_at):
-            if cv.status == CVStatus.QUEUED:
-                queue_details.append({
-                    "cv_id": str(cv.id),
-                    "filename": cv.filename,
-                    "queue_position": position,
-                    "estimated_wait_seconds": position * avg_time_per_cv,
-                })
-                position += 1
+        # Build queue details for the first 10 queued CVs (for display)
+        next_in_queue = (
+            db.query(CV.id, CV.filename)
+            .filter(CV.batch_id == batch_id, CV.status == CVStatus.QUEUED)
+            .order_by(CV.created_at)
+            .limit(10)
+            .all()
+            if queued
+            else []
+        )
+        queue_details = [
+            {
+                "cv_id": str(cv.id),
+                "filename": cv.filename,
+                "queue_position": position,
+                "estimated_wait_seconds": position * avg_time_per_cv,
+            }
+            for position, cv in enumerate(next_in_queue, start=1)
+        ]
 
         return {
             "batch_id": batch_id,
@@ -409,7 +1017,7 @@ def get_queue_status(batch_id: str) -> Dict[str, Any]:
             "avg_processing_time_seconds": round(avg_time_per_cv, 1),
             "estimated_time_seconds": round(estimated_time_seconds),
             "estimated_time_minutes": round(estimated_time_seconds / 60, 1),
-            "queue_details": queue_details[:10],  # Return first 10 for display
+            "queue_details": queue_details,
         }
 
     finally:
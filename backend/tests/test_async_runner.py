@@ -0,0 +1,81 @@
+"""Tests for the per-process pipeline event loop runner"""
+
+import asyncio
+import threading
+
+import pytest
+
+from app.core.async_runner import AsyncTaskRunner
+from app.database import run_db
+
+
+@pytest.fixture
+def runner():
+    runner = AsyncTaskRunner(max_in_flight=2)
+    yield runner
+    runner.shutdown(timeout=5)
+
+
+def test_submit_returns_before_the_coroutine_finishes(runner):
+    release = threading.Event()
+
+    async def pipeline():
+        await asyncio.get_running_loop().run_in_executor(None, release.wait)
+        return "done"
+
+    future = runner.submit(pipeline())
+    assert not future.done()
+    assert runner.in_flight == 1
+
+    release.set()
+    assert future.result(timeout=5) == "done"
+
+
+def test_submit_blocks_only_beyond_max_in_flight(runner):
+    release = asyncio.Event()
+    loop_ready = threading.Event()
+
+    async def pipeline():
+        loop_ready.set()
+        await release.wait()
+
+    first = runner.submit(pipeline())
+    second = runner.submit(pipeline())
+    loop_ready.wait(timeout=5)
+
+    third_submitted = threading.Event()
+
+    def submit_third():
+        runner.submit(pipeline())
+        third_submitted.set()
+
+    threading.Thread(target=submit_third, daemon=True).start()
+    assert not third_submitted.wait(timeout=0.2)
+
+    runner._loop.call_soon_threadsafe(release.set)
+    first.result(timeout=5)
+    second.result(timeout=5)
+    assert third_submitted.wait(timeout=5)
+
+
+def test_shutdown_waits_for_in_flight_coroutines(runner):
+    async def pipeline():
+        await asyncio.sleep(0.2)
+        return "done"
+
+    future = runner.submit(pipeline())
+    runner.shutdown(timeout=5)
+
+    assert future.result(timeout=0) == "done"
+
+
+def test_run_db_runs_blocking_calls_off_the_loop_thread(runner):
+    async def pipeline():
+        return threading.current_thread().name, await run_db(
+            lambda: threading.current_thread().name
+        )
+
+    loop_thread, db_thread = runner.submit(pipeline()).result(timeout=5)
+
+    assert loop_thread == "cv-pipeline-loop"
+    assert db_thread.startswith("cv-pipeline-db")
@@ -0,0 +1,25 @@
+"""Tests for how many CVs the shipped settings pack into one batched LLM call"""
+
+from app.core.config import settings
+from app.services.cv_jd_matcher import cv_jd_matcher_service
+from app.services.cv_parser import cv_parser_service
+from app.services.llm_factory import llm_factory
+
+
+def test_default_settings_batch_parse_several_cvs():
+    assert llm_factory.get_service().max_output_tokens() == 8192
+    assert cv_parser_service.batch_parse_capacity() >= 2
+
+
+def test_default_settings_batch_match_several_cvs():
+    assert cv_jd_matcher_service.match_batch_capacity() >= 3
+
+
+def test_batch_matching_disabled_is_logged_by_startup_check(monkeypatch, caplog):
+    monkeypatch.setattr(settings, "CV_MATCH_BATCH_PER_CV_TOKENS", 6000)
+
+    assert cv_jd_matcher_service.match_batch_capacity() == 1
+    assert "Batch matching disabled" not in caplog.text
+
+    cv_jd_matcher_service.check_batch_capacity()
+    assert "Batch matching disabled" in caplog.text
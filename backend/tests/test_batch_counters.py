@@ -0,0 +1,84 @@
+"""Tests for the Redis batch status counters against fakeredis"""
+
+import fakeredis
+import pytest
+import redis
+
+from app.core.batch_counters import BatchCounters
+from app.models.job import CVStatus
+
+BATCH_ID = "batch-1"
+
+SNAPSHOT = {
+    CVStatus.QUEUED.value: 3,
+    CVStatus.PROCESSING.value: 1,
+    CVStatus.COMPLETED.value: 1,
+    CVStatus.FAILED.value: 0,
+    "other": 0,
+    "duration_sum": 10.0,
+    "duration_count": 1,
+}
+
+
+@pytest.fixture
+def counters(monkeypatch):
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(
+        redis, "from_url",
+        lambda url, **kwargs: fakeredis.FakeRedis(server=server, **kwargs),
+    )
+    return BatchCounters()
+
+
+def test_transitions_apply_to_seeded_counters(counters):
+    assert counters.store(BATCH_ID, SNAPSHOT, counters.version(BATCH_ID))
+
+    counters.transition(BATCH_ID, CVStatus.QUEUED, CVStatus.PROCESSING)
+    counters.transition(BATCH_ID, CVStatus.PROCESSING, CVStatus.COMPLETED, duration_seconds=4.0)
+
+    current = counters.read(BATCH_ID)
+    assert current[CVStatus.QUEUED.value] == 2
+    assert current[CVStatus.PROCESSING.value] == 1
+    assert current[CVStatus.COMPLETED.value] == 2
+    assert current["duration_sum"] == 14.0
+    assert current["duration_count"] == 2
+
+
+def test_transitions_never_half_populate_missing_counters(counters):
+    counters.transition(BATCH_ID, CVStatus.QUEUED, CVStatus.PROCESSING)
+
+    assert counters.read(BATCH_ID) is None
+
+
+def test_reseed_replays_transitions_made_while_aggregating(counters):
+    version = counters.version(BATCH_ID)
+    # Transitions land after the version read, while Postgres is being aggregated
+    counters.transition(BATCH_ID, CVStatus.QUEUED, CVStatus.PROCESSING)
+    counters.transition(BATCH_ID, CVStatus.PROCESSING, CVStatus.FAILED)
+
+    assert counters.store(BATCH_ID, SNAPSHOT, version)
+
+    current = counters.read(BATCH_ID)
+    assert current[CVStatus.QUEUED.value] == 2
+    assert current[CVStatus.PROCESSING.value] == 1
+    assert current[CVStatus.FAILED.value] == 1
+
+
+def test_reseed_keeps_up_with_a_busy_batch(counters):
+    for _ in range(3):
+        version = counters.version(BATCH_ID)
+        counters.transition(BATCH_ID, CVStatus.QUEUED, CVStatus.PROCESSING)
+        assert counters.store(BATCH_ID, SNAPSHOT, version)
+
+
+def test_reseed_racing_a_reset_is_discarded(counters):
+    version = counters.version(BATCH_ID)
+    counters.transition(BATCH_ID, CVStatus.QUEUED, CVStatus.PROCESSING)
+    counters.reset(BATCH_ID)
+    counters.transition(BATCH_ID, CVStatus.PROCESSING, CVStatus.COMPLETED)
+
+    assert not counters.store(BATCH_ID, SNAPSHOT, version)
+    assert counters.read(BATCH_ID) is None
+
+    # A re-seed that starts after the reset lands
+    assert counters.store(BATCH_ID, SNAPSHOT, counters.version(BATCH_ID))
@@ -0,0 +1,176 @@
+"""Tests for CacheService against fakeredis"""
+
+import asyncio
+
+import fakeredis.aioredis
+import pytest
+import pytest_asyncio
+from fastapi import Response
+
+from app.core import cache as cache_module
+from app.core.cache import CacheService, LocalCache
+from app.core.config import settings
+
+
+@pytest.fixture
+def redis_server(monkeypatch):
+    # Every CacheService created in a test talks to the same fake server
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(
+        cache_module.aioredis, "from_url",
+        lambda url, **kwargs: fakeredis.aioredis.FakeRedis(server=server, **kwargs),
+    )
+    return server
+
+
+@pytest_asyncio.fixture
+async def cache(redis_server):
+    service = CacheService()
+    await service.connect()
+    yield service
+    await service.close()
+
+
+async def wait_for_subscribers(service: CacheService, count: int):
+    for _ in range(100):
+        channels = dict(
+            await service.redis.pubsub_numsub(settings.CACHE_INVALIDATION_CHANNEL)
+        )
+        if channels.get(settings.CACHE_INVALIDATION_CHANNEL.encode(), 0) >= count:
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("invalidation listeners never subscribed")
+
+
+def test_local_cache_evicts_least_recently_used_entry():
+    local = LocalCache(max_entries=2, max_bytes=1000)
+    local.set("a", 1, ttl=60, size=10)
+    local.set("b", 2, ttl=60, size=10)
+    assert local.get("a") == 1  # "b" is now the oldest
+
+    local.set("c", 3, ttl=60, size=10)
+
+    assert local.get("b") is None
+    assert local.get("a") == 1
+    assert local.get("c") == 3
+    assert local.entry_count == 2
+    assert local.size_bytes == 20
+
+
+def test_local_cache_bounds_bytes_and_expires_entries():
+    local = LocalCache(max_entries=10, max_bytes=100)
+    local.set("a", "x", ttl=60, size=60)
+    local.set("b", "y", ttl=60, size=60)
+    assert local.get("a") is None
+    assert local.size_bytes == 60
+
+    # Too large for the tier at all, and non-positive TTLs aren't stored
+    local.set("huge", "z", ttl=60, size=101)
+    local.set("expired", "z", ttl=0, size=1)
+    assert local.get("huge") is None
+    assert local.get("expired") is None
+
+    local.delete_pattern("b*")
+    assert local.entry_count == 0
+    assert local.size_bytes == 0
+
+
+@pytest.mark.asyncio
+async def test_local_tier_serves_hits_without_redis(cache):
+    await cache.set("cache:1:stats:g0:abc", {"total": 3}, ttl=60, namespace="stats")
+    await cache.redis.delete("cache:1:stats:g0:abc")
+
+    assert await cache.get("cache:1:stats:g0:abc", "stats") == {"total": 3}
+    assert cache.metrics.snapshot()["stats"]["local_reads"] == 1
+
+
+@pytest.mark.asyncio
+async def test_redis_hit_populates_local_tier(cache):
+    other = CacheService()
+    await other.connect()
+    try:
+        await other.set("cache:1:stats:g0:abc", {"total": 3}, ttl=60)
+    finally:
+        await other.close()
+
+    assert cache.local.get("cache:1:stats:g0:abc") is None
+    assert await cache.get("cache:1:stats:g0:abc") == {"total": 3}
+    assert cache.local.get("cache:1:stats:g0:abc") == {"total": 3}
+
+
+@pytest.mark.asyncio
+async def test_invalidate_bumps_generation_so_handler_recomputes(cache):
+    calls = []
+
+    @cache.cache_response(ttl=60, prefix="stats")
+    async def handler(current_user=None):
+        calls.append(1)
+        return {"version": len(calls)}
+
+    user = type("User", (), {"id": 7})()
+    assert await handler(current_user=user) == {"version": 1}
+    assert await handler(current_user=user) == {"version": 1}
+
+    await cache.invalidate(7, "stats")
+
+    assert await cache.get_generation("7", "stats") == 1
+    assert await handler(current_user=user) == {"version": 2}
+    # Other users and namespaces keep their generation
+    assert await cache.get_generation("8", "stats") == 0
+    assert await cache.get_generation("7", "history") == 0
+
+
+@pytest.mark.asyncio
+async def test_invalidation_reaches_other_replicas_local_tier(cache):
+    replica = CacheService()
+    await replica.connect()
+    try:
+        await wait_for_subscribers(cache, 2)
+        await cache.set("cache:1:stats:g0:abc", {"total": 3}, ttl=60)
+        assert await replica.get_generation("1", "stats") == 0
+        assert await replica.get("cache:1:stats:g0:abc") == {"total": 3}
+
+        await cache.invalidate(1, "stats")
+        await cache.delete("cache:1:stats:g0:abc")
+
+        for _ in range(100):
+            if replica.local.entry_count == 0:
+                break
+            await asyncio.sleep(0.01)
+        assert replica.local.get("cache:1:stats:g0:abc") is None
+        assert await replica.get_generation("1", "stats") == 1
+    finally:
+        await replica.close()
+
+
+@pytest.mark.asyncio
+async def test_stale_entry_is_served_while_refreshing_in_background(cache):
+    calls = []
+    release = asyncio.Event()
+
+    # ttl=0: every entry is stale as soon as it is written
+    @cache.cache_response(ttl=0, stale_ttl=60, prefix="stats")
+    async def handler(item: str, response: Response = None):
+        calls.append(item)
+        if len(calls) > 1:
+            await release.wait()
+        return {"version": len(calls)}
+
+    response = Response()
+    assert await handler(item="a", response=response) == {"version": 1}
+    assert response.headers["X-Cache"] == "MISS"
+
+    # The refresh is blocked, yet the stale value comes back right away
+    response = Response()
+    result = await asyncio.wait_for(handler(item="a", response=response), timeout=1)
+    assert result == {"version": 1}
+    assert response.headers["X-Cache"] == "STALE"
+
+    # Concurrent stale reads don't start a second refresh
+    assert await handler(item="a") == {"version": 1}
+    await asyncio.sleep(0)
+    assert len(calls) == 2
+
+    release.set()
+    await asyncio.gather(*cache._refreshes)
+    assert await handler(item="a") == {"version": 2}
@@ -0,0 +1,79 @@
+"""Tests for the tagged binary cache payload format"""
+
+import json
+
+import pytest
+
+from app.core import cache_codec
+from app.core.cache_codec import COMPRESSIONS, MAGIC, SERIALIZERS, CacheCodec
+
+VALUE = {
+    "total_cvs": 42,
+    "ratio": 0.5,
+    "name": "Zürich",
+    "tags": ["a", "b", None],
+    "nested": {"ok": True},
+    "rows": [{"id": i, "label": "x" * 20} for i in range(200)],
+}
+
+INSTALLED_SERIALIZERS = [name for name in SERIALIZERS if cache_codec._AVAILABLE[name]]
+INSTALLED_COMPRESSIONS = [name for name in COMPRESSIONS if cache_codec._AVAILABLE[name]]
+
+
+@pytest.mark.parametrize("compression", INSTALLED_COMPRESSIONS)
+@pytest.mark.parametrize("serializer", INSTALLED_SERIALIZERS)
+def test_round_trip_with_header(serializer, compression):
+    codec = CacheCodec(serializer=serializer, compression=compression, compress_min_bytes=64)
+
+    payload, size = codec.encode(VALUE)
+
+    assert payload[:2] == MAGIC
+    assert payload[2:3] == SERIALIZERS[serializer]
+    assert payload[3:4] == COMPRESSIONS[compression]
+    assert codec.decode_sized(payload) == (VALUE, size)
+
+
+@pytest.mark.parametrize("compression", INSTALLED_COMPRESSIONS)
+@pytest.mark.parametrize("serializer", INSTALLED_SERIALIZERS)
+def test_fallback_codec_reads_entries_written_by_any_configuration(serializer, compression):
+    writer = CacheCodec(serializer=serializer, compression=compression, compress_min_bytes=64)
+    # What a replica without the optional packages ends up with
+    reader = CacheCodec(serializer="json", compression="none")
+
+    payload, _ = writer.encode(VALUE)
+
+    assert reader.decode(payload) == VALUE
+
+
+def test_small_payloads_are_not_compressed():
+    codec = CacheCodec(serializer="json", compression="zstd", compress_min_bytes=4096)
+    if codec.compression == "none":
+        pytest.skip("zstandard not installed")
+
+    payload, size = codec.encode({"a": 1})
+
+    assert payload[3:4] == COMPRESSIONS["none"]
+    assert size == len(payload) - 4
+
+
+def test_legacy_plain_json_entries_are_read():
+    codec = CacheCodec()
+
+    assert codec.decode(json.dumps(VALUE).encode()) == VALUE
+    assert codec.decode(json.dumps(VALUE)) == VALUE
+
+
+def test_missing_codec_falls_back_to_json_and_none(monkeypatch):
+    monkeypatch.setitem(cache_codec._AVAILABLE, "msgpack", False)
+    monkeypatch.setitem(cache_codec._AVAILABLE, "lz4", False)
+
+    codec = CacheCodec(serializer="msgpack", compression="lz4")
+
+    assert (codec.serializer, codec.compression) == ("json", "none")
+    assert codec.decode(codec.encode(VALUE)[0]) == VALUE
+
+
+def test_non_string_keys_are_stringified():
+    for serializer in INSTALLED_SERIALIZERS:
+        codec = CacheCodec(serializer=serializer, compression="none")
+        assert codec.decode(codec.encode({1: "a"})[0]) == {"1": "a"}
@@ -0,0 +1,43 @@
+"""Tests for the per-namespace cache metrics"""
+
+from app.core.cache_metrics import COUNTERS, TIMERS, CacheMetrics
+
+
+def test_snapshot_derives_hit_ratio_and_recompute_times():
+    metrics = CacheMetrics()
+    metrics.incr("stats", "hits", 2)
+    metrics.incr("stats", "stale_hits")
+    metrics.incr("stats", "misses")
+    metrics.incr("stats", "recomputes", 2)
+    metrics.observe("stats", "recompute_seconds", 0.1)
+    metrics.observe("stats", "recompute_seconds", 0.3)
+
+    stats = metrics.snapshot()["stats"]
+
+    assert stats["hit_ratio"] == 0.75
+    assert stats["recompute_avg_ms"] == 200.0
+    assert stats["recompute_max_ms"] == 300.0
+    assert stats["errors"] == 0
+
+
+def test_prometheus_output_has_one_series_per_namespace():
+    metrics = CacheMetrics()
+    metrics.incr("stats", "hits", 3)
+    metrics.incr("history", "misses")
+
+    lines = metrics.to_prometheus().splitlines()
+
+    for name in COUNTERS + TIMERS:
+        assert f"# TYPE screenflow_cache_{name}_total counter" in lines
+    assert 'screenflow_cache_hits_total{namespace="stats"} 3.0' in lines
+    assert 'screenflow_cache_hits_total{namespace="history"} 0' in lines
+    assert 'screenflow_cache_misses_total{namespace="history"} 1.0' in lines
+
+
+def test_reset_clears_every_namespace():
+    metrics = CacheMetrics()
+    metrics.incr("stats", "hits")
+    metrics.reset()
+
+    assert metrics.snapshot() == {}
+    assert metrics.to_prometheus().count("{") == 0
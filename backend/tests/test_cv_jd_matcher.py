@@ -0,0 +1,85 @@
+"""Tests for how the CV-JD matcher reaches the LLM and memoizes results"""
+
+import contextlib
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from app.services import cv_jd_matcher as matcher_module
+from app.services.cv_jd_matcher import cv_jd_matcher_service
+
+
+class IdleSession:
+    def in_transaction(self):
+        return False
+
+
+class JobDescription:
+    id = "jd-1"
+    structured_jd = {"title": "Engineer"}
+
+
+class FakeFactory:
+    def __init__(self, result):
+        self.result = result
+        self.interactive = []
+
+    def get_service(self, interactive=False):
+        self.interactive.append(interactive)
+        return self
+
+    async def invoke_model(self, prompt, **kwargs):
+        return self.result
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("interactive", [False, True])
+async def test_interactive_matching_uses_interactive_governor(monkeypatch, interactive):
+    factory = FakeFactory({"success": False, "error": "No capacity", "throttled": True})
+    monkeypatch.setattr(matcher_module, "llm_factory", factory)
+
+    result = await cv_jd_matcher_service.match_cv_to_jd(
+        cv_parsed_data={"name": "Ada"},
+        job_description=JobDescription(),
+        db=IdleSession(),
+        user_id="user-1",
+        cv_id="cv-1",
+        use_cache=False,
+        interactive=interactive,
+    )
+
+    assert factory.interactive == [interactive]
+    assert result == {"success": False, "error": "No capacity", "throttled": True}
+
+
+class FailingCommitSession:
+    """Session whose commit fails, as when the connection drops mid-commit"""
+
+    def __init__(self):
+        self.added = []
+        self.rolled_back = False
+
+    def begin_nested(self):
+        return contextlib.nullcontext()
+
+    def add(self, entry):
+        self.added.append(entry)
+
+    def commit(self):
+        raise OperationalError("COMMIT", {}, Exception("connection lost"))
+
+    def rollback(self):
+        self.rolled_back = True
+
+
+def test_failed_cache_commit_leaves_session_usable():
+    db = FailingCommitSession()
+    job_description = JobDescription()
+    job_description.revision = 2
+
+    cv_jd_matcher_service._store_match(
+        db, job_description, "user-1", "hash", "strict", {"match_score": 80, "match_data": {}}
+    )
+
+    assert db.added
+    assert db.rolled_back
@@ -0,0 +1,56 @@
+"""Tests for the stuck-CV recovery sweep"""
+
+from app.models.job import CVStatus
+from app.tasks import cv_tasks
+
+
+class Recorder:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, *args, **kwargs):
+        self.calls.append((args, kwargs))
+
+
+def test_sweep_requeues_and_fails_claimed_cvs(monkeypatch):
+    requeued = [("cv-1", "batch-1", "user-1"), ("cv-2", "batch-1", "user-1")]
+    failed = [("cv-3", "batch-2", "user-1")]
+    closed = []
+
+    class Session:
+        def close(self):
+            closed.append(True)
+
+    delay, transition, publish, batch_progress = Recorder(), Recorder(), Recorder(), Recorder()
+    monkeypatch.setattr(cv_tasks, "SessionLocal", Session)
+    monkeypatch.setattr(cv_tasks, "_claim_stuck_cvs", lambda db: (requeued, failed))
+    monkeypatch.setattr(cv_tasks.process_cv_task, "delay", delay)
+    monkeypatch.setattr(cv_tasks.batch_counters, "transition", transition)
+    monkeypatch.setattr(cv_tasks.redis_event_bus, "publish_cv_progress", publish)
+    monkeypatch.setattr(cv_tasks, "_publish_batch_progress", batch_progress)
+
+    result = cv_tasks.recover_stuck_cvs_task.run()
+
+    assert result == {"requeued": ["cv-1", "cv-2"], "failed": ["cv-3"]}
+    assert closed
+    assert [kwargs for _, kwargs in delay.calls] == [
+        {"cv_id": "cv-1", "user_id": "user-1"},
+        {"cv_id": "cv-2", "user_id": "user-1"},
+    ]
+    assert [args for args, _ in transition.calls] == [
+        ("batch-1", CVStatus.PROCESSING, CVStatus.QUEUED),
+        ("batch-1", CVStatus.PROCESSING, CVStatus.QUEUED),
+        ("batch-2", CVStatus.PROCESSING, CVStatus.FAILED),
+    ]
+    assert publish.calls[-1][1]["stage"] == "FAILED"
+    assert sorted(args for args, _ in batch_progress.calls) == [
+        ("user-1", "batch-1"),
+        ("user-1", "batch-2"),
+    ]
+
+
+def test_sweep_is_on_the_beat_schedule():
+    from app.core.celery_config import celery_app
+
+    schedule = celery_app.conf.beat_schedule["recover-stuck-cvs"]
+    assert schedule["task"] == cv_tasks.recover_stuck_cvs_task.name
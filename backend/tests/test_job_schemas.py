@@ -0,0 +1,18 @@
+"""Tests for request validation in the job schemas"""
+
+import uuid
+
+import pytest
+from pydantic import ValidationError
+
+from app.schemas.job import MAX_DOWNLOAD_URL_CVS, CVDownloadURLRequest
+
+
+def test_download_url_request_caps_cv_ids():
+    ids = [uuid.uuid4() for _ in range(MAX_DOWNLOAD_URL_CVS + 1)]
+
+    assert len(CVDownloadURLRequest(cv_ids=ids[:-1]).cv_ids) == MAX_DOWNLOAD_URL_CVS
+    with pytest.raises(ValidationError):
+        CVDownloadURLRequest(cv_ids=ids)
+    with pytest.raises(ValidationError):
+        CVDownloadURLRequest(cv_ids=[])
@@ -0,0 +1,149 @@
+"""Tests for the incremental JSON scanner used on streamed LLM responses"""
+
+import json
+
+import pytest
+
+from app.core.json_stream import IncrementalJSONScanner, JSONStreamError
+
+DOCUMENT = {
+    "personal_info": {"name": "Jane \"JD\" Doe", "location": "Zürich\nCH"},
+    "skills": [
+        {"name": "Python", "years": 7.5, "current": True},
+        {"name": "Go", "years": -1, "current": False, "notes": None},
+    ],
+    "total": 1e3,
+}
+
+EXPECTED = [
+    (("personal_info", "name"), "Jane \"JD\" Doe"),
+    (("personal_info", "location"), "Zürich\nCH"),
+    (("skills", 0, "name"), "Python"),
+    (("skills", 0, "years"), 7.5),
+    (("skills", 0, "current"), True),
+    (("skills", 1, "name"), "Go"),
+    (("skills", 1, "years"), -1),
+    (("skills", 1, "current"), False),
+    (("skills", 1, "notes"), None),
+    (("total",), 1000.0),
+]
+
+
+def scan(chunks):
+    scanner = IncrementalJSONScanner()
+    values = []
+    for chunk in chunks:
+        values.extend(scanner.feed(chunk))
+    return scanner, values
+
+
+@pytest.mark.parametrize("indent", [None, 2])
+def test_whole_document(indent):
+    scanner, values = scan([json.dumps(DOCUMENT, indent=indent, ensure_ascii=False)])
+
+    assert values == EXPECTED
+    assert scanner.started
+    assert scanner.complete
+
+
+@pytest.mark.parametrize("ensure_ascii", [True, False])
+def test_one_character_at_a_time(ensure_ascii):
+    text = json.dumps(DOCUMENT, indent=2, ensure_ascii=ensure_ascii)
+
+    scanner, values = scan(list(text))
+
+    assert values == EXPECTED
+    assert scanner.complete
+
+
+def test_value_reported_once_complete():
+    scanner = IncrementalJSONScanner()
+
+    assert scanner.feed('{"personal_info": {"name": "Ja') == []
+    assert scanner.feed('ne"') == [(("personal_info", "name"), "Jane")]
+    # A number is only complete once a delimiter follows it
+    assert scanner.feed(', "age": 4') == []
+    assert scanner.feed("2") == []
+    assert scanner.feed("}") == [(("personal_info", "age"), 42)]
+    assert not scanner.complete
+    assert scanner.feed("}") == []
+    assert scanner.complete
+
+
+def test_reset_discards_a_partial_response():
+    scanner = IncrementalJSONScanner()
+    scanner.feed('{"personal_info": {"name": "Ja')
+
+    scanner.reset()
+
+    document = json.dumps(DOCUMENT)
+    assert scanner.feed(document) == EXPECTED
+    assert scanner.complete
+
+
+def test_code_fence_prefix_is_skipped():
+    scanner, values = scan(["```", "json\n", '{"a": "b"}', "\n```"])
+
+    assert values == [(("a",), "b")]
+    assert scanner.complete
+
+
+def test_nothing_started_before_document():
+    scanner = IncrementalJSONScanner()
+
+    assert scanner.feed("  \n```js") == []
+    assert not scanner.started
+    assert not scanner.complete
+
+
+def test_top_level_array():
+    scanner, values = scan(['["a", [1, 2], {"k": null}]'])
+
+    assert values == [((0,), "a"), ((1, 0), 1), ((1, 1), 2), ((2, "k"), None)]
+    assert scanner.complete
+
+
+def test_text_after_document_is_ignored():
+    scanner, values = scan(['{"a": 1}', ' trailing text {"b": 2}'])
+
+    assert values == [(("a",), 1)]
+    assert scanner.complete
+
+
+def test_prose_before_document_raises():
+    scanner = IncrementalJSONScanner()
+
+    with pytest.raises(JSONStreamError, match="does not start with JSON"):
+        scanner.feed('Here is the JSON: {"a": 1}')
+
+
+def test_too_long_prefix_raises():
+    scanner = IncrementalJSONScanner(max_prefix_chars=8)
+
+    with pytest.raises(JSONStreamError, match="No JSON document found"):
+        scanner.feed(" " * 9)
+
+
+def test_unbalanced_close_raises():
+    scanner = IncrementalJSONScanner()
+
+    with pytest.raises(JSONStreamError, match="Unbalanced"):
+        scanner.feed('{"a": [1}')
+
+
+def test_unexpected_character_raises():
+    scanner = IncrementalJSONScanner()
+
+    with pytest.raises(JSONStreamError, match="Unexpected"):
+        scanner.feed('{"a": @}')
+
+
+def test_invalid_literal_raises():
+    scanner = IncrementalJSONScanner()
+
+    with pytest.raises(JSONStreamError, match="Invalid literal"):
+        scanner.feed('{"a": tru}')
+
+
+def test_json_stream_error_is_value_error():
+    assert issubclass(JSONStreamError, ValueError)
@@ -0,0 +1,234 @@
+"""Tests for the LLM rate governor scripts and the governed service against fakeredis"""
+
+import asyncio
+import time
+
+import fakeredis.aioredis
+import pytest
+
+from app.core import llm_rate_governor as governor_module
+from app.core.config import settings
+from app.core.llm_rate_governor import LLMQueueTimeout, LLMRateGovernor
+from app.services import llm_factory
+from app.services.llm_factory import GovernedLLMService
+
+PROVIDER = "test"
+MODEL = "model"
+
+
+@pytest.fixture
+def redis_client(monkeypatch):
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(
+        governor_module.aioredis, "from_url",
+        lambda url, **kwargs: fakeredis.aioredis.FakeRedis(server=server, **kwargs),
+    )
+    return fakeredis.aioredis.FakeRedis(server=server, decode_responses=True)
+
+
+@pytest.fixture
+def governor(redis_client, monkeypatch):
+    governor = LLMRateGovernor()
+    monkeypatch.setattr(llm_factory, "llm_rate_governor", governor)
+    monkeypatch.setattr(settings, "LLM_GOVERNOR_THROTTLE_COOLDOWN_MS", 100)
+    monkeypatch.setattr(settings, "LLM_GOVERNOR_RECOVERY_STEP", 0.1)
+    return governor
+
+
+def set_limits(monkeypatch, rpm=0, tpm=0, concurrency=0):
+    monkeypatch.setattr(
+        settings, "LLM_GOVERNOR_LIMITS",
+        {f"{PROVIDER}:{MODEL}": {"rpm": rpm, "tpm": tpm, "concurrency": concurrency}},
+    )
+
+
+async def state(redis_client) -> dict:
+    return await redis_client.hgetall(f"llm:governor:{PROVIDER}:{MODEL}")
+
+
+async def acquire_now(governor, tokens=100):
+    """Acquire without queueing: raises LLMQueueTimeout if the call must wait"""
+    return await governor.acquire(PROVIDER, MODEL, tokens, deadline=time.time())
+
+
+class FakeProvider:
+    default_model = MODEL
+
+    def __init__(self, results):
+        self.results = list(results)
+        self.calls = 0
+
+    async def invoke_model(self, prompt, **kwargs):
+        self.calls += 1
+        return self.results.pop(0) if len(self.results) > 1 else self.results[0]
+
+
+OK = {"success": True, "response": "ok", "usage": {"total_tokens": 50}}
+THROTTLED = {"success": False, "response": None, "error": "slow down", "throttled": True}
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_charges_estimate_and_refunds_actual_usage(
+    governor, redis_client, monkeypatch
+):
+    set_limits(monkeypatch, tpm=1000)
+
+    lease_id, charged = await acquire_now(governor, tokens=600)
+    assert charged == 600
+    with pytest.raises(LLMQueueTimeout):
+        await acquire_now(governor, tokens=600)
+
+    await governor.release(PROVIDER, MODEL, lease_id, charged, used_tokens=100, success=True)
+    assert float((await state(redis_client))["tokens"]) >= 900
+
+    _, charged = await acquire_now(governor, tokens=600)
+    assert charged == 600
+
+
+@pytest.mark.asyncio
+async def test_estimate_above_bucket_size_is_charged_as_full_bucket(
+    governor, redis_client, monkeypatch
+):
+    set_limits(monkeypatch, tpm=1000)
+
+    lease_id, charged = await acquire_now(governor, tokens=5000)
+    assert charged == 1000
+
+    # Refunds settle against what was charged, never above the bucket size
+    await governor.release(PROVIDER, MODEL, lease_id, charged, used_tokens=0, success=True)
+    assert float((await state(redis_client))["tokens"]) == 1000
+
+
+@pytest.mark.asyncio
+async def test_request_bucket_limits_calls_per_minute(governor, monkeypatch):
+    set_limits(monkeypatch, rpm=2)
+
+    await acquire_now(governor)
+    await acquire_now(governor)
+    with pytest.raises(LLMQueueTimeout):
+        await acquire_now(governor)
+
+
+@pytest.mark.asyncio
+async def test_concurrency_slot_is_freed_on_release(governor, monkeypatch):
+    set_limits(monkeypatch, concurrency=1)
+
+    lease_id, charged = await acquire_now(governor)
+    with pytest.raises(LLMQueueTimeout):
+        await acquire_now(governor)
+
+    await governor.release(PROVIDER, MODEL, lease_id, charged, used_tokens=None, success=True)
+    assert await acquire_now(governor)
+
+
+@pytest.mark.asyncio
+async def test_expired_lease_frees_its_slot(governor, monkeypatch):
+    set_limits(monkeypatch, concurrency=1)
+    monkeypatch.setattr(settings, "LLM_GOVERNOR_LEASE_TTL_SECONDS", 0.05)
+
+    # A worker that died mid-call never releases its lease
+    await acquire_now(governor)
+    with pytest.raises(LLMQueueTimeout):
+        await acquire_now(governor)
+
+    await asyncio.sleep(0.1)
+    assert await acquire_now(governor)
+
+
+@pytest.mark.asyncio
+async def test_throttling_lowers_rate_once_per_cooldown_and_recovers(
+    governor, redis_client, monkeypatch
+):
+    set_limits(monkeypatch, rpm=100)
+
+    await governor.throttled(PROVIDER, MODEL)
+    # Reported again by another caller inside the same cooldown window
+    await governor.throttled(PROVIDER, MODEL)
+    assert float((await state(redis_client))["factor"]) == settings.LLM_GOVERNOR_THROTTLE_DECREASE
+
+    # Every call pauses during the cooldown
+    with pytest.raises(LLMQueueTimeout):
+        await acquire_now(governor)
+
+    lease_id, charged = await governor.acquire(PROVIDER, MODEL, 100, deadline=time.time() + 5)
+    await governor.release(PROVIDER, MODEL, lease_id, charged, used_tokens=100, success=True)
+    assert float((await state(redis_client))["factor"]) == pytest.approx(
+        settings.LLM_GOVERNOR_THROTTLE_DECREASE + settings.LLM_GOVERNOR_RECOVERY_STEP
+    )
+
+
+@pytest.mark.asyncio
+async def test_rate_factor_never_drops_below_minimum(governor, redis_client, monkeypatch):
+    set_limits(monkeypatch, rpm=100)
+    monkeypatch.setattr(settings, "LLM_GOVERNOR_THROTTLE_COOLDOWN_MS", 0)
+
+    for _ in range(10):
+        await governor.throttled(PROVIDER, MODEL)
+
+    assert float((await state(redis_client))["factor"]) == settings.LLM_GOVERNOR_MIN_RATE_FACTOR
+
+
+@pytest.mark.asyncio
+async def test_throttled_call_is_requeued_until_it_succeeds(governor, redis_client, monkeypatch):
+    set_limits(monkeypatch, concurrency=1)
+    provider = FakeProvider([THROTTLED, THROTTLED, OK])
+    service = GovernedLLMService(provider, PROVIDER, max_wait_seconds=5)
+
+    result = await service.invoke_model("prompt", max_tokens=100)
+
+    assert result == OK
+    assert provider.calls == 3
+    assert float((await state(redis_client))["factor"]) < 1
+    # Every attempt returned its concurrency slot
+    assert await redis_client.zcard(f"llm:governor:{PROVIDER}:{MODEL}:leases") == 0
+
+
+@pytest.mark.asyncio
+async def test_requeue_gives_up_after_max_throttle_retries(governor, monkeypatch):
+    set_limits(monkeypatch)
+    monkeypatch.setattr(settings, "LLM_GOVERNOR_MAX_THROTTLE_RETRIES", 2)
+    provider = FakeProvider([THROTTLED])
+    service = GovernedLLMService(provider, PROVIDER, max_wait_seconds=5)
+
+    result = await service.invoke_model("prompt", max_tokens=100)
+
+    assert result["throttled"]
+    assert provider.calls == 3
+
+
+@pytest.mark.asyncio
+async def test_interactive_calls_fail_fast_while_batch_calls_queue(governor, monkeypatch):
+    set_limits(monkeypatch, concurrency=1)
+    lease_id, charged = await acquire_now(governor)
+    provider = FakeProvider([OK])
+    interactive = GovernedLLMService(provider, PROVIDER, max_wait_seconds=0.1)
+    batch = GovernedLLMService(provider, PROVIDER, max_wait_seconds=5)
+
+    queued = asyncio.create_task(batch.invoke_model("prompt", max_tokens=100))
+    result = await interactive.invoke_model("prompt", max_tokens=100)
+    assert result["throttled"]
+    assert provider.calls == 0
+
+    await governor.release(PROVIDER, MODEL, lease_id, charged, used_tokens=None, success=True)
+    assert await asyncio.wait_for(queued, timeout=2) == OK
+    assert provider.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_requeued_call_resets_the_stream_callback(governor, monkeypatch):
+    set_limits(monkeypatch)
+    resets = []
+
+    class StreamHandler:
+        def __call__(self, text):
+            return None
+
+        def reset(self):
+            resets.append(provider.calls)
+
+    provider = FakeProvider([THROTTLED, OK])
+    service = GovernedLLMService(provider, PROVIDER, max_wait_seconds=5)
+
+    assert await service.invoke_model("prompt", max_tokens=100, on_delta=StreamHandler()) == OK
+    # Reset once, between the throttled attempt and its retry
+    assert resets == [1]
@@ -0,0 +1,172 @@
+"""Tests for the write-behind LLM usage recorder"""
+
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from app.services import llm_usage_recorder as recorder_module
+from app.services.llm_usage_recorder import MAX_ROW_ATTEMPTS, LLMUsageRecorder
+
+
+class FakeSession:
+    """Records inserted rows; rows with a failing model_name raise IntegrityError"""
+
+    def __init__(self, db):
+        self.db = db
+        self.pending = []
+
+    def execute(self, statement, rows):
+        self.db.statements.append([dict(row) for row in rows])
+        if self.db.fail_bulk and len(rows) > 1:
+            raise IntegrityError("INSERT", {}, Exception("bulk failed"))
+        for row in rows:
+            if row.get("model_name") in self.db.failing:
+                raise IntegrityError("INSERT", {}, Exception("foreign key"))
+        self.pending.extend(rows)
+
+    @contextmanager
+    def begin_nested(self):
+        start = len(self.pending)
+        try:
+            yield
+        except Exception:
+            del self.pending[start:]
+            raise
+
+    def commit(self):
+        self.db.rows.extend(self.pending)
+        self.pending = []
+
+    def rollback(self):
+        self.pending = []
+
+    def close(self):
+        pass
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.rows = []
+        self.statements = []
+        self.failing = set()
+        self.fail_bulk = False
+
+    def session(self):
+        return FakeSession(self)
+
+
+@pytest.fixture
+def db(monkeypatch):
+    database = FakeDatabase()
+    monkeypatch.setattr(recorder_module, "SessionLocal", database.session)
+    return database
+
+
+@pytest.fixture
+def recorder():
+    # A long interval keeps the writer thread out of the way; tests flush
+    recorder = LLMUsageRecorder(flush_interval=3600, flush_size=1000, max_buffer=1000)
+    yield recorder
+    recorder._stopped.set()
+    recorder._wakeup.set()
+
+
+def test_rows_with_same_columns_are_inserted_together(db, recorder):
+    recorder.record(model_name="a", input_tokens=1)
+    recorder.record(model_name="b")
+    recorder.record(model_name="c", input_tokens=3)
+
+    recorder.flush()
+
+    # One statement per column shape, so omitted columns keep their defaults
+    assert sorted(len(rows) for rows in db.statements) == [1, 2]
+    for rows in db.statements:
+        assert len({frozenset(row) for row in rows}) == 1
+    assert sorted(row["model_name"] for row in db.rows) == ["a", "b", "c"]
+
+
+def test_record_returns_the_inserted_row_id(db, recorder):
+    call_id = recorder.record(model_name="a")
+
+    recorder.flush()
+
+    assert [str(row["id"]) for row in db.rows] == [call_id]
+
+
+def test_failing_row_is_retried_then_dropped(db, recorder):
+    db.failing.add("bad")
+    db.fail_bulk = True
+    recorder.record(model_name="good")
+    recorder.record(model_name="bad")
+
+    recorder.flush()
+
+    # The bad row doesn't lose the batch, and waits for the next flush
+    assert [row["model_name"] for row in db.rows] == ["good"]
+    assert [row["model_name"] for row in recorder._buffer] == ["bad"]
+
+    for _ in range(MAX_ROW_ATTEMPTS - 1):
+        recorder.flush()
+
+    assert [row["model_name"] for row in db.rows] == ["good"]
+    assert not recorder._buffer
+    assert not recorder._attempts
+    attempts = [
+        rows for rows in db.statements if any(row["model_name"] == "bad" for row in rows)
+    ]
+    assert len(attempts) == MAX_ROW_ATTEMPTS * 2  # bulk + one-by-one per flush
+
+
+def test_row_succeeding_on_retry_is_kept(db, recorder):
+    db.failing.add("late")
+    recorder.record(model_name="late")
+    recorder.flush()
+    assert not db.rows
+
+    # Its parent row committed meanwhile
+    db.failing.clear()
+    recorder.flush()
+
+    assert [row["model_name"] for row in db.rows] == ["late"]
+    assert not recorder._attempts
+
+
+def test_full_buffer_drops_oldest_rows(db):
+    recorder = LLMUsageRecorder(flush_interval=3600, flush_size=1000, max_buffer=2)
+    recorder._stopped.set()
+    for name in ("a", "b", "c"):
+        recorder.record(model_name=name)
+
+    recorder.flush()
+
+    assert [row["model_name"] for row in db.rows] == ["b", "c"]
+
+
+def test_shutdown_flushes_buffer_and_stops_writer(db, recorder):
+    recorder.record(model_name="a")
+    recorder.record(model_name="b")
+    thread = recorder._thread
+
+    recorder.shutdown()
+
+    assert not thread.is_alive()
+    assert sorted(row["model_name"] for row in db.rows) == ["a", "b"]
+    assert not recorder._buffer
+
+
+def test_celery_worker_shutdown_flushes_usage(db, monkeypatch):
+    from celery.signals import worker_process_shutdown, worker_shutdown
+
+    from app.core import celery_config  # noqa: F401 - connects the signal handlers
+    from app.core.async_runner import cv_pipeline_runner
+
+    recorder = LLMUsageRecorder(flush_interval=3600, flush_size=1000, max_buffer=1000)
+    monkeypatch.setattr(recorder_module, "llm_usage_recorder", recorder)
+    monkeypatch.setattr(cv_pipeline_runner, "shutdown", lambda timeout: None)
+    for signal in (worker_shutdown, worker_process_shutdown):
+        recorder.record(model_name="a")
+        signal.send(sender=None)
+        assert not recorder._buffer
+
+    assert len(db.rows) == 2
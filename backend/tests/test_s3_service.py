@@ -0,0 +1,125 @@
+"""Tests for AsyncS3Service against a moto-mocked S3"""
+
+import pytest
+from moto import mock_aws
+
+from app.core.config import settings
+from app.services.s3_service import S3_DELETE_BATCH_LIMIT, AsyncS3Service, S3Service
+
+
+@pytest.fixture
+def s3():
+    """AsyncS3Service over a fresh mocked bucket"""
+    with mock_aws():
+        service = S3Service()
+        service.s3_client.create_bucket(Bucket=settings.S3_BUCKET_NAME)
+        yield AsyncS3Service(service)
+
+
+def put(s3: AsyncS3Service, key: str, body: bytes = b"content", **kwargs):
+    s3.service.s3_client.put_object(
+        Bucket=settings.S3_BUCKET_NAME, Key=key, Body=body, **kwargs
+    )
+
+
+def remaining_keys(s3: AsyncS3Service) -> set:
+    paginator = s3.service.s3_client.get_paginator("list_objects_v2")
+    return {
+        obj["Key"]
+        for page in paginator.paginate(Bucket=settings.S3_BUCKET_NAME)
+        for obj in page.get("Contents", [])
+    }
+
+
+@pytest.mark.asyncio
+async def test_download_file_returns_content(s3):
+    put(s3, "users/1/cvs/a.pdf", b"%PDF-1.4 cv")
+
+    assert await s3.download_file("users/1/cvs/a.pdf") == b"%PDF-1.4 cv"
+
+
+@pytest.mark.asyncio
+async def test_download_file_missing_key_raises(s3):
+    with pytest.raises(Exception, match="Failed to download file from S3"):
+        await s3.download_file("users/1/cvs/missing.pdf")
+
+
+@pytest.mark.asyncio
+async def test_head_returns_metadata(s3):
+    put(
+        s3, "users/1/cvs/a.pdf", b"12345",
+        ContentType="application/pdf", Metadata={"original-filename": "a.pdf"},
+    )
+
+    metadata = await s3.head("users/1/cvs/a.pdf")
+
+    assert metadata["content_type"] == "application/pdf"
+    assert metadata["content_length"] == 5
+    assert metadata["last_modified"] is not None
+    assert metadata["metadata"] == {"original-filename": "a.pdf"}
+
+
+@pytest.mark.asyncio
+async def test_head_missing_key_raises(s3):
+    with pytest.raises(Exception, match="Failed to get file metadata"):
+        await s3.head("users/1/cvs/missing.pdf")
+
+
+@pytest.mark.asyncio
+async def test_delete_files_empty(s3):
+    assert await s3.delete_files([]) == {"deleted": 0, "errors": []}
+
+
+@pytest.mark.asyncio
+async def test_delete_files_sends_one_request_per_chunk(s3):
+    keys = [f"users/1/cvs/{i}.pdf" for i in range(2 * S3_DELETE_BATCH_LIMIT + 5)]
+    for key in keys:
+        put(s3, key)
+
+    chunk_sizes = []
+    delete_objects = s3.service.s3_client.delete_objects
+
+    def counting_delete_objects(**kwargs):
+        chunk_sizes.append(len(kwargs["Delete"]["Objects"]))
+        return delete_objects(**kwargs)
+
+    s3.service.s3_client.delete_objects = counting_delete_objects
+
+    result = await s3.delete_files(keys)
+
+    assert sorted(chunk_sizes) == [5, S3_DELETE_BATCH_LIMIT, S3_DELETE_BATCH_LIMIT]
+    assert result == {"deleted": len(keys), "errors": []}
+    assert remaining_keys(s3) == set()
+
+
+@pytest.mark.asyncio
+async def test_delete_files_counts_partial_errors(s3):
+    keys = [f"users/1/cvs/{i}.pdf" for i in range(S3_DELETE_BATCH_LIMIT + 10)]
+    for key in keys:
+        put(s3, key)
+    # One failing key in each chunk
+    denied = {keys[3], keys[S3_DELETE_BATCH_LIMIT + 3]}
+
+    delete_objects = s3.service.s3_client.delete_objects
+
+    def partially_denied_delete_objects(**kwargs):
+        objects = kwargs["Delete"]["Objects"]
+        allowed = [obj for obj in objects if obj["Key"] not in denied]
+        response = delete_objects(
+            Bucket=kwargs["Bucket"], Delete={**kwargs["Delete"], "Objects": allowed}
+        )
+        response["Errors"] = response.get("Errors", []) + [
+            {"Key": obj["Key"], "Code": "AccessDenied", "Message": "Access Denied"}
+            for obj in objects
+            if obj["Key"] in denied
+        ]
+        return response
+
+    s3.service.s3_client.delete_objects = partially_denied_delete_objects
+
+    result = await s3.delete_files(keys)
+
+    assert result["deleted"] == len(keys) - len(denied)
+    assert {error["Key"] for error in result["errors"]} == denied
+    assert all(error["Code"] == "AccessDenied" for error in result["errors"])
+    assert remaining_keys(s3) == denied
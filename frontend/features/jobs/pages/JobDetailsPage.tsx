@@ -87,8 +87,12 @@ const JobDetailsPage: React.FC = () => {
                   fetchCVs(); // targeted refresh
                   return { ...c, status: 'completed', progress: 100, statusMessage: 'Completed' };
                }
+               // Fields streamed from the AI parse before it finishes
+               const partial = lastMessage.partial || {};
                return {
                   ...c,
+                  ...(partial.candidate_name && { name: partial.candidate_name }),
+                  ...(partial.current_role && { currentRole: partial.current_role }),
                   status: 'processing',
                   progress: lastMessage.progress,
                   statusMessage: lastMessage.status